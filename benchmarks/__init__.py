@@ -0,0 +1,3 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+"""Client overhead benchmarks, run against the gateway admin API emulator"""
@@ -0,0 +1,176 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Runs the benchmarks against the gateway emulator, and stores the results as JSON, to compare against previous runs.
+
+Usage::
+
+    python -m benchmarks.run [--output results.json] [--compare previous.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+from cdk_proxy_api_client import __version__
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.emulator import GatewayEmulator
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+BENCHMARK_VCLUSTER: str = "benchmark-0"
+RESULTS_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def measure(function: Callable, iterations: int, warmup: int = 5) -> dict:
+    """Calls the function ``iterations`` times, and returns the timings in microseconds"""
+    for _ in range(warmup):
+        function()
+    timings: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        function()
+        timings.append((time.perf_counter_ns() - start) / 1000)
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "min_us": round(timings[0], 2),
+        "median_us": round(statistics.median(timings), 2),
+        "mean_us": round(statistics.fmean(timings), 2),
+        "p95_us": round(timings[int(len(timings) * 0.95) - 1], 2),
+    }
+
+
+def measure_throughput(function: Callable, items: int) -> dict:
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    return {
+        "items": items,
+        "seconds": round(elapsed, 4),
+        "items_per_second": round(items / elapsed, 2),
+    }
+
+
+def run_benchmarks(gateway_url: str, quick: bool = False) -> dict:
+    scale: int = 10 if quick else 1
+    proxy = ProxyClient(
+        ApiClient(url=gateway_url, username="admin", password="conduktor")
+    )
+    client = proxy.client
+    interceptors = Interceptors(proxy)
+    vclusters = VirtualClusters(proxy)
+    user_mappings = UserMappings(proxy)
+    users: int = len(user_mappings.list_mappings(BENCHMARK_VCLUSTER).json())
+
+    results: dict = {
+        "api_client.get": measure(lambda: client.get("/health"), 2000 // scale),
+        "api_client.post": measure(
+            lambda: client.post(
+                f"/admin/vclusters/v1/vcluster/{BENCHMARK_VCLUSTER}/topics/benchmark",
+                json={"physicalTopicName": "benchmark"},
+            ),
+            2000 // scale,
+        ),
+        "interceptors.generate_interceptor_path": measure(
+            lambda: interceptors.generate_interceptor_path(
+                "interceptor", vcluster_name="vcluster", username="user"
+            ),
+            50000 // scale,
+        ),
+        "vclusters.list_vcluster_topic_mappings.json": measure(
+            lambda: vclusters.list_vcluster_topic_mappings(
+                BENCHMARK_VCLUSTER, as_list=True
+            ),
+            100 // scale,
+        ),
+    }
+    for _workers in [1, 10]:
+        results[
+            f"user_mappings.list_mappings_detailed.workers_{_workers}"
+        ] = measure_throughput(
+            lambda: user_mappings.list_mappings_detailed(
+                BENCHMARK_VCLUSTER, max_workers=_workers
+            ),
+            users,
+        )
+    return results
+
+
+def compare(current: dict, previous: dict, threshold: float) -> list[str]:
+    """Returns the benchmarks which regressed by more than the threshold ratio"""
+    regressions: list[str] = []
+    for _name, _result in current["results"].items():
+        _previous = previous["results"].get(_name)
+        if not _previous:
+            continue
+        if "median_us" in _result:
+            _ratio = _result["median_us"] / _previous["median_us"]
+        else:
+            _ratio = _previous["items_per_second"] / _result["items_per_second"]
+        print(f"{_name:60} {_ratio:6.2f}x")
+        if _ratio > 1 + threshold:
+            regressions.append(_name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", help="results file path")
+    parser.add_argument("--compare", help="previous results file to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="slowdown ratio considered a regression",
+    )
+    parser.add_argument("--quick", action="store_true", help="10x fewer iterations")
+    args = parser.parse_args()
+
+    with GatewayEmulator() as gateway:
+        gateway.state.seed(
+            vclusters=1,
+            topic_mappings=10000,
+            user_mappings=500,
+            interceptors=0,
+            prefix="benchmark",
+        )
+        results = run_benchmarks(gateway.url, quick=args.quick)
+    report: dict = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "client_version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_fd:
+        json.dump(report, output_fd, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results stored in {output}")
+
+    if args.compare:
+        with open(args.compare) as previous_fd:
+            regressions = compare(report, json.load(previous_fd), args.threshold)
+        if regressions:
+            print("Regressions:", ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from typing import TYPE_CHECKING, Union
 
 import requests
@@ -11,14 +13,30 @@ if TYPE_CHECKING:
     from requests import Response
 
 import re
+import threading
+import time
 
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
+from .common.audit import AuditSink, audit_call
+from .common.concurrency import AdaptiveLimiter
+from .common.json_cache import JsonCache
+from .common.tracing import RequestTrace, RequestTracer, install_tracing_pools
 from .errors import evaluate_api_return
 
 
 class ApiClient:
-    """HTTP Calls wrapper"""
+    """
+    HTTP Calls wrapper.
+
+    The client can be used from several threads. By default, all the threads use the same
+    ``requests`` session. With ``thread_local_sessions=True``, each thread gets its own
+    session, which mounts the adapters of the client session: the threads share the same
+    connection pools (which urllib3 makes thread-safe), but not the session state (cookies,
+    hooks). Set ``pool_maxsize`` to the number of threads, so that no connection is
+    discarded when all the threads call the gateway at once.
+    """
 
     json_headers: dict = {
         "Content-type": "application/json",
@@ -34,7 +52,10 @@ class ApiClient:
         ignore_ssl_errors: bool = False,
         username: str = None,
         password: str = None,
-        session: requests.session = None,
+        session: requests.Session = None,
+        thread_local_sessions: bool = False,
+        pool_maxsize: int = None,
+        timeout: float = None,
     ):
         """
 
@@ -44,6 +65,10 @@ class ApiClient:
         :param bool ignore_ssl_errors: Ignore SSL errors, for self-signed endpoints. Use at own risks
         :param str username: Username used for basic auth
         :param str password: Password used for basic auth
+        :param requests.Session session: session to use. A new one is created if not set
+        :param bool thread_local_sessions: one session per thread, sharing the connection pools
+        :param int pool_maxsize: number of connections kept per host by the session adapters
+        :param float timeout: default seconds to wait for the gateway to connect and to answer
         """
         if (username and not password) or (password and not username):
             raise ValueError("You must specify both username and password")
@@ -59,12 +84,52 @@ class ApiClient:
         self.protocol = protocol
         self.port = port
         self.url = url
-        if session is None:
-            self.session = requests.session()
+        self.timeout = timeout
+        self.tracer: RequestTracer | None = None
+        self.json_cache: JsonCache | None = None
+        self.audit_sink: AuditSink | None = None
+        self.limiter: AdaptiveLimiter | None = None
+        self._thread_local_sessions = thread_local_sessions
+        self.pool_maxsize = pool_maxsize
+        self._local = threading.local()
+        self._session: requests.Session | None = None
+        self.session = session if session is not None else requests.session()
+        if pool_maxsize is not None:
+            for _prefix in ["https://", "http://"]:
+                self._session.mount(
+                    _prefix,
+                    HTTPAdapter(
+                        pool_connections=pool_maxsize, pool_maxsize=pool_maxsize
+                    ),
+                )
 
     def __repr__(self):
         return self.url
 
+    @property
+    def session(self) -> requests.Session:
+        """The client session, or the session of the current thread"""
+        if not self._thread_local_sessions:
+            return self._session
+        session = getattr(self._local, "session", None)
+        if session is None or session.adapters is not self._session.adapters:
+            session = self._local.session = self._thread_session()
+        return session
+
+    @session.setter
+    def session(self, session: requests.Session) -> None:
+        self._session = session
+
+    def _thread_session(self) -> requests.Session:
+        """New session, using the adapters (and their pools) of the client session"""
+        session = requests.Session()
+        session.adapters = self._session.adapters
+        session.headers = self._session.headers
+        session.proxies = self._session.proxies
+        session.cert = self._session.cert
+        session.trust_env = self._session.trust_env
+        return session
+
     @property
     def verify_ssl(self) -> bool:
         if not self._ignore_ssl_errors and self.protocol == "http":
@@ -145,48 +210,140 @@ class ApiClient:
             )
         self._port = value
 
-    @evaluate_api_return
-    def get(self, query_path, **kwargs) -> Response:
+    def enable_tracing(
+        self,
+        callback: Callable[[RequestTrace], None] = None,
+        sample_rate: float = 1.0,
+        max_traces: int = 1000,
+    ) -> RequestTracer:
+        """
+        Records the timing breakdown of the calls. See :mod:`cdk_proxy_api_client.common.tracing`
+
+        :param callback: called with each trace
+        :param float sample_rate: ratio (0 to 1) of the calls to trace
+        :param int max_traces: number of traces kept by the tracer
+        """
+        install_tracing_pools(self.session)
+        self.tracer = RequestTracer(callback, sample_rate, max_traces)
+        return self.tracer
+
+    def disable_tracing(self) -> None:
+        self.tracer = None
+
+    @contextmanager
+    def trace(
+        self,
+        callback: Callable[[RequestTrace], None] = None,
+        sample_rate: float = 1.0,
+        max_traces: int = 1000,
+    ) -> Iterator[RequestTracer]:
+        """Traces the calls made within the context"""
+        previous = self.tracer
+        try:
+            yield self.enable_tracing(callback, sample_rate, max_traces)
+        finally:
+            self.tracer = previous
+
+    def enable_json_cache(
+        self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024
+    ) -> JsonCache:
+        """
+        Reuses the decoded JSON of the GET responses which body did not change.
+        Each call gets its own copy. See :mod:`cdk_proxy_api_client.common.json_cache`
+
+        :param int max_entries: maximum number of decoded bodies kept
+        :param int max_bytes: maximum total size of the bodies kept
+        """
+        self.json_cache = JsonCache(max_entries, max_bytes)
+        return self.json_cache
+
+    def disable_json_cache(self) -> None:
+        self.json_cache = None
+
+    def enable_audit(self, file_path: str, **kwargs) -> AuditSink:
+        """
+        Records the changes (POST, PUT, DELETE) made by the client in a JSONL file.
+        See :class:`cdk_proxy_api_client.common.audit.AuditSink` for the settings.
+        Set :attr:`audit_sink` to share a sink between clients.
+        """
+        self.disable_audit()
+        self.audit_sink = AuditSink(file_path, **kwargs)
+        return self.audit_sink
+
+    def disable_audit(self) -> None:
+        """Writes the queued audit records, and stops recording"""
+        sink, self.audit_sink = self.audit_sink, None
+        if sink is not None:
+            sink.close()
+
+    def enable_adaptive_concurrency(self, **kwargs) -> AdaptiveLimiter:
+        """
+        Limits the number of requests in flight, adapting the limit to the gateway latency
+        and errors. The bulk operations run up to ``max_limit`` requests at once, unless
+        given a lower ``max_workers``.
+        See :class:`cdk_proxy_api_client.common.concurrency.AdaptiveLimiter` for the settings.
+        """
+        self.limiter = AdaptiveLimiter(**kwargs)
+        return self.limiter
+
+    def disable_adaptive_concurrency(self) -> None:
+        self.limiter = None
+
+    def _send(self, method: str, query_path: str, **kwargs) -> Response:
         if not query_path.startswith(r"/"):
             query_path = f"/{query_path}"
         url = f"{self.url}{query_path}"
-        req = self.session.get(
-            url, auth=self.basic_auth, verify=self.verify_ssl, **kwargs
-        )
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        limiter = self.limiter
+        tracer = self.tracer
+        trace = None
+        audit_sink = self.audit_sink
+        if limiter is not None:
+            limiter.acquire()
+        started: float = time.perf_counter()
+        try:
+            if tracer is not None:
+                trace = tracer.start(method, query_path)
+            req = self.session.request(
+                method, url, auth=self.basic_auth, verify=self.verify_ssl, **kwargs
+            )
+        except Exception as error:
+            if limiter is not None:
+                limiter.release(
+                    time.perf_counter() - started,
+                    error=error
+                    if isinstance(error, (requests.ConnectionError, requests.Timeout))
+                    else None,
+                )
+            if trace is not None:
+                tracer.finish(trace, error=error)
+            if audit_sink is not None:
+                audit_call(audit_sink, method, query_path, kwargs, started, error=error)
+            raise
+        if limiter is not None:
+            limiter.release(time.perf_counter() - started, req.status_code)
+        if audit_sink is not None:
+            audit_call(audit_sink, method, query_path, kwargs, started, req.status_code)
+        json_cache = self.json_cache
+        if json_cache is not None and method == "GET" and req.status_code == 200:
+            json_cache.install(req)
+        if trace is not None:
+            tracer.finish(trace, req)
         return req
 
+    @evaluate_api_return
+    def get(self, query_path, **kwargs) -> Response:
+        return self._send("GET", query_path, **kwargs)
+
     @evaluate_api_return
     def post(self, query_path, **kwargs) -> Response:
-        if not query_path.startswith(r"/"):
-            query_path = f"/{query_path}"
-        url = f"{self.url}{query_path}"
-        req = self.session.post(
-            url,
-            auth=self.basic_auth,
-            verify=self.verify_ssl,
-            **kwargs,
-        )
-        return req
+        return self._send("POST", query_path, **kwargs)
 
     @evaluate_api_return
     def put(self, query_path, **kwargs) -> Response:
-        if not query_path.startswith(r"/"):
-            query_path = f"/{query_path}"
-        url = f"{self.url}{query_path}"
-        req = self.session.put(
-            url,
-            auth=self.basic_auth,
-            verify=self.verify_ssl,
-            **kwargs,
-        )
-        return req
+        return self._send("PUT", query_path, **kwargs)
 
     @evaluate_api_return
     def delete(self, query_path, **kwargs) -> Response:
-        if not query_path.startswith(r"/"):
-            query_path = f"/{query_path}"
-        url = f"{self.url}{query_path}"
-        req = self.session.delete(
-            url, auth=self.basic_auth, verify=self.verify_ssl, **kwargs
-        )
-        return req
+        return self._send("DELETE", query_path, **kwargs)
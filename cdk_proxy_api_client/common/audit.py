@@ -0,0 +1,272 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Audit log of the changes (POST, PUT, DELETE) made by :class:`ApiClient`.
+
+For each change, the sink records the time, method, path, response status, latency, and
+the SHA-256 digest of the payload, computed after redacting the secrets (see
+:data:`REDACTED_KEYS`), so that the payload sent can be proven without being stored.
+
+The calling threads only build the record and put it in a bounded queue. A background
+thread writes the queued records in batches to a JSONL file, rotated when it reaches
+``max_bytes``. When the queue is full, the callers either wait for room (``block``,
+the default, so that no record is lost) or the record is dropped and counted (``drop``).
+The queued records are written when the interpreter exits, or with :meth:`AuditSink.flush`.
+
+.. code-block:: python
+
+    sink = client.enable_audit("audit/gateway.jsonl", on_full="drop")
+    ...
+    sink.flush()
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from cdk_proxy_api_client.common.logging import LOG
+
+AUDITED_METHODS: frozenset = frozenset({"POST", "PUT", "DELETE"})
+REDACTED_KEYS: frozenset = frozenset(
+    {"password", "secret", "token", "apikey", "api_key", "credentials", "jaas"}
+)
+ON_FULL_POLICIES: tuple = ("block", "drop")
+
+_STOP = object()
+
+
+def _redacted(value: Any, keys: frozenset) -> Any:
+    if isinstance(value, dict):
+        return {
+            _key: "<redacted>"
+            if any(_secret in str(_key).lower() for _secret in keys)
+            else _redacted(_value, keys)
+            for _key, _value in value.items()
+        }
+    if isinstance(value, list):
+        return [_redacted(_value, keys) for _value in value]
+    return value
+
+
+def payload_digest(
+    payload: Any, redacted_keys: frozenset = REDACTED_KEYS
+) -> str | None:
+    """
+    SHA-256 of the payload, with the values of the keys containing one of the
+    ``redacted_keys`` replaced. ``None`` when there is no payload.
+    """
+    if payload is None:
+        return None
+    if isinstance(payload, (bytes, str)):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            if isinstance(payload, str):
+                payload = payload.encode()
+            return hashlib.sha256(payload).hexdigest()
+    return hashlib.sha256(
+        json.dumps(
+            _redacted(payload, redacted_keys),
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        ).encode()
+    ).hexdigest()
+
+
+class AuditSink:
+    """Writes the audit records from a background thread. See the module documentation"""
+
+    def __init__(
+        self,
+        file_path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        backup_count: int = 10,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        on_full: str = "block",
+        redacted_keys: frozenset = REDACTED_KEYS,
+    ):
+        """
+        :param str file_path: path of the JSONL file. Rotated files get a .1, .2... suffix
+        :param int max_bytes: size of the file triggering the rotation
+        :param int backup_count: number of rotated files kept
+        :param int queue_size: maximum number of records waiting to be written
+        :param int batch_size: maximum number of records written at once
+        :param str on_full: ``block`` the caller, or ``drop`` the record, when the queue is full
+        :param frozenset redacted_keys: keys which values are redacted before the digest
+        """
+        if on_full not in ON_FULL_POLICIES:
+            raise ValueError("on_full must be one of", ON_FULL_POLICIES, "got", on_full)
+        self.file_path = os.path.abspath(file_path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.on_full = on_full
+        self.redacted_keys = redacted_keys
+        self.written: int = 0
+        self.dropped: int = 0
+        self.errors: int = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        self._open()
+        self._closed: bool = False
+        self._thread = threading.Thread(
+            target=self._run, name="audit-sink", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> AuditSink:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def settings(self) -> dict:
+        """Arguments creating a sink with the same settings, e.g. in another process"""
+        return {
+            "file_path": self.file_path,
+            "max_bytes": self.max_bytes,
+            "backup_count": self.backup_count,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "on_full": self.on_full,
+            "redacted_keys": self.redacted_keys,
+        }
+
+    def record(
+        self,
+        method: str,
+        path: str,
+        payload: Any,
+        status: int | None,
+        seconds: float,
+        error: Exception = None,
+    ) -> bool:
+        """Queues the record of a call. Returns False if the record was dropped"""
+        _record: dict = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "method": method,
+            "path": path,
+            "status": status,
+            "latency_ms": round(seconds * 1000, 3),
+            "payload_sha256": payload_digest(payload, self.redacted_keys),
+        }
+        if error is not None:
+            _record["error"] = f"{type(error).__name__}: {error}"
+        if self._closed:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put(_record, block=self.on_full == "block")
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Waits for the records queued so far to be written. Returns False on timeout"""
+        if not self._thread.is_alive():
+            return True
+        written = threading.Event()
+        self._queue.put(written)
+        return written.wait(timeout)
+
+    def close(self, timeout: float = None) -> None:
+        """Writes the queued records, and stops the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self._file.close()
+
+    def _run(self) -> None:
+        while True:
+            batch: list = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines: list[bytes] = []
+            events: list[threading.Event] = []
+            stop: bool = False
+            for _item in batch:
+                if _item is _STOP:
+                    stop = True
+                elif isinstance(_item, threading.Event):
+                    events.append(_item)
+                else:
+                    lines.append(json.dumps(_item, separators=(",", ":")).encode())
+            if lines:
+                self._write(lines)
+            for _event in events:
+                _event.set()
+            if stop:
+                return
+
+    def _open(self) -> None:
+        self._file = open(self.file_path, "ab")
+        self._size: int = self._file.tell()
+
+    def _write(self, lines: list[bytes]) -> None:
+        try:
+            if self._file.closed:
+                self._open()
+            data: bytes = b"\n".join(lines) + b"\n"
+            if self._size and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            self.written += len(lines)
+        except (OSError, ValueError) as error:
+            self.errors += len(lines)
+            LOG.error(f"Failed to write {len(lines)} audit records: {error}")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backup_count > 0:
+            for _index in range(self.backup_count - 1, 0, -1):
+                _source = f"{self.file_path}.{_index}"
+                if os.path.exists(_source):
+                    os.replace(_source, f"{self.file_path}.{_index + 1}")
+            os.replace(self.file_path, f"{self.file_path}.1")
+        self._file = open(self.file_path, "wb")
+        self._size = 0
+
+
+def audit_call(
+    sink: AuditSink,
+    method: str,
+    path: str,
+    kwargs: dict,
+    started: float,
+    status: int = None,
+    error: Exception = None,
+) -> None:
+    """Records the :class:`ApiClient` call, if it is a change"""
+    if method not in AUDITED_METHODS:
+        return
+    sink.record(
+        method,
+        path,
+        kwargs.get("json", kwargs.get("data")),
+        status,
+        time.perf_counter() - started,
+        error,
+    )
@@ -0,0 +1,211 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""Bounded concurrency helpers shared by the bulk operations"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+DEFAULT_MAX_WORKERS: int = 10
+BACKOFF_STATUS_CODES: frozenset = frozenset({429, 503})
+
+
+class AdaptiveLimiter:
+    """
+    Limits the number of requests in flight, and adapts the limit to the gateway (AIMD).
+
+    While the latency stays within ``latency_tolerance`` times the baseline (the lowest
+    latency seen recently), and the limit is reached, the limit grows by ``increase`` per
+    limit's worth of requests (additive increase). When the latency rises above it, or
+    on 429/503 responses or connection errors, the limit is multiplied by ``backoff``
+    (multiplicative decrease). The requests in flight when the limit backs off do not
+    shrink it further: they were sent before the gateway slowed down.
+
+    The limit settles around the concurrency the gateway serves at its best throughput.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        backoff: float = 0.7,
+        latency_tolerance: float = 1.5,
+        smoothing: float = 0.2,
+    ):
+        """
+        :param int initial_limit: number of requests in flight to start with
+        :param int min_limit: lowest limit
+        :param int max_limit: highest limit
+        :param float increase: limit increase per limit's worth of good requests
+        :param float backoff: factor (0 to 1) applied to the limit on back off
+        :param float latency_tolerance: ratio of the smoothed latency to the baseline
+          above which the limit backs off
+        :param float smoothing: weight (0 to 1) of the last latency in the smoothed latency
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "Limits must be 1 <= min_limit <= initial_limit <= max_limit. Got",
+                min_limit,
+                initial_limit,
+                max_limit,
+            )
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1. Got", backoff)
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self._limit: float = float(initial_limit)
+        self.in_flight: int = 0
+        self.baseline: float | None = None
+        self.latency: float | None = None
+        self.backoffs: int = 0
+        self._recovering: int = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current number of requests allowed in flight"""
+        return int(self._limit)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "latency": self.latency,
+            "baseline": self.baseline,
+            "backoffs": self.backoffs,
+        }
+
+    def settings(self) -> dict:
+        """Arguments creating a limiter with the same settings, e.g. in another process"""
+        return {
+            "initial_limit": self.initial_limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "increase": self.increase,
+            "backoff": self.backoff,
+            "latency_tolerance": self.latency_tolerance,
+            "smoothing": self.smoothing,
+        }
+
+    def acquire(self) -> None:
+        """Waits for a request slot"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(
+        self, seconds: float, status: int = None, error: Exception = None
+    ) -> None:
+        """Frees the slot, and adapts the limit to the request outcome"""
+        with self._condition:
+            saturated: bool = self.in_flight >= self.limit
+            self.in_flight -= 1
+            recovering: bool = self._recovering > 0
+            if recovering:
+                self._recovering -= 1
+            if error is not None or status in BACKOFF_STATUS_CODES:
+                if not recovering:
+                    self._back_off()
+            else:
+                self._sample(seconds, saturated and not recovering, recovering)
+            self._condition.notify_all()
+
+    def _sample(self, seconds: float, saturated: bool, recovering: bool) -> None:
+        if self.latency is None:
+            self.latency = self.baseline = seconds
+            return
+        self.latency += self.smoothing * (seconds - self.latency)
+        # The baseline drifts towards the current latency, so it recovers from an
+        # exceptionally fast request, or from a lasting change of the gateway latency.
+        self.baseline = min(
+            seconds, self.baseline + 0.01 * (self.latency - self.baseline)
+        )
+        if self.latency > self.baseline * self.latency_tolerance:
+            if not recovering:
+                self._back_off()
+        elif saturated:
+            self._limit = min(
+                float(self.max_limit), self._limit + self.increase / self._limit
+            )
+
+    def _back_off(self) -> None:
+        self._recovering = self.in_flight
+        self.backoffs += 1
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+
+
+def map_concurrently(
+    function: Callable[[Any], Any],
+    items: Iterable,
+    max_workers: int = None,
+    ordered: bool = True,
+    limiter: AdaptiveLimiter = None,
+) -> Iterator[tuple[Any, Any, Exception | None]]:
+    """
+    Runs ``function`` for each of the items with at most ``max_workers`` calls in flight.
+    Items are consumed lazily, so only a window of futures is held in memory at once.
+
+    Yields ``(item, result, error)`` tuples, either in the input order or as they complete.
+    Exceptions raised by ``function`` are returned as ``error`` instead of being raised,
+    so one failure does not abort the whole batch.
+
+    :param function: callable taking a single item
+    :param items: iterable of items to process
+    :param int max_workers: maximum number of concurrent calls. Defaults to the limiter
+      ``max_limit`` when set, to :data:`DEFAULT_MAX_WORKERS` otherwise
+    :param bool ordered: yield results in the input order (True) or in completion order
+    :param AdaptiveLimiter limiter: the limiter of the client the function calls. It
+      decides how many of the ``max_workers`` calls are in flight
+    """
+    if max_workers is None:
+        max_workers = limiter.max_limit if limiter is not None else DEFAULT_MAX_WORKERS
+    if max_workers < 1:
+        raise ValueError("max_workers must be >= 1. Got", max_workers)
+    items_iter = iter(items)
+    window: int = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: deque[tuple[Any, Future]] = deque()
+        exhausted: bool = False
+
+        def fill():
+            nonlocal exhausted
+            while not exhausted and len(pending) < window:
+                try:
+                    _item = next(items_iter)
+                except StopIteration:
+                    exhausted = True
+                    return
+                pending.append((_item, executor.submit(function, _item)))
+
+        fill()
+        while pending:
+            if ordered:
+                _item, _future = pending.popleft()
+                yield _item, *_future_outcome(_future)
+            else:
+                done, _ = wait([_f for _, _f in pending], return_when=FIRST_COMPLETED)
+                completed = [_p for _p in pending if _p[1] in done]
+                pending = deque(_p for _p in pending if _p[1] not in done)
+                for _item, _future in completed:
+                    yield _item, *_future_outcome(_future)
+            fill()
+
+
+def _future_outcome(future: Future) -> tuple[Any, Exception | None]:
+    error = future.exception()
+    if error is not None:
+        return None, error
+    return future.result(), None
@@ -0,0 +1,29 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""Files helpers"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+
+def atomic_write(file_path: str, content: bytes) -> None:
+    """
+    Writes the content to a temporary file in the same directory, then renames it,
+    so that readers never see a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    _fd, _tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(_fd, "wb") as tmp_fd:
+            tmp_fd.write(content)
+            tmp_fd.flush()
+            os.fsync(tmp_fd.fileno())
+        os.replace(_tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(_tmp_path):
+            os.remove(_tmp_path)
+        raise
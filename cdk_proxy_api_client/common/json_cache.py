@@ -0,0 +1,129 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Opt-in cache of the decoded JSON bodies of the GET calls made by :class:`ApiClient`.
+
+Listings such as the interceptors, vclusters or plugins ones often return the same body
+call after call. When the cache is enabled, ``response.json()`` hashes the raw body and,
+when the same body was decoded before, returns the previously decoded object instead of
+decoding it again.
+
+The decoded objects are kept in the :mod:`marshal` format, which loads several times
+faster than JSON is parsed: each call gets its own plain ``dict``/``list``, which the
+caller is free to change, and is not shared with the other callers.
+
+The cache is a LRU, bounded in number of entries and in total size of the bodies.
+
+.. code-block:: python
+
+    cache = client.enable_json_cache(max_entries=128)
+    ...
+    cache.hit_rate
+"""
+
+from __future__ import annotations
+
+import json
+import marshal
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from requests import Response
+
+
+class JsonCache:
+    """
+    LRU of the decoded bodies, in the marshal format, keyed by the hash and length of the
+    raw body.
+
+    The body hash is the built-in (SipHash) hash of the bytes: it is computed at memory
+    speed, and is 64 bits wide, which keeps collisions out of reach for the number of
+    entries a cache holds.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        """
+        :param int max_entries: maximum number of decoded bodies kept
+        :param int max_bytes: maximum total size of the bodies kept. Bigger bodies are
+          decoded and not cached. The size of a body is the one of its marshal data
+        """
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError("max_entries and max_bytes must be greater than 0")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self.size: int = 0
+        self._entries: OrderedDict[tuple[int, int], bytes] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Ratio of the decodes served from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def decode(self, body: bytes) -> Any:
+        """
+        Returns the decoded body, loaded from the cache when the body was seen.
+        Raises ``ValueError`` when the body is not valid JSON
+        """
+        key: tuple[int, int] = (hash(body), len(body))
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if data is not None:
+            return marshal.loads(data)
+        value = json.loads(body)
+        data = marshal.dumps(value)
+        if len(data) > self.max_bytes:
+            return value
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self.size += len(data)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, _data = self._entries.popitem(last=False)
+                self.size -= len(_data)
+        return value
+
+    def install(self, response: Response) -> None:
+        """
+        Serves ``response.json()`` from the cache. Calls with arguments, and bodies which
+        are not valid JSON, are left to requests.
+        """
+        _json = response.json
+
+        def json(**kwargs):
+            if kwargs:
+                return _json(**kwargs)
+            try:
+                return self.decode(response.content)
+            except ValueError:
+                return _json()
+
+        response.json = json
@@ -0,0 +1,248 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Opt-in timing breakdown of the HTTP calls made by :class:`ApiClient`.
+
+When tracing is enabled, the session connection pools are swapped for subclasses of the
+urllib3 ones that timestamp each step of a call, for the calls the tracer samples:
+
+* ``pool_checkout``: a connection was taken from the pool
+* ``connect``: a new TCP connection was established (absent when the connection is reused)
+* ``tls``: the TLS handshake completed (HTTPS new connections only)
+* ``request_sent``: the request headers and body were sent
+* ``first_byte``: the response status and headers were received
+* ``body_complete``: the response body was read
+* ``json_decoded``: the caller decoded the body with ``response.json()``
+
+The calls that are not sampled only cost a thread-local lookup per step.
+
+.. code-block:: python
+
+    with client.trace(sample_rate=0.1) as tracer:
+        ...
+    for _trace in tracer.traces:
+        print(_trace.method, _trace.path, _trace.durations())
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from cdk_proxy_api_client.common.logging import LOG
+
+if TYPE_CHECKING:
+    from requests import Response, Session
+
+PHASES: tuple = (
+    ("pool_checkout", "pool_checkout"),
+    ("connect", "connect"),
+    ("tls", "tls"),
+    ("send", "request_sent"),
+    ("wait", "first_byte"),
+    ("download", "body_complete"),
+)
+
+_local = threading.local()
+
+
+def mark(event: str) -> None:
+    """Timestamps the event on the trace of the current thread call, if any"""
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.timestamps[event] = time.perf_counter()
+
+
+class RequestTrace:
+    """Timestamps (:func:`time.perf_counter`) of the steps of one call"""
+
+    __slots__ = ("method", "path", "status_code", "error", "started", "timestamps")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.status_code: int | None = None
+        self.error: Exception | None = None
+        self.started: float = time.perf_counter()
+        self.timestamps: dict[str, float] = {}
+
+    @property
+    def reused_connection(self) -> bool:
+        return "connect" not in self.timestamps
+
+    @property
+    def total(self) -> float | None:
+        """Seconds from the call start to the body complete"""
+        if "body_complete" not in self.timestamps:
+            return None
+        return self.timestamps["body_complete"] - self.started
+
+    def durations(self) -> dict[str, float]:
+        """
+        Seconds spent in each phase: pool_checkout, connect, tls, send, wait (for the
+        gateway to answer), download and decode. Phases which did not happen are omitted.
+        """
+        durations: dict[str, float] = {}
+        previous: float = self.started
+        for _phase, _event in PHASES:
+            if _event in self.timestamps:
+                durations[_phase] = self.timestamps[_event] - previous
+                previous = self.timestamps[_event]
+        if "json_decoded" in self.timestamps:
+            durations["decode"] = (
+                self.timestamps["json_decoded"] - self.timestamps["json_decode_start"]
+            )
+        return durations
+
+    def as_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "error": type(self.error).__name__ if self.error else None,
+            "reused_connection": self.reused_connection,
+            "durations": self.durations(),
+        }
+
+
+class RequestTracer:
+    """Samples the calls to trace, and keeps the latest traces"""
+
+    def __init__(
+        self,
+        callback: Callable[[RequestTrace], None] = None,
+        sample_rate: float = 1.0,
+        max_traces: int = 1000,
+    ):
+        """
+        :param callback: called with each trace, once the response body is received
+        :param float sample_rate: ratio (0 to 1) of the calls to trace
+        :param int max_traces: number of traces kept in ``traces``
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1. Got", sample_rate)
+        self.callback = callback
+        self.sample_rate = sample_rate
+        self.traces: deque[RequestTrace] = deque(maxlen=max_traces)
+
+    def start(self, method: str, path: str) -> RequestTrace | None:
+        """Returns the trace of the call, or None if the call is not sampled"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        trace = RequestTrace(method, path)
+        _local.trace = trace
+        return trace
+
+    def finish(
+        self, trace: RequestTrace, response: Response = None, error: Exception = None
+    ) -> None:
+        _local.trace = None
+        if response is not None:
+            trace.timestamps["body_complete"] = time.perf_counter()
+            trace.status_code = response.status_code
+            _trace_json_decode(response, trace)
+        trace.error = error
+        self.traces.append(trace)
+        if self.callback is None:
+            return
+        try:
+            self.callback(trace)
+        except Exception as error:
+            LOG.exception(error)
+
+    def summary(self) -> dict[str, float]:
+        """Average seconds per phase, over the kept traces"""
+        totals: dict[str, float] = {}
+        counts: dict[str, int] = {}
+        for _trace in list(self.traces):
+            for _phase, _duration in _trace.durations().items():
+                totals[_phase] = totals.get(_phase, 0.0) + _duration
+                counts[_phase] = counts.get(_phase, 0) + 1
+        return {_phase: totals[_phase] / counts[_phase] for _phase in totals}
+
+
+def _trace_json_decode(response: Response, trace: RequestTrace) -> None:
+    _json = response.json
+
+    def json(**kwargs):
+        _start = time.perf_counter()
+        result = _json(**kwargs)
+        if "json_decoded" not in trace.timestamps:
+            trace.timestamps["json_decode_start"] = _start
+            trace.timestamps["json_decoded"] = time.perf_counter()
+        return result
+
+    response.json = json
+
+
+class _TracingConnectionMixin:
+    def _new_conn(self):
+        sock = super()._new_conn()
+        mark("connect")
+        return sock
+
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        mark("request_sent")
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        mark("first_byte")
+        return response
+
+
+class TracingHTTPConnection(_TracingConnectionMixin, HTTPConnection):
+    pass
+
+
+class TracingHTTPSConnection(_TracingConnectionMixin, HTTPSConnection):
+    def connect(self):
+        super().connect()
+        mark("tls")
+
+
+class TracingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TracingHTTPConnection
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        mark("pool_checkout")
+        return conn
+
+
+class TracingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TracingHTTPSConnection
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        mark("pool_checkout")
+        return conn
+
+
+TRACING_POOL_CLASSES: dict = {
+    "http": TracingHTTPConnectionPool,
+    "https": TracingHTTPSConnectionPool,
+}
+
+
+def install_tracing_pools(session: Session) -> None:
+    """
+    Makes the session adapters create tracing connection pools. The existing pools are
+    closed, the adapters settings (retries, pool sizes) are kept.
+    """
+    for _adapter in session.adapters.values():
+        poolmanager = getattr(_adapter, "poolmanager", None)
+        if poolmanager is None or poolmanager.pool_classes_by_scheme is (
+            TRACING_POOL_CLASSES
+        ):
+            continue
+        poolmanager.pool_classes_by_scheme = TRACING_POOL_CLASSES
+        poolmanager.clear()
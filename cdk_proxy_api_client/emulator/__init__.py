@@ -0,0 +1,364 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Pure-Python emulator of the Conduktor Gateway admin API endpoints used by this client:
+vclusters, topic mappings, concentration rules, tokens, interceptors, user mappings,
+plugins and rerouting. It runs on localhost in a background thread, so the client
+behaviour can be tested offline, at scale.
+
+.. code-block:: python
+
+    with GatewayEmulator(latency=0.005) as emulator:
+        emulator.state.seed(vclusters=100, topic_mappings=1000)
+        proxy = ProxyClient(
+            ApiClient(url=emulator.url, username="admin", password="conduktor")
+        )
+
+The emulator answers with the gateway status codes (401 without credentials, 403 for
+non-admin users writes, 404 for missing objects, 409 for conflicts), with a configurable
+latency and random errors injection.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from cdk_proxy_api_client.emulator.state import ApiError, GatewayState
+
+DEFAULT_USERS: dict = {
+    "admin": {"password": "conduktor", "admin": True},
+    "readonly": {"password": "conduktor", "admin": False},
+}
+
+_VCLUSTERS: str = r"^/admin/vclusters/v1"
+_INTERCEPTORS_SCOPE = re.compile(
+    r"^/admin/interceptors/v1"
+    r"(?P<scope>/global|(?:/vcluster/[^/]+)?(?:/(?:username|group)/[^/]+)?)"
+    r"(?:/interceptor/(?P<name>[^/]+))?$"
+)
+_USER_MAPPINGS = re.compile(
+    r"^/admin/userMappings/v1(?:/vcluster/(?P<vcluster>[^/]+))?"
+    r"(?:/username/(?P<username>[^/]+))?$"
+)
+
+
+def _interceptor_scope(scope_path: str) -> tuple:
+    """Returns the (is_global, vcluster, username, group) tuple of the scope path"""
+    if scope_path == "/global":
+        return True, None, None, None
+    _parts: list[str] = [unquote(_part) for _part in scope_path.split("/")[1:]]
+    _scope: dict = dict(zip(_parts[::2], _parts[1::2]))
+    return False, _scope.get("vcluster"), _scope.get("username"), _scope.get("group")
+
+
+class GatewayEmulator:
+    """Serves the emulated admin API over HTTP on localhost"""
+
+    def __init__(
+        self,
+        state: GatewayState = None,
+        users: dict = None,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        error_paths: str = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        listings_cache_size: int = 1024,
+    ):
+        """
+        :param GatewayState state: the gateway objects. New empty state if not set.
+        :param dict users: admin API users, ``{username: {"password": str, "admin": bool}}``
+        :param float latency: seconds added to every request
+        :param float latency_jitter: maximum random seconds added to the latency
+        :param float error_rate: ratio (0 to 1) of requests answered with ``error_status``
+        :param int error_status: status code of the injected errors
+        :param str error_paths: regular expression of the paths errors are injected for
+        :param str host: listening address
+        :param int port: listening port. Random free port if 0
+        :param int listings_cache_size: number of GET bodies kept, least recently used
+          evicted first
+        """
+        self.state = state if state is not None else GatewayState()
+        self.users = users if users is not None else DEFAULT_USERS
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_paths = re.compile(error_paths) if error_paths else None
+        self.requests_count: int = 0
+        self._count_lock = threading.Lock()
+        self.listings_cache_size = listings_cache_size
+        self._listings_cache: OrderedDict[str, tuple[int, bytes]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._routes: list[tuple] = self._define_routes()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        _host, _port = self.server.server_address[:2]
+        return f"http://{_host}:{_port}"
+
+    def start(self) -> GatewayEmulator:
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> GatewayEmulator:
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _define_routes(self) -> list[tuple]:
+        state = self.state
+        _vc: str = r"/vcluster/(?P<vcluster>[^/]+)"
+        return [
+            ("GET", re.compile(r"^/health$"), lambda _m, _b: {"status": "UP"}),
+            (
+                "GET",
+                re.compile(rf"{_VCLUSTERS}/?$"),
+                lambda _m, _b: state.list_vclusters(),
+            ),
+            (
+                "POST",
+                re.compile(rf"{_VCLUSTERS}{_vc}/username/(?P<username>[^/]+)$"),
+                lambda _m, _b: state.create_token(
+                    _m["vcluster"], _m["username"], _b or {}
+                ),
+            ),
+            (
+                "GET",
+                re.compile(rf"{_VCLUSTERS}{_vc}/topics$"),
+                lambda _m, _b: state.list_topics(_m["vcluster"]),
+            ),
+            (
+                "DELETE",
+                re.compile(rf"{_VCLUSTERS}{_vc}/topics$"),
+                lambda _m, _b: state.delete_topics(_m["vcluster"]),
+            ),
+            (
+                "POST",
+                re.compile(rf"{_VCLUSTERS}{_vc}/topics/(?P<topic>[^/]+)$"),
+                lambda _m, _b: state.create_topic(
+                    _m["vcluster"], _m["topic"], _b or {}
+                ),
+            ),
+            (
+                "DELETE",
+                re.compile(rf"{_VCLUSTERS}{_vc}/topics/(?P<topic>[^/]+)$"),
+                lambda _m, _b: state.delete_topic(_m["vcluster"], _m["topic"]),
+            ),
+            (
+                "GET",
+                re.compile(rf"{_VCLUSTERS}{_vc}/concentration-rules$"),
+                lambda _m, _b: state.list_concentration_rules(_m["vcluster"]),
+            ),
+            (
+                "POST",
+                re.compile(rf"{_VCLUSTERS}{_vc}/concentration-rules$"),
+                lambda _m, _b: state.create_concentration_rule(
+                    _m["vcluster"], _b or {}
+                ),
+            ),
+            (
+                "DELETE",
+                re.compile(rf"{_VCLUSTERS}{_vc}/concentration-rules$"),
+                lambda _m, _b: state.delete_concentration_rules(
+                    _m["vcluster"], _m.get("query") or None
+                ),
+            ),
+            (
+                "POST",
+                re.compile(rf"{_VCLUSTERS}/rerouting/(?P<src>[^/]+)/(?P<dest>[^/]+)$"),
+                lambda _m, _b: state.reroute(_m["src"], _m["dest"]),
+            ),
+            (
+                "GET",
+                re.compile(r"^/admin/plugins/v1(?P<extended>/extended)?$"),
+                lambda _m, _b: {
+                    "plugins": state.plugins
+                    if _m["extended"]
+                    else [
+                        {"plugin": _plugin["plugin"], "title": _plugin.get("title")}
+                        for _plugin in state.plugins
+                    ]
+                },
+            ),
+            (
+                "GET",
+                re.compile(r"^/admin/interceptors/v1/(?:all|interceptors)$"),
+                lambda _m, _b: state.list_interceptors(),
+            ),
+            (
+                "POST",
+                re.compile(r"^/admin/interceptors/v1/resolve$"),
+                lambda _m, _b: state.resolve(_b or {}),
+            ),
+            ("*", _INTERCEPTORS_SCOPE, self._interceptors),
+            ("*", _USER_MAPPINGS, self._user_mappings),
+        ]
+
+    def _interceptors(self, method: str, match: dict, body: dict | None):
+        scope = _interceptor_scope(match["scope"])
+        name: str | None = match["name"]
+        if name is None:
+            if method != "GET":
+                raise ApiError(405, f"{method} not allowed")
+            return self.state.list_interceptors(scope)
+        if method == "GET":
+            return self.state.get_interceptor(scope, name)
+        if method == "DELETE":
+            return self.state.delete_interceptor(scope, name)
+        return self.state.set_interceptor(
+            scope, name, body or {}, create=method == "POST"
+        )
+
+    def _user_mappings(self, method: str, match: dict, body: dict | None):
+        vcluster: str | None = match["vcluster"]
+        username: str | None = match["username"]
+        if username is None:
+            if method == "GET":
+                return self.state.list_usernames(vcluster)
+            if method == "POST":
+                return self.state.set_user_mapping(vcluster, body or {})
+            raise ApiError(405, f"{method} not allowed")
+        if method == "GET":
+            return self.state.get_user_mapping(vcluster, username)
+        if method == "DELETE":
+            return self.state.delete_user_mapping(vcluster, username)
+        return self.state.set_user_mapping(
+            vcluster, dict(body or {}, username=username)
+        )
+
+    def authenticate(self, method: str, authorization: str | None) -> None:
+        if not authorization or not authorization.startswith("Basic "):
+            raise ApiError(401, "Unauthorized")
+        try:
+            _username, _password = (
+                base64.b64decode(authorization[6:]).decode().split(":", 1)
+            )
+        except ValueError:
+            raise ApiError(401, "Unauthorized")
+        _user = self.users.get(_username)
+        if not _user or _user["password"] != _password:
+            raise ApiError(401, "Unauthorized")
+        if method != "GET" and not _user.get("admin", False):
+            raise ApiError(403, f"{_username} is not allowed to {method}")
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        body: bytes = b"",
+        authorization: str = None,
+    ) -> tuple[int, bytes]:
+        """Processes a request, and returns the status code and JSON body"""
+        with self._count_lock:
+            self.requests_count += 1
+        if self.latency or self.latency_jitter:
+            time.sleep(self.latency + random.uniform(0, self.latency_jitter))
+        _url = urlsplit(path)
+        try:
+            if (
+                self.error_rate
+                and (self.error_paths is None or self.error_paths.search(_url.path))
+                and random.random() < self.error_rate
+            ):
+                raise ApiError(self.error_status, "Injected error")
+            if _url.path != "/health":
+                self.authenticate(method, authorization)
+            for _method, _pattern, _handler in self._routes:
+                if _method not in [method, "*"]:
+                    continue
+                _match = _pattern.match(_url.path)
+                if not _match:
+                    continue
+                _params: dict = {
+                    _key: unquote(_value) if _value else _value
+                    for _key, _value in _match.groupdict().items()
+                }
+                _params["query"] = unquote(_url.query)
+                if method == "GET":
+                    with self._cache_lock:
+                        _cached = self._listings_cache.get(path)
+                        if _cached and _cached[0] == self.state.revision:
+                            self._listings_cache.move_to_end(path)
+                            return 200, _cached[1]
+                    _revision = self.state.revision
+                    _body = json.dumps(
+                        _handler(method, _params, None)
+                        if _method == "*"
+                        else _handler(_params, None)
+                    ).encode()
+                    with self._cache_lock:
+                        self._listings_cache[path] = (_revision, _body)
+                        self._listings_cache.move_to_end(path)
+                        while len(self._listings_cache) > self.listings_cache_size:
+                            self._listings_cache.popitem(last=False)
+                    return 200, _body
+                _payload = json.loads(body) if body else None
+                _result = (
+                    _handler(method, _params, _payload)
+                    if _method == "*"
+                    else _handler(_params, _payload)
+                )
+                if method == "DELETE" or _result is None:
+                    return 204, b""
+                return (201 if method == "POST" else 200), json.dumps(_result).encode()
+            raise ApiError(404, f"No route for {method} {_url.path}")
+        except ApiError as error:
+            return (
+                error.status,
+                json.dumps({"status": error.status, "message": error.message}).encode(),
+            )
+        except json.JSONDecodeError as error:
+            return 400, json.dumps({"status": 400, "message": str(error)}).encode()
+
+    def _handler_class(self):
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _process(self):
+                _length = int(self.headers.get("Content-Length") or 0)
+                _body = self.rfile.read(_length) if _length else b""
+                _status, _response = emulator.handle(
+                    self.command,
+                    self.path,
+                    _body,
+                    self.headers.get("Authorization"),
+                )
+                self.send_response(_status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(_response)))
+                self.end_headers()
+                if _response:
+                    self.wfile.write(_response)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _process
+
+        return Handler
@@ -0,0 +1,54 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""Runs the gateway admin API emulator on localhost"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.emulator import GatewayEmulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="0 to 1")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed-vclusters", type=int, default=0)
+    parser.add_argument("--seed-topic-mappings", type=int, default=1000)
+    parser.add_argument("--seed-user-mappings", type=int, default=100)
+    parser.add_argument("--seed-interceptors", type=int, default=10)
+    args = parser.parse_args()
+
+    emulator = GatewayEmulator(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        host=args.host,
+        port=args.port,
+    )
+    if args.seed_vclusters:
+        emulator.state.seed(
+            vclusters=args.seed_vclusters,
+            topic_mappings=args.seed_topic_mappings,
+            user_mappings=args.seed_user_mappings,
+            interceptors=args.seed_interceptors,
+        )
+    with emulator:
+        LOG.info(f"Gateway admin API emulator listening on {emulator.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""In-memory state of the gateway emulator, and the admin API operations on it"""
+
+from __future__ import annotations
+
+import re
+import secrets
+import time
+from threading import RLock
+
+DEFAULT_PLUGINS: list[dict] = [
+    {
+        "plugin": "io.conduktor.gateway.interceptor.safeguard.CreateTopicPolicyPlugin",
+        "title": "Create Topic Policy",
+        "configSchema": {
+            "type": "object",
+            "required": ["topic"],
+            "properties": {
+                "topic": {"type": "string"},
+                "numPartition": {"type": "object"},
+                "replicationFactor": {"type": "object"},
+            },
+        },
+    },
+    {
+        "plugin": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+        "title": "Produce Policy",
+        "configSchema": {
+            "type": "object",
+            "properties": {
+                "topic": {"type": "string"},
+                "acks": {"type": "object"},
+                "compressions": {"type": "object"},
+            },
+        },
+    },
+    {
+        "plugin": "io.conduktor.gateway.interceptor.DynamicHeaderInjectionPlugin",
+        "title": "Dynamic Header Injection",
+        "configSchema": {
+            "type": "object",
+            "required": ["headers"],
+            "properties": {
+                "topic": {"type": "string"},
+                "headers": {"type": "object"},
+            },
+        },
+    },
+    {
+        "plugin": "io.conduktor.gateway.interceptor.safeguard.MessageHeaderRemovalPlugin",
+        "title": "Message Header Removal",
+        "configSchema": {
+            "type": "object",
+            "required": ["headerKeyRegex"],
+            "properties": {
+                "topic": {"type": "string"},
+                "headerKeyRegex": {"type": "string"},
+            },
+        },
+    },
+]
+
+
+class ApiError(Exception):
+    """Returned to the client with the status code and message"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+
+class GatewayState:
+    """
+    The gateway objects. Every change increases ``revision``, which the server uses
+    to cache the encoded listings.
+    """
+
+    def __init__(self, plugins: list[dict] = None):
+        self.lock = RLock()
+        self.revision: int = 0
+        self.vclusters: dict[str, dict] = {}
+        self.passthrough_user_mappings: dict[str, dict] = {}
+        self.interceptors: dict[tuple, dict] = {}
+        self.plugins: list[dict] = plugins if plugins is not None else DEFAULT_PLUGINS
+
+    def _changed(self) -> None:
+        self.revision += 1
+
+    def add_vcluster(self, vcluster: str) -> dict:
+        with self.lock:
+            if vcluster not in self.vclusters:
+                self.vclusters[vcluster] = {
+                    "topics": {},
+                    "concentration_rules": {},
+                    "user_mappings": {},
+                }
+                self._changed()
+            return self.vclusters[vcluster]
+
+    def get_vcluster(self, vcluster: str) -> dict:
+        if vcluster not in self.vclusters:
+            raise ApiError(404, f"Virtual cluster {vcluster} not found")
+        return self.vclusters[vcluster]
+
+    # Virtual clusters
+
+    def list_vclusters(self) -> dict:
+        with self.lock:
+            return {"vclusters": list(self.vclusters.keys())}
+
+    def create_token(self, vcluster: str, username: str, payload: dict) -> dict:
+        self.add_vcluster(vcluster)
+        return {
+            "token": f"{vcluster}.{username}.{payload.get('lifeTimeSeconds', 86400)}"
+            f".{int(time.time())}.{secrets.token_hex(8)}"
+        }
+
+    def list_topics(self, vcluster: str) -> list[dict]:
+        with self.lock:
+            return list(self.get_vcluster(vcluster)["topics"].values())
+
+    def create_topic(self, vcluster: str, logical_topic: str, payload: dict) -> dict:
+        if not payload.get("physicalTopicName"):
+            raise ApiError(400, "physicalTopicName is required")
+        with self.lock:
+            mapping: dict = {
+                "logicalTopicName": logical_topic,
+                "physicalTopicName": payload["physicalTopicName"],
+                "readOnly": bool(payload.get("readOnly", False)),
+                "type": payload.get("type", "alias"),
+                "clusterId": payload.get("clusterId", "main"),
+            }
+            self.add_vcluster(vcluster)["topics"][logical_topic] = mapping
+            self._changed()
+            return mapping
+
+    def create_concentrated_topic(self, vcluster: str, logical_topic: str) -> dict:
+        """
+        Maps the topic as a Kafka client creating it in the vcluster would, through the
+        first concentration rule matching its name. The admin API cannot create these.
+        """
+        with self.lock:
+            _rules = self.get_vcluster(vcluster)["concentration_rules"]
+            if not any(re.fullmatch(_pattern, logical_topic) for _pattern in _rules):
+                raise ApiError(404, f"No concentration rule matches {logical_topic}")
+            mapping: dict = {
+                "logicalTopicName": logical_topic,
+                "readOnly": False,
+                "type": "concentrated",
+                "clusterId": "main",
+            }
+            self.get_vcluster(vcluster)["topics"][logical_topic] = mapping
+            self._changed()
+            return mapping
+
+    def delete_topics(self, vcluster: str) -> None:
+        with self.lock:
+            self.get_vcluster(vcluster)["topics"].clear()
+            self._changed()
+
+    def delete_topic(self, vcluster: str, logical_topic: str) -> None:
+        with self.lock:
+            _topics = self.get_vcluster(vcluster)["topics"]
+            if logical_topic not in _topics:
+                raise ApiError(404, f"Topic mapping {logical_topic} not found")
+            del _topics[logical_topic]
+            self._changed()
+
+    def reroute(self, src_vcluster: str, dest_vcluster: str) -> None:
+        with self.lock:
+            _topics = self.get_vcluster(src_vcluster)["topics"]
+            self.add_vcluster(dest_vcluster)["topics"].update(_topics)
+            _topics.clear()
+            self._changed()
+
+    def list_concentration_rules(self, vcluster: str) -> list[dict]:
+        with self.lock:
+            return list(self.get_vcluster(vcluster)["concentration_rules"].values())
+
+    def create_concentration_rule(self, vcluster: str, payload: dict) -> dict:
+        for _key in ["pattern", "physicalTopicName"]:
+            if not payload.get(_key):
+                raise ApiError(400, f"{_key} is required")
+        with self.lock:
+            _rules = self.add_vcluster(vcluster)["concentration_rules"]
+            if payload["pattern"] in _rules:
+                raise ApiError(409, f"Concentration rule {payload['pattern']} exists")
+            _rules[payload["pattern"]] = dict(payload)
+            self._changed()
+            return _rules[payload["pattern"]]
+
+    def delete_concentration_rules(self, vcluster: str, pattern: str = None) -> None:
+        with self.lock:
+            _rules = self.get_vcluster(vcluster)["concentration_rules"]
+            if pattern is None:
+                _rules.clear()
+            elif pattern not in _rules:
+                raise ApiError(404, f"Concentration rule {pattern} not found")
+            else:
+                del _rules[pattern]
+            self._changed()
+
+    # User mappings
+
+    def user_mappings(self, vcluster: str | None) -> dict:
+        if vcluster is None:
+            return self.passthrough_user_mappings
+        return self.get_vcluster(vcluster)["user_mappings"]
+
+    def list_usernames(self, vcluster: str | None) -> list[str]:
+        with self.lock:
+            return list(self.user_mappings(vcluster).keys())
+
+    def set_user_mapping(self, vcluster: str | None, payload: dict) -> dict:
+        if not payload.get("username"):
+            raise ApiError(400, "username is required")
+        with self.lock:
+            if vcluster is not None:
+                self.add_vcluster(vcluster)
+            mapping: dict = {
+                "username": payload["username"],
+                "principal": payload.get("principal") or payload["username"],
+                "groups": list(payload.get("groups") or []),
+            }
+            self.user_mappings(vcluster)[payload["username"]] = mapping
+            self._changed()
+            return mapping
+
+    def get_user_mapping(self, vcluster: str | None, username: str) -> dict:
+        _mappings = self.user_mappings(vcluster)
+        if username not in _mappings:
+            raise ApiError(404, f"User mapping {username} not found")
+        return _mappings[username]
+
+    def delete_user_mapping(self, vcluster: str | None, username: str) -> None:
+        with self.lock:
+            self.get_user_mapping(vcluster, username)
+            del self.user_mappings(vcluster)[username]
+            self._changed()
+
+    # Interceptors
+
+    @staticmethod
+    def interceptor_definition(scope: tuple, name: str, payload: dict) -> dict:
+        is_global, vcluster, username, group = scope
+        definition: dict = {"name": name}
+        definition.update(payload)
+        if is_global:
+            definition["global"] = True
+        else:
+            definition["vcluster"] = vcluster or "passthrough"
+            if username:
+                definition["username"] = username
+            if group:
+                definition["group"] = group
+        return definition
+
+    def list_interceptors(self, scope: tuple = None) -> dict:
+        with self.lock:
+            interceptors: list = list(self.interceptors.items())
+        return {
+            "interceptors": [
+                _definition
+                for (_scope, _), _definition in interceptors
+                if scope is None or _scope == scope
+            ]
+        }
+
+    def get_interceptor(self, scope: tuple, name: str) -> dict:
+        if (scope, name) not in self.interceptors:
+            raise ApiError(404, f"Interceptor {name} not found")
+        return self.interceptors[(scope, name)]
+
+    def set_interceptor(
+        self, scope: tuple, name: str, payload: dict, create: bool
+    ) -> dict:
+        if not payload.get("pluginClass"):
+            raise ApiError(400, "pluginClass is required")
+        with self.lock:
+            _exists = (scope, name) in self.interceptors
+            if create and _exists:
+                raise ApiError(409, f"Interceptor {name} already exists")
+            if not create and not _exists:
+                raise ApiError(404, f"Interceptor {name} not found")
+            self.interceptors[(scope, name)] = self.interceptor_definition(
+                scope, name, payload
+            )
+            self._changed()
+            return self.interceptors[(scope, name)]
+
+    def delete_interceptor(self, scope: tuple, name: str) -> None:
+        with self.lock:
+            self.get_interceptor(scope, name)
+            del self.interceptors[(scope, name)]
+            self._changed()
+
+    @staticmethod
+    def _target_rank(
+        scope: tuple, vcluster: str | None, username: str | None, groups: list
+    ) -> tuple | None:
+        """
+        Precedence of the interceptor scope for the principal, lowest first:
+        username, group (alphabetical), vcluster, global. None when not targeted
+        """
+        is_global, _vcluster, _username, _group = scope
+        if is_global:
+            return 3, ""
+        if _vcluster != vcluster:
+            return None
+        if _username:
+            return (0, "") if _username == username else None
+        if _group:
+            return (1, _group) if _group in groups else None
+        return 2, ""
+
+    def resolve(self, payload: dict) -> dict:
+        vcluster = payload.get("vcluster")
+        if vcluster == "passthrough":
+            vcluster = None
+        username = payload.get("username")
+        groups = payload.get("groups")
+        if groups is None and username:
+            try:
+                groups = self.user_mappings(vcluster)
+                groups = groups.get(username, {}).get("groups", [])
+            except ApiError:
+                groups = []
+        with self.lock:
+            interceptors: list = list(self.interceptors.items())
+        chain: dict[str, tuple] = {}
+        for (_scope, _name), _definition in interceptors:
+            _rank = self._target_rank(_scope, vcluster, username, groups or [])
+            if _rank is not None and (_name not in chain or _rank < chain[_name][0]):
+                chain[_name] = (_rank, _definition)
+        return {
+            "interceptors": sorted(
+                (_definition for _, _definition in chain.values()),
+                key=lambda _definition: (
+                    _definition.get("priority", 0),
+                    _definition.get("name", ""),
+                ),
+            )
+        }
+
+    # Seeding
+
+    def seed(
+        self,
+        vclusters: int = 10,
+        topic_mappings: int = 1000,
+        user_mappings: int = 100,
+        interceptors: int = 10,
+        prefix: str = "vcluster",
+    ) -> None:
+        """
+        Bulk loads objects, without going through the API.
+
+        :param int vclusters: number of vclusters
+        :param int topic_mappings: number of topic mappings per vcluster
+        :param int user_mappings: number of user mappings per vcluster
+        :param int interceptors: number of interceptors per vcluster
+        :param str prefix: vclusters name prefix
+        """
+        _plugin_class: str = self.plugins[0]["plugin"] if self.plugins else "plugin"
+        with self.lock:
+            for _vc_index in range(vclusters):
+                _vcluster = f"{prefix}-{_vc_index}"
+                _state = self.add_vcluster(_vcluster)
+                for _index in range(topic_mappings):
+                    _topic = f"topic-{_index}"
+                    _state["topics"][_topic] = {
+                        "logicalTopicName": _topic,
+                        "physicalTopicName": f"{_vcluster}.{_topic}",
+                        "readOnly": _index % 10 == 0,
+                        "type": "alias",
+                        "clusterId": "main",
+                    }
+                for _index in range(user_mappings):
+                    _username = f"user-{_index}"
+                    _state["user_mappings"][_username] = {
+                        "username": _username,
+                        "principal": _username,
+                        "groups": [f"group-{_index % 10}"],
+                    }
+                for _index in range(interceptors):
+                    _scope = (False, _vcluster, None, None)
+                    _name = f"interceptor-{_index}"
+                    self.interceptors[(_scope, _name)] = self.interceptor_definition(
+                        _scope,
+                        _name,
+                        {
+                            "pluginClass": _plugin_class,
+                            "priority": _index,
+                            "config": {"topic": ".*"},
+                        },
+                    )
+            self._changed()
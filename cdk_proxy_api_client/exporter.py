@@ -0,0 +1,276 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Streams the topic mappings or user mappings of many vclusters to a JSONL or CSV file,
+optionally gzip compressed.
+
+The vclusters are read concurrently, and each record is handed to the writer through a
+bounded buffer as soon as it is retrieved, so the memory used does not depend on the
+number of vclusters nor of records: a vcluster reader waits when its buffer is full.
+In ordered mode, the records are written vcluster after vcluster, in the vclusters order;
+otherwise, as they are retrieved.
+
+The records are written as returned by :meth:`VirtualClusters.list_vcluster_topic_mappings`
+and :meth:`UserMappings.iter_mappings_detailed`, with the vcluster name added in the
+``vcluster_field`` key, unless set to None.
+
+.. code-block:: python
+
+    exporter = InventoryExporter(proxy, max_workers=10)
+    report = exporter.export("topic_mappings", "topic_mappings.jsonl.gz")
+    report = exporter.export("user_mappings", "users.csv", output_format="csv")
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import json
+import queue
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, TYPE_CHECKING, Any
+
+from cdk_proxy_api_client.common.concurrency import DEFAULT_MAX_WORKERS
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.proxy_api import ProxyClient
+
+CSV_FIELDS: dict[str, list[str]] = {
+    "topic_mappings": [
+        "logicalTopicName",
+        "physicalTopicName",
+        "readOnly",
+        "type",
+        "clusterId",
+    ],
+    "user_mappings": ["username", "principal", "groups"],
+}
+OUTPUT_FORMATS: tuple = ("jsonl", "csv")
+
+_END = object()
+
+
+class _Stopped(Exception):
+    """The records are no longer read"""
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _check_arguments(kind: str, output_format: str) -> None:
+    if kind not in CSV_FIELDS:
+        raise ValueError("kind must be one of", list(CSV_FIELDS), "got", kind)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            "output_format must be one of", OUTPUT_FORMATS, "got", output_format
+        )
+
+
+class InventoryExporter:
+    """Exports the vclusters objects to a file. See the module documentation"""
+
+    def __init__(
+        self,
+        proxy: ProxyClient,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        user_mappings_workers: int = None,
+        buffer_size: int = 1000,
+    ):
+        """
+        :param ProxyClient proxy: the client to read the gateway with
+        :param int max_workers: number of vclusters read at once
+        :param int user_mappings_workers: concurrent requests per vcluster for the user mappings
+        :param int buffer_size: maximum number of records waiting to be written, per vcluster
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1. Got", max_workers)
+        self.vclusters_app = VirtualClusters(proxy)
+        self.user_mappings_app = UserMappings(proxy)
+        self.max_workers = max_workers
+        self.user_mappings_workers = user_mappings_workers
+        self.buffer_size = buffer_size
+
+    def records(
+        self, kind: str, vcluster: str | None, failures: dict = None
+    ) -> Iterator[dict]:
+        """The records of the vcluster, as returned by the gateway"""
+        if kind == "topic_mappings":
+            return iter(
+                self.vclusters_app.list_vcluster_topic_mappings(vcluster, as_list=True)
+            )
+        if kind == "user_mappings":
+            return self.user_mappings_app.iter_mappings_detailed(
+                vcluster, max_workers=self.user_mappings_workers, failures=failures
+            )
+        raise ValueError("kind must be one of", list(CSV_FIELDS), "got", kind)
+
+    def _read(
+        self,
+        kind: str,
+        vcluster: str | None,
+        buffer: queue.Queue,
+        failures: dict,
+        stopped: threading.Event,
+    ) -> None:
+        def put(item: tuple) -> None:
+            while not stopped.is_set():
+                try:
+                    return buffer.put(item, timeout=0.1)
+                except queue.Full:
+                    continue
+            raise _Stopped()
+
+        try:
+            for _record in self.records(kind, vcluster, failures):
+                put((vcluster, _record))
+        except _Stopped:
+            return
+        except Exception as error:
+            put((vcluster, _END, error))
+            return
+        put((vcluster, _END, None))
+
+    def iter_records(
+        self,
+        kind: str,
+        vclusters: Iterable[str | None] = None,
+        ordered: bool = True,
+        report: dict = None,
+    ) -> Iterator[tuple[str | None, dict]]:
+        """
+        Yields ``(vcluster, record)`` for the records of the vclusters. The vclusters errors
+        are stored in ``report["errors"]``, the user mappings ones in ``report["failures"]``.
+        """
+        if kind not in CSV_FIELDS:
+            raise ValueError("kind must be one of", list(CSV_FIELDS), "got", kind)
+        if vclusters is None:
+            vclusters = self.vclusters_app.list_vclusters(as_list=True)["vclusters"]
+        vclusters = list(dict.fromkeys(vclusters))
+        if report is None:
+            report = {}
+        report.setdefault("errors", {})
+        failures: dict = report.setdefault("failures", {})
+        shared_buffer = queue.Queue(maxsize=self.buffer_size * self.max_workers)
+        buffers: list[queue.Queue] = [
+            queue.Queue(maxsize=self.buffer_size) if ordered else shared_buffer
+            for _ in vclusters
+        ]
+        stopped = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="exporter"
+        )
+        try:
+            for _vcluster, _buffer in zip(vclusters, buffers):
+                executor.submit(
+                    self._read,
+                    kind,
+                    _vcluster,
+                    _buffer,
+                    failures.setdefault(_vcluster, {}),
+                    stopped,
+                )
+            remaining: int = len(vclusters)
+            readers: Iterator[queue.Queue] = iter(buffers)
+            _buffer: queue.Queue | None = None
+            while remaining:
+                if _buffer is None:
+                    _buffer = next(readers) if ordered else shared_buffer
+                _item = _buffer.get()
+                if _item[1] is _END:
+                    remaining -= 1
+                    if _item[2] is not None:
+                        report["errors"][_item[0]] = _item[2]
+                    if ordered:
+                        _buffer = None
+                    continue
+                yield _item
+        finally:
+            stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        for _vcluster in list(failures):
+            if not failures[_vcluster]:
+                del failures[_vcluster]
+
+    def write(
+        self,
+        kind: str,
+        output: IO[str],
+        output_format: str = "jsonl",
+        vclusters: Iterable[str | None] = None,
+        ordered: bool = True,
+        vcluster_field: str | None = "vcluster",
+    ) -> dict:
+        """
+        Writes the records to the text stream. See :meth:`export`
+
+        :return: the number of ``records`` written per vcluster, the vclusters ``errors``
+          and, for the user mappings, the ``failures`` per vcluster and username
+        """
+        _check_arguments(kind, output_format)
+        _start = time.perf_counter()
+        report: dict = {"records": {}, "errors": {}, "failures": {}}
+        counts: dict = report["records"]
+        if output_format == "csv":
+            fields: list[str] = CSV_FIELDS[kind]
+            writer = csv.writer(output)
+            writer.writerow([vcluster_field, *fields] if vcluster_field else fields)
+        for _vcluster, _record in self.iter_records(kind, vclusters, ordered, report):
+            counts[_vcluster] = counts.get(_vcluster, 0) + 1
+            if output_format == "csv":
+                _row = [_csv_value(_record.get(_field)) for _field in fields]
+                writer.writerow(
+                    [_csv_value(_vcluster), *_row] if vcluster_field else _row
+                )
+                continue
+            if vcluster_field:
+                _record = {vcluster_field: _vcluster, **_record}
+            output.write(json.dumps(_record))
+            output.write("\n")
+        report["seconds"] = time.perf_counter() - _start
+        return report
+
+    def export(
+        self,
+        kind: str,
+        file_path: str,
+        output_format: str = "jsonl",
+        compress: bool = None,
+        vclusters: Iterable[str | None] = None,
+        ordered: bool = True,
+        vcluster_field: str | None = "vcluster",
+    ) -> dict:
+        """
+        Writes the topic mappings or user mappings of the vclusters to the file.
+
+        :param str kind: ``topic_mappings`` or ``user_mappings``
+        :param str file_path: path of the file to write
+        :param str output_format: ``jsonl`` or ``csv``
+        :param bool compress: gzip the file. Defaults to True when the path ends with .gz
+        :param vclusters: the vclusters to export. All the gateway vclusters if not set.
+          ``None`` in the list is the passthrough (user mappings only)
+        :param bool ordered: write the vclusters records in the vclusters order
+        :param str vcluster_field: key (or CSV column) the vcluster name is set in.
+          Not added if None
+        """
+        _check_arguments(kind, output_format)
+        if compress is None:
+            compress = file_path.endswith(".gz")
+        if compress:
+            output = gzip.open(file_path, "wt", newline="")
+        else:
+            output = open(file_path, "w", newline="")
+        with output:
+            return self.write(
+                kind, output, output_format, vclusters, ordered, vcluster_field
+            )
@@ -0,0 +1,237 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Runs the same call against several gateways (e.g. one per region) concurrently.
+
+Each gateway has its own :class:`ProxyClient`, and so its own credentials, session and
+connection pools. The outcome of the call is returned per gateway: a gateway failing, or
+not answering within the timeout, does not affect the others.
+
+.. code-block:: python
+
+    fleet = GatewayFleet.from_settings(
+        {
+            "eu-west-1": {"url": "https://gw.eu-west-1", "username": "admin", "password": "..."},
+            "us-east-1": {"url": "https://gw.us-east-1", "username": "admin", "password": "..."},
+        },
+        timeout=30,
+    )
+    outcomes = fleet.call(VirtualClusters, "list_vclusters", as_list=True)
+    outcomes.succeeded()  # {"eu-west-1": {...}, "us-east-1": {...}}
+    outcomes.failed()  # {}
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, NamedTuple
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.proxy_api import ApiApplication, ProxyClient
+
+
+class GatewayOutcome(NamedTuple):
+    """Result, or error, of the call to a gateway, and how long it took"""
+
+    gateway: str
+    result: Any = None
+    error: Exception | None = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class FleetOutcomes(dict):
+    """Outcome of the call, per gateway name"""
+
+    def succeeded(self) -> dict[str, Any]:
+        return {
+            _name: _outcome.result for _name, _outcome in self.items() if _outcome.ok
+        }
+
+    def failed(self) -> dict[str, Exception]:
+        return {
+            _name: _outcome.error for _name, _outcome in self.items() if not _outcome.ok
+        }
+
+
+def _timed_call(
+    gateway: str, function: Callable, proxy: ProxyClient, args: tuple, kwargs: dict
+) -> GatewayOutcome:
+    _start = time.perf_counter()
+    try:
+        result = function(proxy, *args, **kwargs)
+    except Exception as error:
+        return GatewayOutcome(gateway, None, error, time.perf_counter() - _start)
+    return GatewayOutcome(gateway, result, None, time.perf_counter() - _start)
+
+
+class GatewayFleet:
+    """Named gateway clients, called concurrently. See the module documentation"""
+
+    def __init__(
+        self,
+        gateways: dict[str, ProxyClient] = None,
+        timeout: float = None,
+        max_workers: int = None,
+    ):
+        """
+        :param dict gateways: the gateway clients, per name
+        :param float timeout: default seconds to wait for each gateway call
+        :param int max_workers: maximum number of gateways called at once. All by default
+        """
+        self._gateways: dict[str, ProxyClient] = dict(gateways or {})
+        self.timeout = timeout
+        self.max_workers = max_workers
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: dict[str, dict],
+        version: str = None,
+        timeout: float = None,
+        max_workers: int = None,
+    ) -> GatewayFleet:
+        """
+        Creates the gateway clients from their :class:`ApiClient` arguments, per name.
+        The clients requests timeout is set to ``timeout`` unless set in their settings.
+        """
+        return cls(
+            {
+                _name: ProxyClient(
+                    ApiClient(**{"timeout": timeout, **_settings}), version=version
+                )
+                for _name, _settings in settings.items()
+            },
+            timeout=timeout,
+            max_workers=max_workers,
+        )
+
+    def __getitem__(self, gateway: str) -> ProxyClient:
+        return self._gateways[gateway]
+
+    def __contains__(self, gateway: str) -> bool:
+        return gateway in self._gateways
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._gateways))
+
+    def __len__(self) -> int:
+        return len(self._gateways)
+
+    def add(self, gateway: str, proxy: ProxyClient) -> None:
+        if gateway in self._gateways:
+            raise KeyError(f"Gateway {gateway} is already in the fleet")
+        self._gateways[gateway] = proxy
+
+    def remove(self, gateway: str) -> ProxyClient:
+        return self._gateways.pop(gateway)
+
+    def run(
+        self,
+        function: Callable[..., Any],
+        *args,
+        gateways: Iterable[str] = None,
+        timeout: float = None,
+        **kwargs,
+    ) -> FleetOutcomes:
+        """
+        Calls ``function(proxy, *args, **kwargs)`` for each gateway concurrently.
+
+        The gateways which did not answer within the timeout, counted from the start of
+        their call, get a ``TimeoutError``, and are not waited for. With ``max_workers``,
+        the calls waiting for a worker are not timed yet. Set the clients ``timeout`` too,
+        so that their requests end and free their worker.
+
+        :param function: function taking the gateway :class:`ProxyClient` first
+        :param gateways: names of the gateways to call. All the fleet by default
+        :param float timeout: seconds to wait for the gateways. Defaults to the fleet one
+        """
+        targets: dict[str, ProxyClient] = {
+            _name: self._gateways[_name]
+            for _name in (gateways if gateways is not None else list(self._gateways))
+        }
+        timeout = timeout if timeout is not None else self.timeout
+        outcomes = FleetOutcomes()
+        if not targets:
+            return outcomes
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers or len(targets), len(targets)),
+            thread_name_prefix="gateway-fleet",
+        )
+        started: dict[str, float] = {}
+
+        def timed_call(name: str, proxy: ProxyClient) -> GatewayOutcome:
+            started[name] = time.perf_counter()
+            return _timed_call(name, function, proxy, args, kwargs)
+
+        try:
+            pending: dict[Future, str] = {
+                executor.submit(timed_call, _name, _proxy): _name
+                for _name, _proxy in targets.items()
+            }
+            while pending:
+                _deadline: float | None = None
+                if timeout is not None:
+                    _deadline = min(
+                        [
+                            time.perf_counter() + timeout,
+                            *(
+                                started[_name] + timeout
+                                for _name in pending.values()
+                                if _name in started
+                            ),
+                        ]
+                    )
+                done, _ = wait(
+                    pending,
+                    timeout=None
+                    if _deadline is None
+                    else max(_deadline - time.perf_counter(), 0),
+                    return_when=FIRST_COMPLETED,
+                )
+                for _future in done:
+                    _name = pending.pop(_future)
+                    outcomes[_name] = _future.result()
+                for _future, _name in list(pending.items()):
+                    if (
+                        _name in started
+                        and time.perf_counter() - started[_name] >= timeout
+                    ):
+                        del pending[_future]
+                        outcomes[_name] = GatewayOutcome(
+                            _name,
+                            error=TimeoutError(
+                                f"{_name} did not answer within {timeout}s"
+                            ),
+                            seconds=timeout,
+                        )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return FleetOutcomes(
+            (_name, outcomes[_name]) for _name in targets if _name in outcomes
+        )
+
+    def call(
+        self,
+        application: type[ApiApplication],
+        method: str,
+        *args,
+        gateways: Iterable[str] = None,
+        timeout: float = None,
+        **kwargs,
+    ) -> FleetOutcomes:
+        """
+        Calls the application method on each gateway concurrently, e.g.
+        ``fleet.call(Interceptors, "create_interceptor", "masking", config, is_global=True)``
+        """
+        return self.run(
+            lambda _proxy: getattr(application(_proxy), method)(*args, **kwargs),
+            gateways=gateways,
+            timeout=timeout,
+        )
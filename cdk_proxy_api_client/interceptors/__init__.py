@@ -3,14 +3,42 @@
 
 from __future__ import annotations
 
-from typing import Union
+import hashlib
+import json
+from typing import TYPE_CHECKING, Union
 from urllib.parse import quote
 
 from requests import Response
 
+from cdk_proxy_api_client import models
+from cdk_proxy_api_client.common.concurrency import map_concurrently
 from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.errors import GenericConflict, ProxyGenericException
+from cdk_proxy_api_client.interceptors.resolver import InterceptorsResolver
+from cdk_proxy_api_client.interceptors.scopes import (
+    normalize_scope,
+    scope_from_definition,
+    scope_key,
+    scope_label,
+)
 from cdk_proxy_api_client.proxy_api import ApiApplication
 
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.plugins.validator import InterceptorConfigValidator
+
+
+def interceptor_config_hash(interceptor_config: dict, keys: list[str] = None) -> str:
+    """
+    Hash of the canonical JSON representation of the interceptor configuration.
+    When ``keys`` is set, only these keys are hashed, so that the fields added by the gateway
+    (name, scope etc.) are not considered.
+    """
+    if keys is not None:
+        interceptor_config = {_key: interceptor_config.get(_key) for _key in keys}
+    return hashlib.sha256(
+        json.dumps(interceptor_config, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
 
 class Interceptors(ApiApplication):
     app_path: str = "admin/interceptors"
@@ -56,7 +84,7 @@ class Interceptors(ApiApplication):
                 _path: str = f"{self.base_path}/vcluster/{quote(vcluster_name)}/group/{quote(group_name)}/interceptor/{quote(interceptor_name)}"
             else:
                 _path: str = f"{self.base_path}/vcluster/{quote(vcluster_name)}/interceptor/{quote(interceptor_name)}"
-            LOG.info("vCluster interceptor path: %s" % _path)
+            LOG.debug("vCluster interceptor path: %s" % _path)
             return _path
 
         if username:
@@ -68,30 +96,49 @@ class Interceptors(ApiApplication):
         LOG.debug("passthrough interceptor path: %s" % _path)
         return _path
 
-    def list_all_interceptors(self, as_list: bool = False) -> Response | list:
+    def list_all_interceptors(
+        self, as_list: bool = False, as_models: bool = False
+    ) -> Response | list:
         """
         Docs: https://developers.conduktor.io/#tag/Interceptors-for-Virtual-Cluster/operation/Interceptor_v1_getInterceptors
         Path: /admin/interceptors/v1/interceptors
+
+        :param bool as_models: return the interceptors as :class:`models.Interceptor`
         """
         _path: str = f"{self.base_path}/interceptors"
         LOG.debug(f"list_all_interceptors path: {_path}")
         req = self.proxy.client.get(_path)
+        if as_models:
+            return models.Interceptor.from_json_list(req.json())
         if as_list:
             return req.json()
         return req
 
-    def get_all_gw_interceptors(self) -> Response:
+    def get_all_gw_interceptors(
+        self, as_models: bool = False
+    ) -> Response | list[models.Interceptor]:
         """
         Returns all the interceptors (for users, groups, vClusters etc.).
 
         Docs: https://developers.conduktor.io/#tag/Interceptors/operation/Interceptor_v1_getInterceptors
         Path: /admin/interceptors/v1/all
+
+        :param bool as_models: return the interceptors as :class:`models.Interceptor`
         """
         _path: str = f"{self.base_path}/all"
         LOG.debug(f"get_all_interceptors path: {_path}")
         req = self.proxy.client.get(_path)
+        if as_models:
+            return models.Interceptor.from_json_list(req.json())
         return req
 
+    def get_resolver(self) -> InterceptorsResolver:
+        """
+        Loads all the gateway interceptors once, to resolve the interceptors of principals
+        offline. See :class:`InterceptorsResolver`
+        """
+        return InterceptorsResolver.from_gateway(self)
+
     def get_interceptor(
         self,
         interceptor_name,
@@ -123,6 +170,16 @@ class Interceptors(ApiApplication):
         req = self.proxy.client.post(
             _path, json=interceptor_config, headers=self.proxy.client.json_headers
         )
+        self.proxy.notify(
+            self.app_path,
+            "create_interceptor",
+            interceptor_name=interceptor_name,
+            interceptor_config=interceptor_config,
+            is_global=is_global,
+            vcluster_name=vcluster_name,
+            username=username,
+            group_name=group_name,
+        )
         return req
 
     def update_interceptor(
@@ -144,6 +201,16 @@ class Interceptors(ApiApplication):
         req = self.proxy.client.put(
             _path, json=interceptor_config, headers=self.proxy.client.json_headers
         )
+        self.proxy.notify(
+            self.app_path,
+            "update_interceptor",
+            interceptor_name=interceptor_name,
+            interceptor_config=interceptor_config,
+            is_global=is_global,
+            vcluster_name=vcluster_name,
+            username=username,
+            group_name=group_name,
+        )
         return req
 
     def delete_interceptor(
@@ -162,6 +229,15 @@ class Interceptors(ApiApplication):
         )
         LOG.debug(f"create_interceptor path: {_path}")
         req = self.proxy.client.delete(_path)
+        self.proxy.notify(
+            self.app_path,
+            "delete_interceptor",
+            interceptor_name=interceptor_name,
+            is_global=is_global,
+            vcluster_name=vcluster_name,
+            username=username,
+            group_name=group_name,
+        )
         return req
 
     def get_all_interceptor(
@@ -213,3 +289,244 @@ class Interceptors(ApiApplication):
             _path, json=payload, headers=self.proxy.client.json_headers
         )
         return req
+
+    def upsert_interceptor(
+        self,
+        interceptor_name,
+        interceptor_config: dict,
+        is_global: bool = False,
+        vcluster_name: str = None,
+        username: str = None,
+        group_name: str = None,
+    ) -> tuple[str, Response]:
+        """
+        Creates the interceptor, and updates it if it already exists for the scope.
+        Returns the action taken (created or updated) and the response.
+        """
+        try:
+            return "created", self.create_interceptor(
+                interceptor_name,
+                interceptor_config,
+                is_global,
+                vcluster_name,
+                username,
+                group_name,
+            )
+        except GenericConflict:
+            return "updated", self.update_interceptor(
+                interceptor_name,
+                interceptor_config,
+                is_global,
+                vcluster_name,
+                username,
+                group_name,
+            )
+
+    def deploy_interceptor(
+        self,
+        interceptor_name: str,
+        interceptor_config: dict,
+        scopes: list[dict],
+        max_workers: int = None,
+        validator: InterceptorConfigValidator = None,
+    ) -> list[dict]:
+        """
+        Upserts the same interceptor to many scopes concurrently.
+        See :mod:`cdk_proxy_api_client.interceptors.scopes` for the scope format.
+
+        Returns one outcome per scope, in the scopes order, with keys
+        ``scope``, ``path``, ``action`` (created, updated or failed), ``status_code`` and ``error``.
+        Failures do not abort the deployment to the other scopes.
+
+        :param str interceptor_name: name of the interceptor
+        :param dict interceptor_config: pluginClass, priority, config etc.
+        :param list[dict] scopes: the scopes to deploy the interceptor to
+        :param int max_workers: maximum number of concurrent requests
+        :param InterceptorConfigValidator validator: when set, the configuration is validated
+            locally first, and ValueError is raised if invalid, before any request is made.
+        """
+        if validator is not None:
+            _errors = validator.validate(interceptor_config)
+            if _errors:
+                raise ValueError(f"Invalid interceptor {interceptor_name}", _errors)
+        _scopes: list[dict] = [normalize_scope(_scope) for _scope in scopes]
+
+        def deploy(scope: dict) -> tuple[str, Response]:
+            return self.upsert_interceptor(
+                interceptor_name, interceptor_config, **scope
+            )
+
+        outcomes: list[dict] = []
+        for _scope, _result, _error in map_concurrently(
+            deploy,
+            _scopes,
+            max_workers=max_workers,
+            limiter=self.proxy.client.limiter,
+        ):
+            outcome: dict = {
+                "scope": scope_label(_scope),
+                "path": self.generate_interceptor_path(interceptor_name, **_scope),
+                "action": "failed",
+                "status_code": None,
+                "error": None,
+            }
+            if _error is not None:
+                if isinstance(_error, ProxyGenericException):
+                    outcome["status_code"] = _error.code
+                outcome["error"] = str(_error)
+                LOG.error(
+                    f"{interceptor_name} - {outcome['scope']} - failed to deploy: {_error}"
+                )
+            else:
+                outcome["action"], _response = _result
+                outcome["status_code"] = _response.status_code
+            outcomes.append(outcome)
+        return outcomes
+
+    def sync_interceptors(
+        self,
+        interceptors: list[dict],
+        prune: bool = False,
+        scope: dict = None,
+        max_workers: int = None,
+        validator: InterceptorConfigValidator = None,
+    ) -> list[dict]:
+        """
+        Idempotent upsert of the interceptors. The current state is fetched once, and only
+        the interceptors which are missing (POST) or whose configuration changed (PUT) are written.
+        With ``prune``, the existing interceptors of ``scope`` that are not defined are deleted.
+
+        Configurations are compared with :func:`interceptor_config_hash`, on the keys
+        of the desired configuration only.
+
+        Returns one outcome per interceptor with keys ``name``, ``scope``, ``action``
+        (created, updated, deleted, unchanged or failed), ``status_code`` and ``error``.
+
+        :param list[dict] interceptors: desired interceptors, with keys ``name``, ``config``
+            (pluginClass, priority, config etc.) and ``scope`` (defaults to global)
+        :param bool prune: delete the existing interceptors of ``scope`` that are not in
+            ``interceptors``. Requires ``scope``, so that no other scope is changed.
+        :param dict scope: when set, only the interceptors of that scope are fetched with
+            :meth:`get_all_interceptor` and managed, and ValueError is raised, before any
+            change, for the interceptors defined with another scope. Otherwise, all
+            interceptors are fetched with :meth:`get_all_gw_interceptors`.
+        :param int max_workers: maximum number of concurrent requests
+        :param InterceptorConfigValidator validator: when set, the configurations are
+            validated locally first, and the invalid ones are reported as failed, without
+            any request made for them.
+        """
+        if prune and scope is None:
+            raise ValueError("prune requires the scope of the interceptors to prune")
+        if scope is not None:
+            scope = normalize_scope(scope)
+            _other_scopes: list[str] = [
+                _interceptor["name"]
+                for _interceptor in interceptors
+                if "scope" in _interceptor
+                and scope_key(_interceptor["scope"]) != scope_key(scope)
+            ]
+            if _other_scopes:
+                raise ValueError(
+                    f"Interceptors defined with another scope than {scope_label(scope)}",
+                    _other_scopes,
+                )
+            current_definitions: list[dict] = [
+                dict(_definition, scope=scope)
+                for _definition in self.get_all_interceptor(**scope).json()[
+                    "interceptors"
+                ]
+            ]
+        else:
+            current_definitions: list[dict] = self.get_all_gw_interceptors().json()[
+                "interceptors"
+            ]
+        current: dict[tuple, dict] = {}
+        for _definition in current_definitions:
+            if scope is not None:
+                _scope = _definition["scope"]
+            else:
+                try:
+                    _scope = scope_from_definition(_definition)
+                except ValueError as error:
+                    LOG.warning(f"Skipping interceptor: {error}")
+                    continue
+            _definition = dict(_definition, scope=_scope)
+            current[(scope_key(_scope), _definition["name"])] = _definition
+
+        outcomes: list[dict] = []
+        operations: list[tuple] = []
+        desired_keys: set = set()
+        for _interceptor in interceptors:
+            _scope = normalize_scope(
+                _interceptor.get("scope", scope or {"is_global": True})
+            )
+            _key = (scope_key(_scope), _interceptor["name"])
+            desired_keys.add(_key)
+            _config: dict = _interceptor["config"]
+            _errors = validator.validate(_config) if validator is not None else None
+            if _errors:
+                outcomes.append(
+                    {
+                        "name": _interceptor["name"],
+                        "scope": scope_label(_scope),
+                        "action": "failed",
+                        "status_code": None,
+                        "error": "; ".join(_errors),
+                    }
+                )
+            elif _key not in current:
+                operations.append(("created", _interceptor["name"], _scope, _config))
+            elif interceptor_config_hash(_config) != interceptor_config_hash(
+                current[_key], list(_config.keys())
+            ):
+                operations.append(("updated", _interceptor["name"], _scope, _config))
+            else:
+                outcomes.append(
+                    {
+                        "name": _interceptor["name"],
+                        "scope": scope_label(_scope),
+                        "action": "unchanged",
+                        "status_code": None,
+                        "error": None,
+                    }
+                )
+        if prune:
+            for _key, _definition in current.items():
+                if _key not in desired_keys:
+                    operations.append(
+                        ("deleted", _definition["name"], _definition["scope"], None)
+                    )
+
+        def apply(operation: tuple) -> Response:
+            _action, _name, _scope, _config = operation
+            if _action == "created":
+                return self.create_interceptor(_name, _config, **_scope)
+            elif _action == "updated":
+                return self.update_interceptor(_name, _config, **_scope)
+            return self.delete_interceptor(_name, **_scope)
+
+        for _operation, _response, _error in map_concurrently(
+            apply,
+            operations,
+            max_workers=max_workers,
+            limiter=self.proxy.client.limiter,
+        ):
+            outcome: dict = {
+                "name": _operation[1],
+                "scope": scope_label(_operation[2]),
+                "action": _operation[0],
+                "status_code": None,
+                "error": None,
+            }
+            if _error is not None:
+                outcome["action"] = "failed"
+                if isinstance(_error, ProxyGenericException):
+                    outcome["status_code"] = _error.code
+                outcome["error"] = str(_error)
+                LOG.error(
+                    f"{outcome['name']} - {outcome['scope']} - failed to sync: {_error}"
+                )
+            else:
+                outcome["status_code"] = _response.status_code
+            outcomes.append(outcome)
+        return outcomes
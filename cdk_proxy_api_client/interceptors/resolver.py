@@ -0,0 +1,161 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Offline interceptors targeting resolution.
+
+Loads all the gateway interceptors once and computes the effective interceptors chain
+for principals in memory, instead of calling the resolve endpoint for each of them.
+
+Precedence follows the gateway targeting rules: for interceptors with the same name,
+the most specific scope wins (username > group > vcluster > global).
+The resulting chain is ordered by priority, lowest first.
+"""
+
+from __future__ import annotations
+
+import random
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.interceptors.scopes import scope_from_definition
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.interceptors import Interceptors
+
+
+def _chain_order(definition: dict) -> tuple:
+    return definition.get("priority", 0), definition.get("name", "")
+
+
+class InterceptorsResolver:
+    """
+    Indexes interceptors by scope and resolves the interceptors chain of principals.
+    Principals use the same format as the resolve endpoint payload, i.e.
+    ``{"vcluster": "vc", "username": "user", "groups": ["group"]}``
+    """
+
+    def __init__(self, interceptors: list[dict]):
+        self._global: dict[str, dict] = {}
+        self._vclusters: dict[str | None, dict[str, dict]] = {}
+        self._groups: dict[tuple, dict[str, dict]] = {}
+        self._usernames: dict[tuple, dict[str, dict]] = {}
+        self._vcluster_chains: dict[str | None, dict[str, dict]] = {}
+        for _definition in interceptors:
+            self.add(_definition)
+
+    @classmethod
+    def from_gateway(cls, interceptors: Interceptors) -> InterceptorsResolver:
+        """Loads all the interceptors with a single call to the gateway"""
+        return cls(interceptors.get_all_gw_interceptors().json()["interceptors"])
+
+    def add(self, definition: dict) -> None:
+        """Indexes an interceptor definition. Definitions without scope are skipped"""
+        try:
+            _scope = scope_from_definition(definition)
+        except ValueError as error:
+            LOG.warning(f"Skipping interceptor: {error}")
+            return
+        _name: str = definition["name"]
+        if _scope["is_global"]:
+            self._global[_name] = definition
+        elif _scope["username"]:
+            self._usernames.setdefault(
+                (_scope["vcluster_name"], _scope["username"]), {}
+            )[_name] = definition
+        elif _scope["group_name"]:
+            self._groups.setdefault(
+                (_scope["vcluster_name"], _scope["group_name"]), {}
+            )[_name] = definition
+        else:
+            self._vclusters.setdefault(_scope["vcluster_name"], {})[_name] = definition
+        self._vcluster_chains.clear()
+
+    def _vcluster_chain(self, vcluster: str | None) -> dict[str, dict]:
+        """Global interceptors overridden by the vcluster ones, computed once per vcluster"""
+        if vcluster not in self._vcluster_chains:
+            _chain: dict[str, dict] = dict(self._global)
+            _chain.update(self._vclusters.get(vcluster, {}))
+            self._vcluster_chains[vcluster] = _chain
+        return self._vcluster_chains[vcluster]
+
+    def resolve(
+        self, vcluster: str = None, username: str = None, groups: Iterable[str] = None
+    ) -> list[dict]:
+        """
+        Returns the interceptors applying to the principal, ordered by priority.
+        When several groups define the same interceptor, the first group in alphabetical
+        order wins.
+        """
+        if vcluster == "passthrough":
+            vcluster = None
+        _chain: dict[str, dict] = self._vcluster_chain(vcluster)
+        if not groups and not username:
+            return sorted(_chain.values(), key=_chain_order)
+        _chain = dict(_chain)
+        _groups_chain: dict[str, dict] = {}
+        for _group in sorted(set(groups or [])):
+            for _name, _definition in self._groups.get((vcluster, _group), {}).items():
+                _groups_chain.setdefault(_name, _definition)
+        _chain.update(_groups_chain)
+        if username:
+            _chain.update(self._usernames.get((vcluster, username), {}))
+        return sorted(_chain.values(), key=_chain_order)
+
+    def resolve_principal(self, principal: dict) -> list[dict]:
+        return self.resolve(
+            principal.get("vcluster"),
+            principal.get("username"),
+            principal.get("groups"),
+        )
+
+    def resolve_many(
+        self, principals: Iterable[dict]
+    ) -> Iterator[tuple[dict, list[dict]]]:
+        """Yields each principal with its interceptors chain"""
+        for _principal in principals:
+            yield _principal, self.resolve_principal(_principal)
+
+    def check_consistency(
+        self,
+        interceptors: Interceptors,
+        principals: list[dict],
+        sample_size: int = 10,
+    ) -> list[dict]:
+        """
+        Compares the local resolution against the gateway resolve endpoint for a random sample
+        of the principals. Returns the mismatches, with the principal and the names of the
+        interceptors (in order) resolved locally and by the gateway.
+        """
+        _sample: list[dict] = random.sample(
+            principals, min(sample_size, len(principals))
+        )
+        mismatches: list[dict] = []
+        for _principal in _sample:
+            _payload: dict = {
+                _key: _value for _key, _value in _principal.items() if _value
+            }
+            _remote = interceptors.get_target_resolve(_payload).json()
+            if isinstance(_remote, dict):
+                _remote = _remote.get("interceptors", [])
+            remote_names: list[str] = [
+                _definition["name"] for _definition in sorted(_remote, key=_chain_order)
+            ]
+            local_names: list[str] = [
+                _definition["name"]
+                for _definition in self.resolve_principal(_principal)
+            ]
+            if remote_names != local_names:
+                LOG.warning(
+                    f"Interceptors resolution mismatch for {_principal}: "
+                    f"{local_names} != {remote_names}"
+                )
+                mismatches.append(
+                    {
+                        "principal": _principal,
+                        "local": local_names,
+                        "remote": remote_names,
+                    }
+                )
+        return mismatches
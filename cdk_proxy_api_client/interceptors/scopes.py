@@ -0,0 +1,97 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Interceptors scopes helpers.
+
+A scope is a dict using the same keys as :meth:`Interceptors.generate_interceptor_path`:
+
+* ``{"is_global": True}``
+* ``{"vcluster_name": "vc"}``
+* ``{"vcluster_name": "vc", "username": "user"}``
+* ``{"vcluster_name": "vc", "group_name": "group"}``
+* ``{"username": "user"}`` / ``{"group_name": "group"}`` (passthrough)
+* ``{}`` (passthrough)
+"""
+
+from __future__ import annotations
+
+SCOPE_KEYS: tuple = ("is_global", "vcluster_name", "username", "group_name")
+
+
+def normalize_scope(scope: dict | None) -> dict:
+    """Validates the scope and returns it with all the scope keys set"""
+    if scope is None:
+        scope = {}
+    unknown = set(scope.keys()).difference(SCOPE_KEYS)
+    if unknown:
+        raise ValueError("Invalid scope keys", unknown, "Must be one of", SCOPE_KEYS)
+    _scope: dict = {
+        "is_global": bool(scope.get("is_global", False)),
+        "vcluster_name": scope.get("vcluster_name") or None,
+        "username": scope.get("username") or None,
+        "group_name": scope.get("group_name") or None,
+    }
+    if _scope["username"] and _scope["group_name"]:
+        raise ValueError("username and group_name are mutually exclusive")
+    if _scope["is_global"]:
+        _scope.update({"vcluster_name": None, "username": None, "group_name": None})
+    return _scope
+
+
+def scope_key(scope: dict) -> tuple:
+    """Hashable representation of a scope"""
+    _scope = normalize_scope(scope)
+    return tuple(_scope[_key] for _key in SCOPE_KEYS)
+
+
+def scope_label(scope: dict) -> str:
+    """Human-readable representation of a scope, i.e. vcluster=vc/username=user"""
+    _scope = normalize_scope(scope)
+    if _scope["is_global"]:
+        return "global"
+    parts: list[str] = [
+        (
+            f"vcluster={_scope['vcluster_name']}"
+            if _scope["vcluster_name"]
+            else "passthrough"
+        )
+    ]
+    if _scope["username"]:
+        parts.append(f"username={_scope['username']}")
+    elif _scope["group_name"]:
+        parts.append(f"group={_scope['group_name']}")
+    return "/".join(parts)
+
+
+def scope_from_definition(definition: dict) -> dict:
+    """
+    Returns the scope of an interceptor definition, as returned by the gateway listings
+    (i.e. :meth:`Interceptors.get_all_gw_interceptors`).
+    The scope details are either at the root of the definition, or in ``scope``.
+    Definitions are global only when flagged so (``global``, or the ``/global`` scope),
+    and the ``passthrough`` vcluster is the passthrough scope.
+
+    :raises ValueError: when the definition has no vcluster, username, group nor global flag
+    """
+    _scope = definition.get("scope")
+    if _scope in ("global", "/global") or definition.get("global"):
+        return normalize_scope({"is_global": True})
+    if not isinstance(_scope, dict):
+        _scope = definition
+    if _scope.get("global"):
+        return normalize_scope({"is_global": True})
+    vcluster_name = _scope.get("vcluster", _scope.get("vCluster"))
+    username = _scope.get("username")
+    group_name = _scope.get("group", _scope.get("groupName"))
+    if vcluster_name is None and not username and not group_name:
+        raise ValueError(
+            f"Interceptor {definition.get('name')} definition has no scope", _scope
+        )
+    return normalize_scope(
+        {
+            "vcluster_name": None if vcluster_name == "passthrough" else vcluster_name,
+            "username": username,
+            "group_name": group_name,
+        }
+    )
@@ -0,0 +1,443 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Local SQLite copy of the gateway inventory: vclusters, topic mappings, concentration
+rules, user mappings and interceptors.
+
+The store is filled from the list endpoints, refreshed per vcluster, and kept up to date
+for the changes made through the same client when attached. It then answers inventory
+queries with SQL, without network access.
+
+.. code-block:: python
+
+    store = InventoryStore(proxy, "inventory.db")
+    store.refresh()
+    store.attach()
+    store.query(
+        "SELECT * FROM topic_mappings WHERE read_only AND vcluster GLOB ?", ["team-*"]
+    )
+
+The passthrough objects, and the scope columns of the interceptors that do not apply,
+are stored with an empty string instead of NULL, so that they are part of the primary keys.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from collections.abc import Iterable
+from threading import RLock
+from typing import TYPE_CHECKING
+
+from cdk_proxy_api_client.common.concurrency import map_concurrently
+from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.interceptors.scopes import scope_from_definition
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.proxy_api import ProxyClient
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS vclusters (
+    name TEXT PRIMARY KEY,
+    refreshed_at REAL
+);
+CREATE TABLE IF NOT EXISTS topic_mappings (
+    vcluster TEXT NOT NULL,
+    logical_topic TEXT NOT NULL,
+    physical_topic TEXT,
+    read_only INTEGER NOT NULL DEFAULT 0,
+    type TEXT,
+    cluster_id TEXT,
+    PRIMARY KEY (vcluster, logical_topic)
+);
+CREATE INDEX IF NOT EXISTS topic_mappings_physical ON topic_mappings (physical_topic);
+CREATE TABLE IF NOT EXISTS concentration_rules (
+    vcluster TEXT NOT NULL,
+    pattern TEXT NOT NULL,
+    physical_topic TEXT,
+    physical_topic_compacted TEXT,
+    physical_topic_compacted_deleted TEXT,
+    cluster_id TEXT,
+    PRIMARY KEY (vcluster, pattern)
+);
+CREATE TABLE IF NOT EXISTS user_mappings (
+    vcluster TEXT NOT NULL,
+    username TEXT NOT NULL,
+    principal TEXT,
+    groups TEXT NOT NULL DEFAULT '[]',
+    PRIMARY KEY (vcluster, username)
+);
+CREATE TABLE IF NOT EXISTS interceptors (
+    is_global INTEGER NOT NULL DEFAULT 0,
+    vcluster TEXT NOT NULL DEFAULT '',
+    username TEXT NOT NULL DEFAULT '',
+    group_name TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL,
+    plugin_class TEXT,
+    priority INTEGER,
+    config TEXT,
+    PRIMARY KEY (is_global, vcluster, username, group_name, name)
+);
+CREATE INDEX IF NOT EXISTS interceptors_name ON interceptors (name);
+"""
+
+
+def _topic_mapping_row(vcluster: str, mapping: dict) -> tuple:
+    return (
+        vcluster,
+        mapping.get("logicalTopicName"),
+        mapping.get("physicalTopicName"),
+        1 if mapping.get("readOnly") else 0,
+        mapping.get("type", "alias"),
+        mapping.get("clusterId"),
+    )
+
+
+def _concentration_rule_row(vcluster: str, rule: dict) -> tuple:
+    return (
+        vcluster,
+        rule.get("pattern"),
+        rule.get("physicalTopicName"),
+        rule.get("physicalTopicCompactedName"),
+        rule.get("physicalTopicCompactedDeletedName"),
+        rule.get("clusterId"),
+    )
+
+
+def _user_mapping_row(vcluster: str | None, identity: dict) -> tuple:
+    return (
+        vcluster or "",
+        identity.get("username"),
+        identity.get("principal") or identity.get("username"),
+        json.dumps(list(identity.get("groups") or [])),
+    )
+
+
+def _interceptor_row(scope: dict, name: str, config: dict) -> tuple:
+    if scope.get("is_global"):
+        scope = {"is_global": True}
+    return (
+        1 if scope.get("is_global") else 0,
+        scope.get("vcluster_name") or "",
+        scope.get("username") or "",
+        scope.get("group_name") or "",
+        name,
+        config.get("pluginClass"),
+        config.get("priority"),
+        json.dumps(config.get("config")),
+    )
+
+
+class InventoryStore:
+    """SQLite store of the gateway inventory. See the module documentation"""
+
+    def __init__(self, proxy: ProxyClient, path: str = ":memory:"):
+        """
+        :param ProxyClient proxy: the client to fetch the inventory with
+        :param str path: the SQLite database file. In memory by default
+        """
+        self.proxy = proxy
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = RLock()
+        with self._lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.detach()
+        self.connection.close()
+
+    def __enter__(self) -> InventoryStore:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def query(self, sql: str, parameters: Iterable | dict = ()) -> list[dict]:
+        """Runs a SQL query on the store, and returns the rows as dicts"""
+        with self._lock:
+            return [dict(_row) for _row in self.connection.execute(sql, parameters)]
+
+    def topic_mappings(
+        self, vcluster_glob: str = "*", read_only: bool = None
+    ) -> list[dict]:
+        """
+        Topic mappings of the vclusters matching the glob pattern, i.e. ``team-*``
+
+        :param str vcluster_glob: GLOB pattern of the vclusters names
+        :param bool read_only: only the read-only (True) or writable (False) mappings
+        """
+        sql: str = "SELECT * FROM topic_mappings WHERE vcluster GLOB ?"
+        parameters: list = [vcluster_glob]
+        if read_only is not None:
+            sql += " AND read_only = ?"
+            parameters.append(1 if read_only else 0)
+        return self.query(f"{sql} ORDER BY vcluster, logical_topic", parameters)
+
+    def vclusters(self) -> list[str]:
+        return [
+            _row["name"] for _row in self.query("SELECT name FROM vclusters ORDER BY 1")
+        ]
+
+    def _fetch_vcluster(self, vcluster: str | None) -> dict:
+        if vcluster is None:
+            return {
+                "user_mappings": UserMappings(self.proxy).list_mappings_detailed(None)
+            }
+        vclusters_app = VirtualClusters(self.proxy)
+        return {
+            "topic_mappings": vclusters_app.list_vcluster_topic_mappings(
+                vcluster, as_list=True
+            ),
+            "concentration_rules": vclusters_app.get_concentration_rules(
+                vcluster
+            ).json(),
+            "user_mappings": UserMappings(self.proxy).list_mappings_detailed(vcluster),
+        }
+
+    def refresh(
+        self,
+        vclusters: Iterable[str | None] = None,
+        max_workers: int = None,
+    ) -> dict[str | None, Exception]:
+        """
+        Fetches the inventory of the vclusters concurrently, and replaces it in the store.
+        The other vclusters are left untouched. Interceptors are fetched once, and
+        replaced for the refreshed vclusters.
+
+        :param vclusters: the vclusters to refresh, None for passthrough. All the gateway
+          vclusters, passthrough and global objects if not set
+        :param int max_workers: maximum number of concurrent requests
+        :returns: the fetch errors of the vclusters which were not refreshed
+        """
+        full: bool = vclusters is None
+        if full:
+            vclusters = [
+                *VirtualClusters(self.proxy).list_vclusters(as_list=True)["vclusters"],
+                None,
+            ]
+        vclusters = list(vclusters)
+        interceptors: list[dict] | dict = (
+            Interceptors(self.proxy).get_all_gw_interceptors().json()
+        )
+        if isinstance(interceptors, dict):
+            interceptors = interceptors.get("interceptors", [])
+        errors: dict[str | None, Exception] = {}
+        refreshed: list[str] = []
+        for _vcluster, _inventory, _error in map_concurrently(
+            self._fetch_vcluster,
+            vclusters,
+            max_workers=max_workers,
+            ordered=False,
+            limiter=self.proxy.client.limiter,
+        ):
+            if _error is not None:
+                errors[_vcluster] = _error
+                continue
+            self.set_vcluster(_vcluster, **_inventory)
+            refreshed.append(_vcluster or "")
+        self._set_interceptors(interceptors, refreshed, full)
+        if full:
+            for _vcluster in set(self.vclusters()).difference(vclusters):
+                self.remove_vcluster(_vcluster)
+        return errors
+
+    def remove_vcluster(self, vcluster: str) -> None:
+        """Removes the vcluster objects from the store"""
+        with self._lock, self.connection as _db:
+            for _table, _column in [
+                ("vclusters", "name"),
+                ("topic_mappings", "vcluster"),
+                ("concentration_rules", "vcluster"),
+                ("user_mappings", "vcluster"),
+                ("interceptors", "vcluster"),
+            ]:
+                _db.execute(f"DELETE FROM {_table} WHERE {_column} = ?", (vcluster,))
+
+    def set_vcluster(
+        self,
+        vcluster: str | None,
+        topic_mappings: list[dict] = None,
+        concentration_rules: list[dict] = None,
+        user_mappings: list[dict] = None,
+    ) -> None:
+        """Replaces the objects of the vcluster (None for passthrough) in the store"""
+        with self._lock, self.connection as _db:
+            if vcluster is not None:
+                _db.execute(
+                    "INSERT OR REPLACE INTO vclusters VALUES (?, ?)",
+                    (vcluster, time.time()),
+                )
+            if topic_mappings is not None:
+                _db.execute(
+                    "DELETE FROM topic_mappings WHERE vcluster = ?", (vcluster,)
+                )
+                _db.executemany(
+                    "INSERT OR REPLACE INTO topic_mappings VALUES (?, ?, ?, ?, ?, ?)",
+                    (_topic_mapping_row(vcluster, _m) for _m in topic_mappings),
+                )
+            if concentration_rules is not None:
+                _db.execute(
+                    "DELETE FROM concentration_rules WHERE vcluster = ?", (vcluster,)
+                )
+                _db.executemany(
+                    "INSERT OR REPLACE INTO concentration_rules VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        _concentration_rule_row(vcluster, _rule)
+                        for _rule in concentration_rules
+                    ),
+                )
+            if user_mappings is not None:
+                _db.execute(
+                    "DELETE FROM user_mappings WHERE vcluster = ?", (vcluster or "",)
+                )
+                _db.executemany(
+                    "INSERT OR REPLACE INTO user_mappings VALUES (?, ?, ?, ?)",
+                    (_user_mapping_row(vcluster, _user) for _user in user_mappings),
+                )
+
+    def _set_interceptors(
+        self, interceptors: list[dict], vclusters: list[str], full: bool
+    ) -> None:
+        rows: list[tuple] = []
+        for _definition in interceptors:
+            try:
+                _scope: dict = scope_from_definition(_definition)
+            except ValueError as error:
+                LOG.warning(f"Skipping interceptor: {error}")
+                continue
+            if full or (
+                not _scope.get("is_global")
+                and (_scope.get("vcluster_name") or "") in vclusters
+            ):
+                rows.append(
+                    _interceptor_row(_scope, _definition.get("name"), _definition)
+                )
+        with self._lock, self.connection as _db:
+            if full:
+                _db.execute("DELETE FROM interceptors")
+            else:
+                _db.executemany(
+                    "DELETE FROM interceptors WHERE NOT is_global AND vcluster = ?",
+                    ((_vcluster,) for _vcluster in vclusters),
+                )
+            _db.executemany(
+                "INSERT OR REPLACE INTO interceptors VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def attach(self) -> None:
+        """Updates the store on the changes made through the same client"""
+        self.proxy.add_listener(self.on_change)
+
+    def detach(self) -> None:
+        self.proxy.remove_listener(self.on_change)
+
+    def on_change(self, app_path: str, action: str, details: dict) -> None:
+        handler = getattr(self, f"_on_{action}", None)
+        if handler is None:
+            return
+        with self._lock, self.connection as _db:
+            handler(_db, details)
+
+    @staticmethod
+    def _on_create_vcluster_user_token(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "INSERT OR IGNORE INTO vclusters VALUES (?, NULL)", (details["vcluster"],)
+        )
+
+    def _on_create_vcluster_topic_mapping(self, _db: sqlite3.Connection, details: dict):
+        self._on_create_vcluster_user_token(_db, details)
+        _db.execute(
+            "INSERT OR REPLACE INTO topic_mappings VALUES (?, ?, ?, ?, ?, ?)",
+            _topic_mapping_row(details["vcluster"], details),
+        )
+
+    @staticmethod
+    def _on_delete_vcluster_topic_mapping(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "DELETE FROM topic_mappings WHERE vcluster = ? AND logical_topic = ?",
+            (details["vcluster"], details["logical_topic_name"]),
+        )
+
+    @staticmethod
+    def _on_delete_vcluster_topics_mappings(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "DELETE FROM topic_mappings WHERE vcluster = ?", (details["vcluster"],)
+        )
+
+    @staticmethod
+    def _on_reroute_vcluster_topic_mappings(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "INSERT OR IGNORE INTO vclusters VALUES (?, NULL)",
+            (details["dest_vcluster"],),
+        )
+        _db.execute(
+            "INSERT OR REPLACE INTO topic_mappings SELECT ?, logical_topic, physical_topic,"
+            " read_only, type, cluster_id FROM topic_mappings WHERE vcluster = ?",
+            (details["dest_vcluster"], details["src_vcluster"]),
+        )
+        _db.execute(
+            "DELETE FROM topic_mappings WHERE vcluster = ?", (details["src_vcluster"],)
+        )
+
+    @staticmethod
+    def _on_create_concentration_rule(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "INSERT OR REPLACE INTO concentration_rules VALUES (?, ?, ?, ?, ?, ?)",
+            _concentration_rule_row(details["vcluster_name"], details),
+        )
+
+    @staticmethod
+    def _on_delete_concentration_rule(_db: sqlite3.Connection, details: dict):
+        if details.get("pattern"):
+            _db.execute(
+                "DELETE FROM concentration_rules WHERE vcluster = ? AND pattern = ?",
+                (details["vcluster_name"], details["pattern"]),
+            )
+        else:
+            _db.execute(
+                "DELETE FROM concentration_rules WHERE vcluster = ?",
+                (details["vcluster_name"],),
+            )
+
+    @staticmethod
+    def _on_create_mapping(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "INSERT OR REPLACE INTO user_mappings VALUES (?, ?, ?, ?)",
+            _user_mapping_row(details["vcluster_name"], details),
+        )
+
+    _on_update_mapping = _on_create_mapping
+
+    @staticmethod
+    def _on_delete_mapping(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "DELETE FROM user_mappings WHERE vcluster = ? AND username = ?",
+            (details["vcluster_name"] or "", details["username"]),
+        )
+
+    @staticmethod
+    def _on_create_interceptor(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "INSERT OR REPLACE INTO interceptors VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            _interceptor_row(
+                details, details["interceptor_name"], details["interceptor_config"]
+            ),
+        )
+
+    _on_update_interceptor = _on_create_interceptor
+
+    @staticmethod
+    def _on_delete_interceptor(_db: sqlite3.Connection, details: dict):
+        _db.execute(
+            "DELETE FROM interceptors WHERE is_global = ? AND vcluster = ?"
+            " AND username = ? AND group_name = ? AND name = ?",
+            _interceptor_row(details, details["interceptor_name"], {})[:5],
+        )
@@ -0,0 +1,221 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Load generation against the gateway admin API.
+
+Replays a weighted mix of client operations, at a target rate (open loop) or as fast as
+the concurrency allows (closed loop), and reports the throughput, latency percentiles and
+errors per operation. Errors are counted by HTTP status code, or by exception type.
+
+.. code-block:: python
+
+    harness = LoadHarness(
+        proxy,
+        {"list_vcluster_topic_mappings": 70, "create_interceptor": 20, "create_vcluster_user_token": 10},
+        vclusters=["vcluster-0"],
+        concurrency=20,
+        rate=200,
+    )
+    report = harness.run(duration=30)
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections.abc import Callable
+from itertools import count
+from typing import TYPE_CHECKING
+
+from cdk_proxy_api_client.errors import ProxyGenericException
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.proxy_api import ProxyClient
+
+LOADGEN_INTERCEPTOR: dict = {
+    "pluginClass": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+    "priority": 100,
+    "config": {"topic": "loadgen-.*", "acks": {"value": [-1], "action": "INFO"}},
+}
+
+Operation = Callable[["ProxyClient", str, int], object]
+
+OPERATIONS: dict[str, Operation] = {
+    "list_vclusters": lambda _proxy, _vc, _seq: VirtualClusters(
+        _proxy
+    ).list_vclusters(),
+    "list_vcluster_topic_mappings": lambda _proxy, _vc, _seq: VirtualClusters(
+        _proxy
+    ).list_vcluster_topic_mappings(_vc),
+    "create_vcluster_topic_mapping": lambda _proxy, _vc, _seq: VirtualClusters(
+        _proxy
+    ).create_vcluster_topic_mapping(_vc, f"loadgen-{_seq}", f"loadgen-{_seq}"),
+    "get_concentration_rules": lambda _proxy, _vc, _seq: VirtualClusters(
+        _proxy
+    ).get_concentration_rules(_vc),
+    "create_vcluster_user_token": lambda _proxy, _vc, _seq: VirtualClusters(
+        _proxy
+    ).create_vcluster_user_token(_vc, f"loadgen-{_seq}", lifetime_in_seconds=60),
+    "get_all_gw_interceptors": lambda _proxy, _vc, _seq: Interceptors(
+        _proxy
+    ).get_all_gw_interceptors(),
+    "create_interceptor": lambda _proxy, _vc, _seq: Interceptors(
+        _proxy
+    ).create_interceptor(f"loadgen-{_seq}", LOADGEN_INTERCEPTOR, vcluster_name=_vc),
+    "upsert_interceptor": lambda _proxy, _vc, _seq: Interceptors(
+        _proxy
+    ).upsert_interceptor(
+        f"loadgen-upsert-{_seq % 100}", LOADGEN_INTERCEPTOR, vcluster_name=_vc
+    ),
+    "get_target_resolve": lambda _proxy, _vc, _seq: Interceptors(
+        _proxy
+    ).get_target_resolve({"vcluster": _vc}),
+    "list_mappings": lambda _proxy, _vc, _seq: UserMappings(_proxy).list_mappings(_vc),
+    "create_mapping": lambda _proxy, _vc, _seq: UserMappings(_proxy).create_mapping(
+        f"loadgen-{_seq}", groups=["loadgen"], vcluster_name=_vc
+    ),
+}
+
+
+def percentile(sorted_values: list[float], ratio: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    _rank = max(int(round(ratio * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(_rank, len(sorted_values) - 1)]
+
+
+def error_name(error: Exception) -> str:
+    if isinstance(error, ProxyGenericException):
+        return str(error.code)
+    return type(error).__name__
+
+
+class LoadHarness:
+    """Runs the operations mix through the client, from a pool of worker threads"""
+
+    def __init__(
+        self,
+        proxy: ProxyClient,
+        mix: dict[str, float],
+        vclusters: list[str] = None,
+        concurrency: int = 10,
+        rate: float = None,
+        operations: dict[str, Operation] = None,
+        seed: int = None,
+    ):
+        """
+        :param ProxyClient proxy: the client to run the operations with
+        :param dict mix: weight of each operation, i.e. {"list_vclusters": 70, "create_mapping": 30}
+        :param list vclusters: vclusters the operations are randomly spread across
+        :param int concurrency: number of worker threads
+        :param float rate: target operations per second. Unlimited if not set.
+        :param dict operations: operations to add to, or override, the built-in ones
+        :param int seed: random seed, for reproducible runs
+        """
+        self.proxy = proxy
+        self.operations: dict[str, Operation] = dict(OPERATIONS)
+        if operations:
+            self.operations.update(operations)
+        unknown = set(mix.keys()).difference(self.operations.keys())
+        if unknown:
+            raise ValueError(
+                "Unknown operations", unknown, "Must be one of", list(self.operations)
+            )
+        self.mix = mix
+        self._names: list[str] = list(mix.keys())
+        self._weights: list[float] = list(mix.values())
+        self.vclusters = vclusters or ["loadgen"]
+        self.concurrency = concurrency
+        self.rate = rate
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._latencies: dict[str, list[float]] = {}
+        self._errors: dict[str, dict[str, int]] = {}
+
+    def _pick(self) -> tuple[str, str]:
+        with self._lock:
+            return (
+                self.random.choices(self._names, weights=self._weights)[0],
+                self.random.choice(self.vclusters),
+            )
+
+    def _worker(self, tickets, start: float, deadline: float | None, total: int):
+        for _ticket in tickets:
+            if total is not None and _ticket >= total:
+                return
+            if self.rate:
+                _wait = start + _ticket / self.rate - time.perf_counter()
+                if _wait > 0:
+                    time.sleep(_wait)
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            _name, _vcluster = self._pick()
+            _error: Exception | None = None
+            _begin = time.perf_counter()
+            try:
+                self.operations[_name](self.proxy, _vcluster, _ticket)
+            except Exception as error:
+                _error = error
+            _latency = time.perf_counter() - _begin
+            with self._lock:
+                self._latencies.setdefault(_name, []).append(_latency)
+                if _error is not None:
+                    _errors = self._errors.setdefault(_name, {})
+                    _key = error_name(_error)
+                    _errors[_key] = _errors.get(_key, 0) + 1
+
+    def run(self, duration: float = None, requests: int = None) -> dict:
+        """
+        Runs the load until the duration is reached or the number of requests is sent.
+
+        :param float duration: seconds to run for
+        :param int requests: total number of operations to run
+        """
+        if duration is None and requests is None:
+            raise ValueError("One of duration or requests must be set")
+        self._latencies, self._errors = {}, {}
+        tickets = count()
+        start = time.perf_counter()
+        deadline = start + duration if duration is not None else None
+        workers = [
+            threading.Thread(
+                target=self._worker,
+                args=(tickets, start, deadline, requests),
+                daemon=True,
+            )
+            for _ in range(self.concurrency)
+        ]
+        for _worker in workers:
+            _worker.start()
+        for _worker in workers:
+            _worker.join()
+        return self.report(time.perf_counter() - start)
+
+    def report(self, elapsed: float) -> dict:
+        endpoints: dict = {}
+        total: int = 0
+        for _name, _latencies in self._latencies.items():
+            _sorted = sorted(_latencies)
+            total += len(_sorted)
+            endpoints[_name] = {
+                "count": len(_sorted),
+                "errors": sum(self._errors.get(_name, {}).values()),
+                "throughput_rps": round(len(_sorted) / elapsed, 2),
+                "p50_ms": round(percentile(_sorted, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(_sorted, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(_sorted, 0.99) * 1000, 3),
+                "max_ms": round(_sorted[-1] * 1000, 3),
+            }
+        return {
+            "duration_seconds": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+            "errors": {_name: dict(_errors) for _name, _errors in self._errors.items()},
+        }
@@ -0,0 +1,84 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""Runs a load test against a gateway admin API, or against the local emulator"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.emulator import GatewayEmulator
+from cdk_proxy_api_client.loadgen import OPERATIONS, LoadHarness
+from cdk_proxy_api_client.proxy_api import ProxyClient
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parses operation=weight,operation=weight"""
+    mix: dict[str, float] = {}
+    for _item in value.split(","):
+        _name, _, _weight = _item.partition("=")
+        mix[_name.strip()] = float(_weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Gateway admin API URL")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="conduktor")
+    parser.add_argument(
+        "--emulator",
+        action="store_true",
+        help="Runs against a local emulator seeded with the vclusters",
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="list_vcluster_topic_mappings=70,create_interceptor=20,create_vcluster_user_token=10",
+        help=f"operation=weight,... Operations: {', '.join(OPERATIONS)}",
+    )
+    parser.add_argument("--vclusters", default="vcluster-0", help="comma separated")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate", type=float, help="target operations per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="total number of operations")
+    parser.add_argument("--output", help="JSON report file path")
+    args = parser.parse_args()
+    if not args.url and not args.emulator:
+        parser.error("One of --url or --emulator is required")
+
+    vclusters: list[str] = args.vclusters.split(",")
+    emulator = None
+    url = args.url
+    if args.emulator:
+        emulator = GatewayEmulator().start()
+        for _vcluster in vclusters:
+            emulator.state.add_vcluster(_vcluster)
+        url = emulator.url
+    try:
+        proxy = ProxyClient(
+            ApiClient(url=url, username=args.username, password=args.password)
+        )
+        harness = LoadHarness(
+            proxy,
+            args.mix,
+            vclusters=vclusters,
+            concurrency=args.concurrency,
+            rate=args.rate,
+        )
+        report = harness.run(
+            duration=None if args.requests else args.duration, requests=args.requests
+        )
+    finally:
+        if emulator:
+            emulator.stop()
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as output_fd:
+            json.dump(report, output_fd, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Compact typed models of the gateway objects, for large inventories.
+
+The models use ``__slots__``, and intern the strings repeated across objects (vcluster
+names, physical topics, plugin classes, groups...), so that holding a fleet inventory
+costs a fraction of the decoded JSON dicts. The list methods return them with
+``as_models=True``.
+
+Keys of the payloads unknown to the models are kept in ``extra``, so ``as_dict()``
+returns the original payload.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from sys import intern
+from typing import Any
+
+from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.interceptors.scopes import scope_from_definition
+
+
+def _intern(value: Any) -> Any:
+    return intern(value) if isinstance(value, str) else value
+
+
+def _extra(data: dict, known: frozenset) -> dict | None:
+    if data.keys() <= known:
+        return None
+    return {_key: _value for _key, _value in data.items() if _key not in known}
+
+
+class Model(ABC):
+    """
+    Base of the models. ``_json_keys`` maps the attributes to the payload keys.
+
+    Models compare by value, and are not hashable: they hold mutable values (groups,
+    interceptors config, ``extra``...). Use their key attributes to index them.
+    """
+
+    __slots__ = ("extra",)
+    _json_keys: dict[str, str] = {}
+
+    @classmethod
+    @abstractmethod
+    def from_json(cls, data: dict, **kwargs) -> Model:
+        """Creates the model from the gateway payload"""
+
+    @classmethod
+    def from_json_list(cls, items: Iterable[dict], **kwargs) -> list:
+        from_json = cls.from_json
+        return [from_json(_item, **kwargs) for _item in items]
+
+    def as_dict(self) -> dict:
+        """Returns the object as in the gateway payloads"""
+        payload: dict = {
+            _key: getattr(self, _attribute)
+            for _attribute, _key in self._json_keys.items()
+            if getattr(self, _attribute) is not None
+        }
+        if self.extra:
+            payload.update(self.extra)
+        return payload
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, _attribute) == getattr(other, _attribute)
+            for _attribute in self.__slots__ + Model.__slots__
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        _values = ", ".join(
+            f"{_attribute}={getattr(self, _attribute)!r}"
+            for _attribute in self.__slots__
+        )
+        return f"{type(self).__name__}({_values})"
+
+
+class TopicMapping(Model):
+    """A vcluster topic mapping. See :meth:`VirtualClusters.list_vcluster_topic_mappings`"""
+
+    __slots__ = (
+        "vcluster",
+        "logical_topic",
+        "physical_topic",
+        "read_only",
+        "mapping_type",
+        "cluster_id",
+    )
+    _json_keys: dict[str, str] = {
+        "logical_topic": "logicalTopicName",
+        "physical_topic": "physicalTopicName",
+        "read_only": "readOnly",
+        "mapping_type": "type",
+        "cluster_id": "clusterId",
+    }
+    _known: frozenset = frozenset(_json_keys.values())
+
+    def __init__(
+        self,
+        vcluster: str | None,
+        logical_topic: str,
+        physical_topic: str,
+        read_only: bool = False,
+        mapping_type: str = "alias",
+        cluster_id: str = None,
+        extra: dict = None,
+    ):
+        self.vcluster = vcluster
+        self.logical_topic = logical_topic
+        self.physical_topic = physical_topic
+        self.read_only = read_only
+        self.mapping_type = mapping_type
+        self.cluster_id = cluster_id
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data: dict, vcluster: str = None) -> TopicMapping:
+        return cls(
+            _intern(vcluster),
+            data.get("logicalTopicName"),
+            _intern(data.get("physicalTopicName")),
+            data.get("readOnly", False),
+            _intern(data.get("type")),
+            _intern(data.get("clusterId")),
+            _extra(data, cls._known),
+        )
+
+
+class ConcentrationRule(Model):
+    """A vcluster concentration rule. See :meth:`VirtualClusters.get_concentration_rules`"""
+
+    __slots__ = (
+        "vcluster",
+        "pattern",
+        "physical_topic",
+        "physical_topic_compacted",
+        "physical_topic_compacted_deleted",
+        "cluster_id",
+    )
+    _json_keys: dict[str, str] = {
+        "pattern": "pattern",
+        "physical_topic": "physicalTopicName",
+        "physical_topic_compacted": "physicalTopicCompactedName",
+        "physical_topic_compacted_deleted": "physicalTopicCompactedDeletedName",
+        "cluster_id": "clusterId",
+    }
+    _known: frozenset = frozenset(_json_keys.values())
+
+    def __init__(
+        self,
+        vcluster: str | None,
+        pattern: str,
+        physical_topic: str,
+        physical_topic_compacted: str = None,
+        physical_topic_compacted_deleted: str = None,
+        cluster_id: str = None,
+        extra: dict = None,
+    ):
+        self.vcluster = vcluster
+        self.pattern = pattern
+        self.physical_topic = physical_topic
+        self.physical_topic_compacted = physical_topic_compacted
+        self.physical_topic_compacted_deleted = physical_topic_compacted_deleted
+        self.cluster_id = cluster_id
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data: dict, vcluster: str = None) -> ConcentrationRule:
+        return cls(
+            _intern(vcluster),
+            data.get("pattern"),
+            _intern(data.get("physicalTopicName")),
+            _intern(data.get("physicalTopicCompactedName")),
+            _intern(data.get("physicalTopicCompactedDeletedName")),
+            _intern(data.get("clusterId")),
+            _extra(data, cls._known),
+        )
+
+
+class UserMapping(Model):
+    """A user mapping. See :meth:`UserMappings.list_mappings_detailed`"""
+
+    __slots__ = ("vcluster", "username", "principal", "groups")
+    _json_keys: dict[str, str] = {
+        "username": "username",
+        "principal": "principal",
+        "groups": "groups",
+    }
+    _known: frozenset = frozenset(_json_keys.values())
+
+    def __init__(
+        self,
+        vcluster: str | None,
+        username: str,
+        principal: str = None,
+        groups: tuple[str, ...] = (),
+        extra: dict = None,
+    ):
+        self.vcluster = vcluster
+        self.username = username
+        self.principal = principal
+        self.groups = groups
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data: dict, vcluster: str = None) -> UserMapping:
+        return cls(
+            _intern(vcluster),
+            data.get("username"),
+            data.get("principal"),
+            tuple(intern(_group) for _group in data.get("groups") or ()),
+            _extra(data, cls._known),
+        )
+
+    def as_dict(self) -> dict:
+        payload = super().as_dict()
+        payload["groups"] = list(self.groups)
+        return payload
+
+
+class Interceptor(Model):
+    """
+    An interceptor definition. See :meth:`Interceptors.get_all_gw_interceptors`.
+    The scope is normalized as in :func:`scope_from_definition`, or None when the
+    definition has no scope, and the scope keys of the payload are kept in ``extra``.
+    """
+
+    __slots__ = ("name", "plugin_class", "priority", "config", "scope")
+    _json_keys: dict[str, str] = {
+        "name": "name",
+        "plugin_class": "pluginClass",
+        "priority": "priority",
+        "config": "config",
+    }
+    _known: frozenset = frozenset(_json_keys.values())
+
+    def __init__(
+        self,
+        name: str,
+        plugin_class: str,
+        priority: int = None,
+        config: dict = None,
+        scope: dict = None,
+        extra: dict = None,
+    ):
+        self.name = name
+        self.plugin_class = plugin_class
+        self.priority = priority
+        self.config = config
+        self.scope = scope
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data: dict) -> Interceptor:
+        try:
+            scope: dict | None = {
+                _key: _intern(_value)
+                for _key, _value in scope_from_definition(data).items()
+            }
+        except ValueError as error:
+            LOG.warning(error)
+            scope = None
+        return cls(
+            _intern(data.get("name")),
+            _intern(data.get("pluginClass")),
+            data.get("priority"),
+            data.get("config"),
+            scope,
+            _extra(data, cls._known),
+        )
+
+    @classmethod
+    def from_json_list(cls, items: Iterable[dict] | dict, **kwargs) -> list:
+        """Accepts the list of definitions, or the listings ``{"interceptors": [...]}``"""
+        if isinstance(items, dict):
+            items = items.get("interceptors", [])
+        return super().from_json_list(items, **kwargs)
+
+
+class Plugin(Model):
+    """A gateway plugin. See :meth:`Plugins.list_all_plugins`"""
+
+    __slots__ = ("plugin", "title", "description", "config_schema")
+    _json_keys: dict[str, str] = {
+        "plugin": "plugin",
+        "title": "title",
+        "description": "description",
+        "config_schema": "configSchema",
+    }
+    _known: frozenset = frozenset(_json_keys.values())
+
+    def __init__(
+        self,
+        plugin: str,
+        title: str = None,
+        description: str = None,
+        config_schema: dict = None,
+        extra: dict = None,
+    ):
+        self.plugin = plugin
+        self.title = title
+        self.description = description
+        self.config_schema = config_schema
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, data: dict) -> Plugin:
+        return cls(
+            _intern(data.get("plugin")),
+            data.get("title"),
+            data.get("description"),
+            data.get("configSchema"),
+            _extra(data, cls._known),
+        )
@@ -0,0 +1,320 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Runs the write operations of a JSONL file, with bounded concurrency, and resumes where
+a previous run stopped.
+
+Each line is an operation of the :class:`VirtualClusters`, :class:`UserMappings` or
+:class:`Interceptors` write methods (see :data:`cdk_proxy_api_client.unit_of_work.STAGES`):
+
+.. code-block:: json
+
+    {"application": "vclusters", "operation": "create_vcluster_topic_mapping",
+     "args": ["tenant-a", "orders", "tenant-a.orders"], "kwargs": {"read_only": true}}
+
+The file is read as a stream. Operations on the same object (same vcluster and topic,
+username, interceptor name and scope...) run in the file order, the others concurrently:
+an operation depending on another object (e.g. a topic mapping on the vcluster token)
+must be in a later run. An operation identical to the previous one on the same object is
+not sent again. When an operation fails, the next operations on the same object are not
+sent either, and are reported as blocked, so that a new run keeps their order.
+
+The progress is saved to the checkpoint file, with :func:`atomic_write`, every
+``checkpoint_every`` completed lines and at the end of the run: the line number below
+which all the lines completed (low watermark), the completed lines after it, with the
+digests of these lines, and the failed, invalid and blocked lines to retry. These last
+ones count as completed for the low watermark, so the checkpoint stays small whatever the
+number of failures. A new run of the same file skips the completed lines, and so only
+sends the lines to retry and the remaining ones. It refuses to resume when the digests do
+not match, i.e. when the file was edited or regenerated since the checkpoint.
+
+.. code-block:: python
+
+    report = OperationsRunner(proxy, "migration.jsonl", max_workers=20).run()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING
+
+from cdk_proxy_api_client.common.concurrency import DEFAULT_MAX_WORKERS
+from cdk_proxy_api_client.common.files import atomic_write
+from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.unit_of_work import STAGES, Operation
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.proxy_api import ApiApplication, ProxyClient
+
+
+def _line_digest(line: str) -> str:
+    return hashlib.blake2b(line.strip().encode(), digest_size=16).hexdigest()
+
+
+class OperationsRunner:
+    """Runs the operations of a JSONL file. See the module documentation"""
+
+    def __init__(
+        self,
+        proxy: ProxyClient,
+        file_path: str,
+        checkpoint_path: str = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        checkpoint_every: int = 100,
+    ):
+        """
+        :param ProxyClient proxy: the client to run the operations with
+        :param str file_path: path of the JSONL operations file
+        :param str checkpoint_path: path of the checkpoint file. Defaults to the operations
+          file path with the ``.checkpoint`` suffix
+        :param int max_workers: maximum number of concurrent requests
+        :param int checkpoint_every: number of completed lines between two checkpoints
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1. Got", max_workers)
+        self.file_path = os.path.abspath(file_path)
+        self.checkpoint_path = checkpoint_path or f"{self.file_path}.checkpoint"
+        self.max_workers = max_workers
+        self.checkpoint_every = checkpoint_every
+        self.applications: dict[str, ApiApplication] = {
+            "vclusters": VirtualClusters(proxy),
+            "user_mappings": UserMappings(proxy),
+            "interceptors": Interceptors(proxy),
+        }
+        self.low_watermark: int = 0
+        self.completed: dict[int, str] = {}
+        self.retry: set[int] = set()
+        self._watermark_digest = hashlib.blake2b(digest_size=16)
+
+    def load_checkpoint(self) -> None:
+        """
+        Loads the progress of the previous runs, if any.
+
+        :raises ValueError: when the checkpoint is the one of another file, or the file
+          lines it covers changed since
+        """
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path) as checkpoint_fd:
+            checkpoint: dict = json.load(checkpoint_fd)
+        if checkpoint.get("file_path") != self.file_path:
+            raise ValueError(
+                f"{self.checkpoint_path} is the checkpoint of",
+                checkpoint.get("file_path"),
+                "not",
+                self.file_path,
+            )
+        low_watermark: int = checkpoint["low_watermark"]
+        completed: dict[int, str] = {
+            int(_line_number): _digest
+            for _line_number, _digest in checkpoint["completed"].items()
+        }
+        last_line: int = max([low_watermark, *completed])
+        watermark_digest = hashlib.blake2b(digest_size=16)
+        changed: list[int] = []
+        lines_count: int = 0
+        with open(self.file_path) as operations_fd:
+            for lines_count, _line in enumerate(operations_fd, 1):
+                if lines_count > last_line:
+                    break
+                _digest = _line_digest(_line)
+                if lines_count <= low_watermark:
+                    watermark_digest.update(_digest.encode())
+                elif completed.get(lines_count, _digest) != _digest:
+                    changed.append(lines_count)
+        if lines_count < last_line:
+            changed.append(last_line)
+        if watermark_digest.hexdigest() != checkpoint["watermark_digest"]:
+            changed.insert(0, low_watermark)
+        if changed:
+            raise ValueError(
+                f"{self.file_path} changed since the checkpoint {self.checkpoint_path}"
+                f" (line {changed[0]}). Remove the checkpoint to run the file again"
+            )
+        self.low_watermark = low_watermark
+        self.completed = completed
+        self.retry = set(checkpoint.get("retry", []))
+        self._watermark_digest = watermark_digest
+
+    def save_checkpoint(self) -> None:
+        atomic_write(
+            self.checkpoint_path,
+            json.dumps(
+                {
+                    "file_path": self.file_path,
+                    "low_watermark": self.low_watermark,
+                    "watermark_digest": self._watermark_digest.hexdigest(),
+                    "completed": {
+                        str(_line_number): self.completed[_line_number]
+                        for _line_number in sorted(self.completed)
+                    },
+                    "retry": sorted(self.retry),
+                }
+            ).encode(),
+        )
+
+    def is_done(self, line_number: int) -> bool:
+        return line_number not in self.retry and (
+            line_number <= self.low_watermark or line_number in self.completed
+        )
+
+    def _complete(
+        self, line_number: int, line_digest: str, retry: bool = False
+    ) -> None:
+        """Marks a line done, or to retry on the next run, and moves the low watermark"""
+        if line_number in self.retry:
+            if not retry:
+                self.retry.discard(line_number)
+            return
+        if retry:
+            self.retry.add(line_number)
+        self.completed[line_number] = line_digest
+        while self.low_watermark + 1 in self.completed:
+            self.low_watermark += 1
+            self._watermark_digest.update(
+                self.completed.pop(self.low_watermark).encode()
+            )
+
+    def operation(self, definition: dict) -> Operation:
+        """The operation of a line definition"""
+        _application = self.applications.get(definition.get("application"))
+        if _application is None:
+            raise ValueError(
+                "application must be one of",
+                list(self.applications),
+                "got",
+                definition.get("application"),
+            )
+        _name = definition.get("operation")
+        if _name not in STAGES or not hasattr(_application, _name):
+            raise ValueError(
+                f"{type(_application).__name__}.{_name} is not a supported write operation"
+            )
+        return Operation(
+            getattr(_application, _name),
+            tuple(definition.get("args", ())),
+            dict(definition.get("kwargs", {})),
+        )
+
+    def _read(
+        self,
+    ) -> Iterator[tuple[int, str, str | None, Operation | None, str | None]]:
+        """
+        Yields (line number, line digest, operation digest, operation, error).
+        Empty lines have no operation
+        """
+        with open(self.file_path) as operations_fd:
+            for _line_number, _line in enumerate(operations_fd, 1):
+                _line_hash: str = _line_digest(_line)
+                _line = _line.strip()
+                if not _line:
+                    yield _line_number, _line_hash, None, None, None
+                    continue
+                try:
+                    _definition: dict = json.loads(_line)
+                    _operation = self.operation(_definition)
+                except (ValueError, TypeError) as error:
+                    _error: str = f"{type(error).__name__}: {error}"
+                    yield _line_number, _line_hash, None, None, _error
+                    continue
+                _digest: str = hashlib.blake2b(
+                    json.dumps(_definition, sort_keys=True).encode(), digest_size=16
+                ).hexdigest()
+                yield _line_number, _line_hash, _digest, _operation, None
+
+    def run(self) -> dict:
+        """
+        Runs the operations not completed by the previous runs.
+
+        :return: the number of operations ``succeeded``, ``resumed`` (completed by a
+          previous run), ``duplicates``, and the ``failed`` and ``blocked`` ones per line
+          number
+        """
+        self.load_checkpoint()
+        _start = time.perf_counter()
+        report: dict = {
+            "succeeded": 0,
+            "resumed": 0,
+            "duplicates": 0,
+            "failed": {},
+            "blocked": {},
+        }
+        last_digests: dict[tuple, str] = {}
+        failed_keys: dict[tuple, int] = {}
+        in_flight: dict[tuple, Future] = {}
+        pending: dict[Future, tuple[int, str, Operation]] = {}
+        since_checkpoint: int = 0
+
+        def collect() -> None:
+            nonlocal since_checkpoint
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for _future in done:
+                _line_number, _line_hash, _operation = pending.pop(_future)
+                _key: tuple = (_operation.vcluster, _operation.key)
+                if in_flight.get(_key) is _future:
+                    del in_flight[_key]
+                if _operation.status == "failed":
+                    LOG.warning(
+                        f"Line {_line_number} - {_operation.name} failed: {_operation.error}"
+                    )
+                    report["failed"][_line_number] = str(_operation.error)
+                    last_digests.pop(_key, None)
+                    failed_keys[_key] = _line_number
+                    self._complete(_line_number, _line_hash, retry=True)
+                else:
+                    report["succeeded"] += 1
+                    self._complete(_line_number, _line_hash)
+                since_checkpoint += 1
+            if since_checkpoint >= self.checkpoint_every:
+                self.save_checkpoint()
+                since_checkpoint = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for _line_number, _line_hash, _digest, _operation, _error in self._read():
+                if _error is not None:
+                    LOG.error(f"Line {_line_number} - invalid operation: {_error}")
+                    report["failed"][_line_number] = _error
+                    self._complete(_line_number, _line_hash, retry=True)
+                    continue
+                if _operation is None:
+                    self._complete(_line_number, _line_hash)
+                    continue
+                _key: tuple = (_operation.vcluster, _operation.key)
+                if self.is_done(_line_number):
+                    last_digests[_key] = _digest
+                    report["resumed"] += 1
+                    continue
+                while _key in in_flight:
+                    collect()
+                if _key in failed_keys:
+                    LOG.warning(
+                        f"Line {_line_number} - {_operation.name} blocked by the failed"
+                        f" line {failed_keys[_key]}"
+                    )
+                    report["blocked"][_line_number] = failed_keys[_key]
+                    self._complete(_line_number, _line_hash, retry=True)
+                    continue
+                if last_digests.get(_key) == _digest:
+                    report["duplicates"] += 1
+                    self._complete(_line_number, _line_hash)
+                    continue
+                last_digests[_key] = _digest
+                while len(pending) >= self.max_workers * 2:
+                    collect()
+                _future = executor.submit(_operation.run)
+                pending[_future] = (_line_number, _line_hash, _operation)
+                in_flight[_key] = _future
+            while pending:
+                collect()
+        self.save_checkpoint()
+        report["seconds"] = time.perf_counter() - _start
+        return report
@@ -8,6 +8,9 @@ from typing import Union
 from requests import Response
 
 from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.models import Plugin
+from cdk_proxy_api_client.plugins.cache import PluginsCatalogCache, listing_signature
+from cdk_proxy_api_client.plugins.validator import InterceptorConfigValidator
 from cdk_proxy_api_client.proxy_api import ApiApplication
 
 
@@ -15,13 +18,15 @@ class Plugins(ApiApplication):
     app_path: str = "admin/plugins"
 
     def list_all_plugins(
-        self, extended: bool = False, as_list: bool = False
+        self, extended: bool = False, as_list: bool = False, as_models: bool = False
     ) -> Response | list:
         """
         Docs: https://developers.conduktor.io/#tag/Plugins/operation/Plugins_v1_getPlugins
         Path: /admin/plugins/v1
         Docs: https://developers.conduktor.io/#tag/Plugins/operation/Plugins_v1_getPluginsExtended
         Path: /admin/plugins/v1/extended
+
+        :param bool as_models: return the plugins as :class:`Plugin`
         """
         _path = self.base_path
         if extended:
@@ -29,6 +34,45 @@ class Plugins(ApiApplication):
 
         LOG.debug(f"list_all_plugins path: {_path}")
         req = self.proxy.client.get(_path)
+        if as_models:
+            return Plugin.from_json_list(req.json()["plugins"])
         if as_list:
             return req.json()["plugins"]
         return req
+
+    def get_config_validator(
+        self, cache: PluginsCatalogCache = None
+    ) -> InterceptorConfigValidator:
+        """
+        Loads the extended plugins catalog once, to validate interceptors payloads locally.
+        See :class:`InterceptorConfigValidator`
+
+        :param PluginsCatalogCache cache: load the catalog from that cache
+        """
+        if cache is not None:
+            return InterceptorConfigValidator(cache.get())
+        return InterceptorConfigValidator.from_gateway(self)
+
+    def get_catalog_cache(
+        self,
+        gateway_version: str = None,
+        ttl: int | None = 86400,
+        cache_dir: str = None,
+        signature_ttl: int | None = 3600,
+    ) -> PluginsCatalogCache:
+        """
+        On-disk cache of the extended plugins catalog. See :class:`PluginsCatalogCache`
+
+        :param str gateway_version: version of the gateway, part of the cache key. When not
+          set, the digest of the plugins listing (without the schemas) is used instead, so
+          that a gateway upgrade changing the plugins gets a new cache entry
+        :param int signature_ttl: seconds the digest of the plugins listing is reused for,
+          without calling the gateway. See :func:`listing_signature`
+        """
+        if not gateway_version:
+            gateway_version = listing_signature(
+                self, cache_dir=cache_dir, ttl=signature_ttl
+            )
+        return PluginsCatalogCache(
+            self, gateway_version=gateway_version, ttl=ttl, cache_dir=cache_dir
+        )
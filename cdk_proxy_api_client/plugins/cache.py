@@ -0,0 +1,196 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Persistent on-disk cache of the gateway plugins catalog.
+
+The catalog is stored with :mod:`marshal`, which loads much faster than parsing the JSON
+payload again. Entries are keyed by the gateway URL and version, so that the catalog of a
+previous gateway version is not served after an upgrade, and hold the hash of the catalog
+content, so that a refresh only rewrites the file when the catalog changed.
+Files are written atomically, and are ignored when written by another Python version.
+
+When the gateway version is not known, the digest of the plugins listing (without the
+schemas) is used instead. It is kept in the cache directory too, and only fetched again
+from the gateway once older than its own TTL: see :func:`listing_signature`.
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import marshal
+import os
+import sys
+import time
+from typing import TYPE_CHECKING
+
+from cdk_proxy_api_client.common.files import atomic_write
+from cdk_proxy_api_client.common.logging import LOG
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.plugins import Plugins
+
+CACHE_MAGIC: bytes = (
+    b"CDKPC1-" + f"{sys.version_info[0]}.{sys.version_info[1]}".encode() + b"\n"
+)
+
+
+def default_cache_dir() -> str:
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "cdk_proxy_api_client",
+        "plugins",
+    )
+
+
+def listing_signature(
+    plugins: Plugins, cache_dir: str = None, ttl: int | None = 3600
+) -> str:
+    """
+    Digest of the gateway plugins listing, read from the cache directory if written less
+    than ``ttl`` seconds ago (None never expires), fetched from the gateway otherwise.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    url_key: str = hashlib.sha256(plugins.proxy.client.url.encode()).hexdigest()[:32]
+    signature_path: str = os.path.join(cache_dir, f"{url_key}.signature")
+    try:
+        _age = time.time() - os.stat(signature_path).st_mtime
+        if ttl is None or _age <= ttl:
+            with open(signature_path) as signature_fd:
+                signature = signature_fd.read().strip()
+            if signature:
+                return signature
+    except FileNotFoundError:
+        pass
+    listing: list = plugins.list_all_plugins(as_list=True)
+    signature = "plugins-" + (
+        hashlib.sha256(
+            json.dumps(listing, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()[:16]
+    )
+    atomic_write(signature_path, signature.encode())
+    return signature
+
+
+class PluginsCatalogCache:
+    """Caches the result of :meth:`Plugins.list_all_plugins` on disk"""
+
+    def __init__(
+        self,
+        plugins: Plugins,
+        gateway_version: str,
+        ttl: int | None = 86400,
+        cache_dir: str = None,
+        extended: bool = True,
+    ):
+        """
+        :param Plugins plugins: the plugins client
+        :param str gateway_version: gateway version (or catalog signature), part of the
+          cache key. See :meth:`Plugins.get_catalog_cache`
+        :param int ttl: number of seconds the catalog is valid for. None never expires.
+        :param str cache_dir: cache directory. Defaults to $XDG_CACHE_HOME/cdk_proxy_api_client/plugins
+        :param bool extended: cache the extended catalog
+        """
+        if not gateway_version:
+            raise ValueError("gateway_version is required, got", gateway_version)
+        self.plugins = plugins
+        self.gateway_version = gateway_version
+        self.ttl = ttl
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.extended = extended
+
+    @property
+    def cache_key(self) -> str:
+        return hashlib.sha256(
+            "|".join(
+                [
+                    self.plugins.proxy.client.url,
+                    self.gateway_version,
+                    "extended" if self.extended else "plugins",
+                ]
+            ).encode()
+        ).hexdigest()[:32]
+
+    @property
+    def cache_path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self.cache_key}.bin")
+
+    def _read_entry(self) -> dict | None:
+        try:
+            with open(self.cache_path, "rb") as cache_fd:
+                content = cache_fd.read()
+        except FileNotFoundError:
+            return None
+        if not content.startswith(CACHE_MAGIC):
+            return None
+        try:
+            return marshal.loads(content[len(CACHE_MAGIC) :])
+        except (EOFError, ValueError, TypeError) as error:
+            LOG.warning(f"Ignoring corrupted plugins cache {self.cache_path}: {error}")
+            return None
+
+    def is_expired(self) -> bool:
+        """The cache file age (last write or refresh) is used for the TTL"""
+        try:
+            _age = time.time() - os.stat(self.cache_path).st_mtime
+        except FileNotFoundError:
+            return True
+        return self.ttl is not None and _age > self.ttl
+
+    def load(self) -> dict | None:
+        """Returns the cache entry, or None when missing, expired or unreadable"""
+        if self.is_expired():
+            return None
+        return self._read_entry()
+
+    def store(self, plugins: list[dict]) -> dict:
+        """
+        Writes the catalog to the cache. When the content did not change, the cache file
+        only gets its modification time renewed.
+        """
+        content_hash: str = hashlib.sha256(
+            json.dumps(plugins, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()
+        current = self._read_entry()
+        if current and current["content_hash"] == content_hash:
+            os.utime(self.cache_path)
+            return current
+        entry: dict = {
+            "url": self.plugins.proxy.client.url,
+            "gateway_version": self.gateway_version,
+            "content_hash": content_hash,
+            "plugins": plugins,
+        }
+        atomic_write(self.cache_path, CACHE_MAGIC + marshal.dumps(entry))
+        return entry
+
+    def get(self) -> list[dict]:
+        """Returns the plugins catalog, from the cache if valid, from the gateway otherwise"""
+        entry = self.load()
+        if entry is not None:
+            return entry["plugins"]
+        return self.refresh()
+
+    def refresh(self) -> list[dict]:
+        """Fetches the catalog from the gateway and stores it"""
+        plugins: list[dict] = self.plugins.list_all_plugins(
+            extended=self.extended, as_list=True
+        )
+        return self.store(plugins)["plugins"]
+
+    @property
+    def content_hash(self) -> str | None:
+        entry = self.load()
+        return entry["content_hash"] if entry else None
+
+    def invalidate(self) -> None:
+        """Removes the cache entry of this gateway"""
+        if os.path.exists(self.cache_path):
+            os.remove(self.cache_path)
+
+    def clear(self) -> None:
+        """Removes all the cache entries of the cache directory"""
+        for _path in glob.glob(os.path.join(self.cache_dir, "*.bin")):
+            os.remove(_path)
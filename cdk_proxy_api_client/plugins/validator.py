@@ -0,0 +1,235 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Local validation of interceptors configurations against the gateway plugins catalog.
+
+The plugins catalog (:meth:`Plugins.list_all_plugins` with extended=True) is loaded once,
+and the configuration schema of each plugin is compiled into validation functions,
+so that interceptors payloads can be checked before any network write.
+
+Supported JSON schema keywords: type, required, properties, additionalProperties, items,
+enum, minimum, maximum, minLength, maxLength, pattern. Other keywords are ignored, and so
+are the patterns Python cannot compile (i.e. Java only syntax such as ``\p{L}``).
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from cdk_proxy_api_client.common.logging import LOG
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.plugins import Plugins
+
+PLUGIN_CLASS_KEYS: tuple = ("pluginClass", "plugin", "className")
+PLUGIN_SCHEMA_KEYS: tuple = ("configSchema", "configurationSchema", "schema")
+
+_JSON_TYPES: dict = {
+    "string": lambda _value: isinstance(_value, str),
+    "integer": lambda _value: isinstance(_value, int) and not isinstance(_value, bool),
+    "number": lambda _value: isinstance(_value, (int, float))
+    and not isinstance(_value, bool),
+    "boolean": lambda _value: isinstance(_value, bool),
+    "object": lambda _value: isinstance(_value, dict),
+    "array": lambda _value: isinstance(_value, list),
+    "null": lambda _value: _value is None,
+}
+
+SchemaCheck = Callable[[object, str, list], None]
+
+
+def compile_schema(schema: dict) -> SchemaCheck:
+    """
+    Compiles a JSON schema into a function called with the value, its path and the list
+    the errors get appended to.
+    """
+    checks: list[SchemaCheck] = []
+
+    if "type" in schema:
+        _types = (
+            schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        )
+        _type_checks = [_JSON_TYPES[_type] for _type in _types if _type in _JSON_TYPES]
+
+        def check_type(value, path: str, errors: list) -> None:
+            if _type_checks and not any(_check(value) for _check in _type_checks):
+                errors.append(f"{path}: expected {'|'.join(_types)}, got {value!r}")
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        _enum: list = schema["enum"]
+
+        def check_enum(value, path: str, errors: list) -> None:
+            if value not in _enum:
+                errors.append(f"{path}: {value!r} is not one of {_enum}")
+
+        checks.append(check_enum)
+
+    for _keyword, _compare, _message in (
+        ("minimum", lambda _value, _limit: _value < _limit, "lower than"),
+        ("maximum", lambda _value, _limit: _value > _limit, "greater than"),
+    ):
+        if _keyword in schema:
+            checks.append(_bound_check(schema[_keyword], _compare, _message))
+
+    for _keyword, _compare, _message in (
+        ("minLength", lambda _value, _limit: len(_value) < _limit, "shorter than"),
+        ("maxLength", lambda _value, _limit: len(_value) > _limit, "longer than"),
+    ):
+        if _keyword in schema:
+            checks.append(_length_check(schema[_keyword], _compare, _message))
+
+    if "pattern" in schema:
+        try:
+            _pattern = re.compile(schema["pattern"])
+        except re.error as error:
+            LOG.debug(f"Pattern {schema['pattern']!r} not checked: {error}")
+        else:
+
+            def check_pattern(value, path: str, errors: list) -> None:
+                if isinstance(value, str) and not _pattern.search(value):
+                    errors.append(
+                        f"{path}: {value!r} does not match {_pattern.pattern}"
+                    )
+
+            checks.append(check_pattern)
+
+    _required: list = schema.get("required", [])
+    _properties: dict = {
+        _name: compile_schema(_property)
+        for _name, _property in schema.get("properties", {}).items()
+    }
+    _additional = schema.get("additionalProperties", True)
+    _additional_check = (
+        compile_schema(_additional) if isinstance(_additional, dict) else None
+    )
+    if _required or _properties or _additional is not True:
+
+        def check_object(value, path: str, errors: list) -> None:
+            if not isinstance(value, dict):
+                return
+            for _name in _required:
+                if _name not in value:
+                    errors.append(f"{path}.{_name}: required property is missing")
+            for _name, _value in value.items():
+                if _name in _properties:
+                    _properties[_name](_value, f"{path}.{_name}", errors)
+                elif _additional is False:
+                    errors.append(f"{path}.{_name}: additional property not allowed")
+                elif _additional_check:
+                    _additional_check(_value, f"{path}.{_name}", errors)
+
+        checks.append(check_object)
+
+    if isinstance(schema.get("items"), dict):
+        _items_check = compile_schema(schema["items"])
+
+        def check_items(value, path: str, errors: list) -> None:
+            if isinstance(value, list):
+                for _index, _item in enumerate(value):
+                    _items_check(_item, f"{path}[{_index}]", errors)
+
+        checks.append(check_items)
+
+    def check(value, path: str, errors: list) -> None:
+        for _check in checks:
+            _check(value, path, errors)
+
+    return check
+
+
+def _bound_check(limit, compare: Callable, message: str) -> SchemaCheck:
+    def check_bound(value, path: str, errors: list) -> None:
+        if (
+            isinstance(value, (int, float))
+            and not isinstance(value, bool)
+            and compare(value, limit)
+        ):
+            errors.append(f"{path}: {value} is {message} {limit}")
+
+    return check_bound
+
+
+def _length_check(limit: int, compare: Callable, message: str) -> SchemaCheck:
+    def check_length(value, path: str, errors: list) -> None:
+        if isinstance(value, (str, list)) and compare(value, limit):
+            errors.append(f"{path}: {value!r} is {message} {limit}")
+
+    return check_length
+
+
+class InterceptorConfigValidator:
+    """
+    Validates interceptors payloads (pluginClass, priority, config) locally.
+    Plugins without a configuration schema in the catalog only get the plugin class checked.
+    """
+
+    def __init__(self, plugins: list[dict]):
+        self._validators: dict[str, SchemaCheck | None] = {}
+        for _plugin in plugins:
+            _plugin_class = next(
+                (_plugin[_key] for _key in PLUGIN_CLASS_KEYS if _plugin.get(_key)),
+                None,
+            )
+            if not _plugin_class:
+                continue
+            _schema = next(
+                (
+                    _plugin[_key]
+                    for _key in PLUGIN_SCHEMA_KEYS
+                    if isinstance(_plugin.get(_key), dict)
+                ),
+                None,
+            )
+            self._validators[_plugin_class] = (
+                compile_schema(_schema) if _schema else None
+            )
+
+    @classmethod
+    def from_gateway(cls, plugins: Plugins) -> InterceptorConfigValidator:
+        """Loads the extended plugins catalog with a single call to the gateway"""
+        return cls(plugins.list_all_plugins(extended=True, as_list=True))
+
+    @property
+    def plugin_classes(self) -> list[str]:
+        return list(self._validators.keys())
+
+    def validate(self, interceptor_config: dict) -> list[str]:
+        """Returns the list of errors of the interceptor payload. Empty when valid."""
+        errors: list[str] = []
+        if not isinstance(interceptor_config, dict):
+            return [f"interceptor: expected object, got {interceptor_config!r}"]
+        _plugin_class = interceptor_config.get("pluginClass")
+        if not _plugin_class:
+            errors.append("pluginClass: required property is missing")
+        elif _plugin_class not in self._validators:
+            errors.append(f"pluginClass: unknown plugin {_plugin_class}")
+        _priority = interceptor_config.get("priority")
+        if _priority is not None and (
+            not isinstance(_priority, int) or isinstance(_priority, bool)
+        ):
+            errors.append(f"priority: expected integer, got {_priority!r}")
+        _config = interceptor_config.get("config")
+        if _config is None:
+            errors.append("config: required property is missing")
+        elif not isinstance(_config, dict):
+            errors.append(f"config: expected object, got {_config!r}")
+        elif self._validators.get(_plugin_class):
+            self._validators[_plugin_class](_config, "config", errors)
+        return errors
+
+    def validate_many(self, interceptors: dict[str, dict]) -> dict[str, list[str]]:
+        """
+        Validates the interceptors payloads, indexed by name.
+        Returns the errors of the invalid interceptors only.
+        """
+        invalid: dict[str, list[str]] = {}
+        for _name, _config in interceptors.items():
+            _errors = self.validate(_config)
+            if _errors:
+                invalid[_name] = _errors
+        return invalid
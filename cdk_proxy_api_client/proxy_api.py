@@ -3,28 +3,72 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
+from threading import Lock
 from typing import TYPE_CHECKING
 
 from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.common.logging import LOG
 
 if TYPE_CHECKING:
     pass
 
 
 class ProxyClient:
+    """
+    Gateway API client given to the applications.
+
+    The API version is set per instance, so clients of different versions can be used
+    at the same time. A client, and the applications using it, can be shared between
+    threads: they hold no per-call state, the listeners are called from the thread
+    which made the change, and the :class:`ApiClient` sessions can be made per thread
+    with ``thread_local_sessions``.
+    """
+
     version: str = "v1"
 
-    def __init__(self, client: ApiClient):
+    def __init__(self, client: ApiClient, version: str = None):
+        """
+        :param ApiClient client: the HTTP client
+        :param str version: the API version. Defaults to :attr:`ProxyClient.version`
+        """
         self._client = client
+        if version is not None:
+            self.version = version
+        self._listeners: tuple[Callable[[str, str, dict], None], ...] = ()
+        self._listeners_lock = Lock()
 
     @property
     def client(self) -> ApiClient:
         return self._client
 
+    def add_listener(self, listener: Callable[[str, str, dict], None]) -> None:
+        """
+        Registers a function called after each successful change made through the applications
+        using this client, with the application path, the action and the change details.
+        """
+        with self._listeners_lock:
+            if listener not in self._listeners:
+                self._listeners = (*self._listeners, listener)
+
+    def remove_listener(self, listener: Callable[[str, str, dict], None]) -> None:
+        with self._listeners_lock:
+            self._listeners = tuple(
+                _listener for _listener in self._listeners if _listener != listener
+            )
+
+    def notify(self, app_path: str, action: str, **details) -> None:
+        """Calls the listeners. Listeners errors are logged, not raised."""
+        for _listener in self._listeners:
+            try:
+                _listener(app_path, action, details)
+            except Exception as error:
+                LOG.exception(f"Listener {_listener} failed for {action}: {error}")
+
     @classmethod
     def set_version(cls, version: str, client: ApiClient):
-        ProxyClient.version = version
-        return cls(client)
+        """Returns a client for the given API version. The other clients are not changed"""
+        return cls(client, version=version)
 
 
 class ApiApplication:
@@ -0,0 +1,248 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Runs per-vcluster jobs in a pool of processes, for the fleet-wide jobs where decoding,
+diffing and building the payloads keep a single interpreter busy.
+
+Each worker process creates its own :class:`ApiClient` (and HTTP session) once, from the
+settings of the parent client, and uses the API version of the parent :class:`ProxyClient`. When the parent client has adaptive concurrency enabled,
+each worker gets its own :class:`AdaptiveLimiter` with the same settings: the gateway
+then receives up to ``processes`` times the limit of requests at once. When the parent
+client records an audit log, each worker records the changes it makes to its own file,
+named after the parent one and the worker process ID (``audit.<pid>.jsonl`` for
+``audit.jsonl``), written after each job. Jobs are module-level functions taking the worker
+:class:`ProxyClient` and the vcluster name; their result is sent back serialized with
+:mod:`marshal`, so it must be made of plain types (dict, list, str, int, float, bool, None).
+
+.. code-block:: python
+
+    executor = ShardedExecutor(proxy, processes=8)
+    snapshots, errors = executor.run(snapshot_vcluster, vclusters)
+"""
+
+from __future__ import annotations
+
+import marshal
+import os
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.common.concurrency import map_concurrently
+from cdk_proxy_api_client.errors import ProxyGenericException
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.user_mappings.sync import UserMappingsSync
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+_worker_proxy: ProxyClient | None = None
+
+
+def client_settings(client: ApiClient) -> dict:
+    """Settings to create a client to the same gateway, in another process"""
+    return {
+        "url": client.url,
+        "username": client.username,
+        "password": client.password,
+        "ignore_ssl_errors": client._ignore_ssl_errors,
+        "timeout": client.timeout,
+        "thread_local_sessions": client._thread_local_sessions,
+        "pool_maxsize": client.pool_maxsize,
+        "adaptive_concurrency": client.limiter.settings()
+        if client.limiter is not None
+        else None,
+        "audit": client.audit_sink.settings()
+        if client.audit_sink is not None
+        else None,
+    }
+
+
+def worker_audit_path(file_path: str, pid: int) -> str:
+    """Path of the audit log of the worker process"""
+    _root, _extension = os.path.splitext(file_path)
+    return f"{_root}.{pid}{_extension}"
+
+
+def _init_worker(settings: dict, version: str) -> None:
+    global _worker_proxy
+    settings = dict(settings)
+    limiter_settings: dict | None = settings.pop("adaptive_concurrency", None)
+    audit_settings: dict | None = settings.pop("audit", None)
+    client = ApiClient(**settings)
+    if limiter_settings is not None:
+        client.enable_adaptive_concurrency(**limiter_settings)
+    if audit_settings is not None:
+        _file_path: str = audit_settings.pop("file_path")
+        client.enable_audit(
+            worker_audit_path(_file_path, os.getpid()), **audit_settings
+        )
+    _worker_proxy = ProxyClient(client, version=version)
+
+
+def _run_shard(function: Callable, vcluster: str, args: tuple, kwargs: dict) -> bytes:
+    """Runs the job in the worker, and returns the serialized (result, error) pair"""
+    try:
+        return marshal.dumps((function(_worker_proxy, vcluster, *args, **kwargs), None))
+    except Exception as error:
+        return marshal.dumps(
+            (
+                None,
+                (
+                    type(error).__name__,
+                    str(error),
+                    getattr(error, "code", None),
+                ),
+            )
+        )
+    finally:
+        if _worker_proxy.client.audit_sink is not None:
+            _worker_proxy.client.audit_sink.flush()
+
+
+def _shard_outcome(vcluster: str, payload: bytes) -> tuple[Any, Exception | None]:
+    result, error = marshal.loads(payload)
+    if error is None:
+        return result, None
+    _type, _message, _code = error
+    return None, ProxyGenericException(
+        _message, _code, {"vcluster": vcluster, "error": _type}
+    )
+
+
+class ShardedExecutor:
+    """Runs a job per vcluster in a pool of processes. See the module documentation"""
+
+    def __init__(self, proxy: ProxyClient, processes: int = None):
+        """
+        :param ProxyClient proxy: client which settings and API version the worker
+          clients are created from
+        :param int processes: number of worker processes. Defaults to the number of CPUs
+        """
+        self.settings = client_settings(proxy.client)
+        self.version = proxy.version
+        self.processes = processes or os.cpu_count() or 1
+
+    def map(
+        self,
+        function: Callable[..., Any],
+        vclusters: Iterable[str],
+        *args,
+        shards_data: dict[str, Any] = None,
+        ordered: bool = True,
+        **kwargs,
+    ) -> Iterator[tuple[str, Any, Exception | None]]:
+        """
+        Yields ``(vcluster, result, error)`` for each vcluster, in the input order or as
+        the jobs complete. Errors are returned as :class:`ProxyGenericException`.
+
+        :param function: module-level function ``function(proxy, vcluster, *args, **kwargs)``
+        :param vclusters: the vclusters to run the job for
+        :param dict shards_data: data of each vcluster, only sent to the worker running
+          the vcluster job, as ``function(proxy, vcluster, data, *args, **kwargs)``
+        :param bool ordered: yield the results in the vclusters order
+        """
+        with ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_init_worker,
+            initargs=(self.settings, self.version),
+        ) as executor:
+            futures: dict[Future, str] = {
+                executor.submit(
+                    _run_shard,
+                    function,
+                    _vcluster,
+                    args
+                    if shards_data is None
+                    else (shards_data.get(_vcluster), *args),
+                    kwargs,
+                ): _vcluster
+                for _vcluster in vclusters
+            }
+            for _future in futures if ordered else as_completed(futures):
+                _vcluster = futures[_future]
+                yield _vcluster, *_shard_outcome(_vcluster, _future.result())
+
+    def run(
+        self, function: Callable[..., Any], vclusters: Iterable[str], *args, **kwargs
+    ) -> tuple[dict[str, Any], dict[str, Exception]]:
+        """Runs the job for all the vclusters, and returns the results and errors per vcluster"""
+        results: dict[str, Any] = {}
+        errors: dict[str, Exception] = {}
+        for _vcluster, _result, _error in self.map(
+            function, vclusters, *args, ordered=False, **kwargs
+        ):
+            if _error is not None:
+                errors[_vcluster] = _error
+            else:
+                results[_vcluster] = _result
+        return results, errors
+
+
+def snapshot_vcluster(
+    proxy: ProxyClient, vcluster: str, max_workers: int = None
+) -> dict:
+    """Topic mappings, concentration rules, user mappings and interceptors of the vcluster"""
+    vclusters_app = VirtualClusters(proxy)
+    return {
+        "topic_mappings": vclusters_app.list_vcluster_topic_mappings(
+            vcluster, as_list=True
+        ),
+        "concentration_rules": vclusters_app.get_concentration_rules(vcluster).json(),
+        "user_mappings": UserMappings(proxy).list_mappings_detailed(
+            vcluster, max_workers=max_workers
+        ),
+        "interceptors": Interceptors(proxy)
+        .get_all_interceptor(vcluster_name=vcluster)
+        .json(),
+    }
+
+
+def sync_user_mappings(
+    proxy: ProxyClient,
+    vcluster: str,
+    desired: dict,
+    delete_missing: bool = False,
+    max_workers: int = None,
+) -> dict:
+    """
+    Reconciles the vcluster user mappings with ``desired``, as accepted by
+    :meth:`UserMappingsSync.sync_vcluster`. Use with ``shards_data``.
+    """
+    return UserMappingsSync(
+        UserMappings(proxy), max_workers=max_workers, delete_missing=delete_missing
+    ).sync_vcluster(vcluster, desired or {})
+
+
+def create_topic_mappings(
+    proxy: ProxyClient,
+    vcluster: str,
+    mappings: list[dict],
+    max_workers: int = None,
+) -> dict:
+    """
+    Creates the topic mappings of the vcluster, as returned by
+    :meth:`VirtualClusters.list_vcluster_topic_mappings`. Use with ``shards_data``.
+    """
+    vclusters_app = VirtualClusters(proxy)
+    report: dict = {"created": 0, "failed": {}}
+    for _mapping, _, _error in map_concurrently(
+        lambda _mapping: vclusters_app.create_vcluster_topic_mapping(
+            vcluster,
+            _mapping["logicalTopicName"],
+            _mapping["physicalTopicName"],
+            read_only=_mapping.get("readOnly", False),
+            cluster_id=_mapping.get("clusterId"),
+        ),
+        mappings or [],
+        max_workers=max_workers,
+        ordered=False,
+        limiter=proxy.client.limiter,
+    ):
+        if _error is not None:
+            report["failed"][_mapping["logicalTopicName"]] = str(_error)
+        else:
+            report["created"] += 1
+    return report
@@ -0,0 +1,324 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Collects write operations across :class:`VirtualClusters`, :class:`UserMappings` and
+:class:`Interceptors`, and runs them in parallel, in the order the gateway needs them.
+
+The operations are grouped by vcluster, and run in stages: token (which creates the
+vcluster), concentration rules, topic mappings, user mappings then interceptors.
+The operations of a stage run concurrently, except these on the same object (same topic,
+username, interceptor name and scope...) which run in the order they were added.
+The operations on a whole collection (deleting all the topic mappings or concentration
+rules of a vcluster, rerouting its topic mappings) wait for the operations added before
+them in the stage, and the operations added after them wait for them. A reroute belongs
+to both its source and destination vclusters.
+Different vclusters do not wait on each other otherwise.
+
+.. code-block:: python
+
+    uow = UnitOfWork(proxy, max_workers=20)
+    uow.vclusters.create_vcluster_user_token("tenant-a")
+    uow.vclusters.create_concentration_rule("tenant-a", "tenant-a.*", "concentrated")
+    uow.user_mappings.create_mapping("alice", groups=["admins"], vcluster_name="tenant-a")
+    uow.interceptors.upsert_interceptor("guard", config, vcluster_name="tenant-a")
+    summary = uow.flush()
+"""
+
+from __future__ import annotations
+
+import inspect
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any
+
+from cdk_proxy_api_client.common.concurrency import DEFAULT_MAX_WORKERS
+from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.proxy_api import ApiApplication, ProxyClient
+
+STAGES: dict[str, int] = {
+    "create_vcluster_user_token": 0,
+    "create_concentration_rule": 1,
+    "delete_concentration_rule": 1,
+    "create_vcluster_topic_mapping": 2,
+    "delete_vcluster_topic_mapping": 2,
+    "delete_vcluster_topics_mappings": 2,
+    "reroute_vcluster_topic_mappings": 2,
+    "create_mapping": 3,
+    "update_mapping": 3,
+    "delete_mapping": 3,
+    "create_interceptor": 4,
+    "update_interceptor": 4,
+    "upsert_interceptor": 4,
+    "delete_interceptor": 4,
+}
+
+_VCLUSTER_ARGS: tuple = ("vcluster", "vcluster_name", "src_vcluster")
+_BARRIERS: tuple = (
+    "delete_vcluster_topics_mappings",
+    "reroute_vcluster_topic_mappings",
+)
+_OBJECT_ARGS: tuple = (
+    "logical_topic_name",
+    "pattern",
+    "username",
+    "interceptor_name",
+    "is_global",
+    "group_name",
+)
+
+
+class Operation:
+    """A recorded call, and its outcome once flushed"""
+
+    __slots__ = (
+        "function",
+        "args",
+        "kwargs",
+        "vcluster",
+        "vclusters",
+        "stage",
+        "key",
+        "barrier",
+        "status",
+        "result",
+        "error",
+        "seconds",
+    )
+
+    def __init__(self, function: Callable, args: tuple, kwargs: dict):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        _arguments: dict = inspect.signature(function).bind(*args, **kwargs).arguments
+        self.vcluster: str | None = next(
+            (_arguments[_arg] for _arg in _VCLUSTER_ARGS if _arguments.get(_arg)),
+            None,
+        )
+        self.vclusters: tuple = tuple(
+            dict.fromkeys(
+                (self.vcluster, _arguments.get("dest_vcluster") or self.vcluster)
+            )
+        )
+        self.stage: int = STAGES[function.__name__]
+        self.barrier: bool = function.__name__ in _BARRIERS or (
+            function.__name__ == "delete_concentration_rule"
+            and not _arguments.get("pattern")
+        )
+        self.key: tuple = (
+            type(function.__self__).__name__,
+            *(_arguments.get(_arg) for _arg in _OBJECT_ARGS),
+        )
+        self.status: str = "pending"
+        self.result: Any = None
+        self.error: Exception | None = None
+        self.seconds: float | None = None
+
+    @property
+    def name(self) -> str:
+        return f"{type(self.function.__self__).__name__}.{self.function.__name__}"
+
+    def run(self) -> None:
+        _start = time.perf_counter()
+        try:
+            self.result = self.function(*self.args, **self.kwargs)
+            self.status = "succeeded"
+        except Exception as error:
+            self.error = error
+            self.status = "failed"
+        self.seconds = time.perf_counter() - _start
+
+    def as_dict(self) -> dict:
+        return {
+            "operation": self.name,
+            "vcluster": self.vcluster,
+            "status": self.status,
+            "error": str(self.error) if self.error else None,
+            "seconds": self.seconds,
+        }
+
+
+class _Recorder:
+    """Records the write methods calls of an application instead of running them"""
+
+    def __init__(self, unit: UnitOfWork, application: ApiApplication):
+        self._unit = unit
+        self._application = application
+
+    def __getattr__(self, name: str) -> Callable[..., Operation]:
+        if name not in STAGES or not hasattr(self._application, name):
+            raise AttributeError(
+                f"{type(self._application).__name__}.{name} is not a supported write operation"
+            )
+        method = getattr(self._application, name)
+        return lambda *args, **kwargs: self._unit.add(method, *args, **kwargs)
+
+
+class _VclusterPlan:
+    """
+    The stages of a vcluster, split in phases at the operations on a whole collection.
+    Each phase is made of chains of operations on the same object.
+    """
+
+    def __init__(self, operations: list[Operation]):
+        stages: dict[int, list[dict[tuple, deque]]] = {}
+        for _operation in operations:
+            _phases = stages.setdefault(_operation.stage, [{}])
+            if _operation.barrier:
+                _phases.append({_operation.key: deque([_operation])})
+                _phases.append({})
+            else:
+                _phases[-1].setdefault(_operation.key, deque()).append(_operation)
+        self.stages: deque[list[deque]] = deque(
+            list(_phase.values())
+            for _stage in sorted(stages)
+            for _phase in stages[_stage]
+            if _phase
+        )
+        self.remaining: int = 0
+        self.failed: bool = False
+
+    def next_stage(self) -> list[deque]:
+        """Returns the chains of the next phase"""
+        if not self.stages:
+            return []
+        chains = self.stages.popleft()
+        self.remaining = sum(len(_chain) for _chain in chains)
+        return chains
+
+    def skip_all(self) -> list[Operation]:
+        """Skips the remaining phases, and returns their operations"""
+        skipped: list[Operation] = []
+        for _chains in self.stages:
+            for _chain in _chains:
+                for _operation in _chain:
+                    _operation.status = "skipped"
+                    skipped.append(_operation)
+        self.stages.clear()
+        return skipped
+
+
+class UnitOfWork:
+    """Collects the operations to run, see the module documentation"""
+
+    def __init__(
+        self,
+        proxy: ProxyClient,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        stop_on_failure: bool = True,
+    ):
+        """
+        :param ProxyClient proxy: the client to run the operations with
+        :param int max_workers: maximum number of concurrent requests
+        :param bool stop_on_failure: skip the next stages of a vcluster when an operation
+          of the vcluster failed
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1. Got", max_workers)
+        self.max_workers = max_workers
+        self.stop_on_failure = stop_on_failure
+        self.operations: list[Operation] = []
+        self.vclusters = _Recorder(self, VirtualClusters(proxy))
+        self.user_mappings = _Recorder(self, UserMappings(proxy))
+        self.interceptors = _Recorder(self, Interceptors(proxy))
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def add(self, method: Callable, *args, **kwargs) -> Operation:
+        """Records a call of a write method of an application"""
+        operation = Operation(method, args, kwargs)
+        self.operations.append(operation)
+        return operation
+
+    def flush(self) -> dict:
+        """
+        Runs the recorded operations, and clears them.
+
+        A failed operation skips the next operations on the same object, and with
+        ``stop_on_failure``, the next stages of its vcluster.
+        """
+        operations, self.operations = self.operations, []
+        _start = time.perf_counter()
+        by_vcluster: dict[str | None, list[Operation]] = {}
+        for _operation in operations:
+            for _vcluster in _operation.vclusters:
+                by_vcluster.setdefault(_vcluster, []).append(_operation)
+        plans: dict[str | None, _VclusterPlan] = {
+            _vcluster: _VclusterPlan(_operations)
+            for _vcluster, _operations in by_vcluster.items()
+        }
+        chain_of: dict[tuple, deque] = {}
+        waiting: dict[int, list] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending: dict[Future, Operation] = {}
+
+            def submit(vcluster: str | None, chain: deque) -> None:
+                _operation = chain.popleft()
+                chain_of[(id(_operation), vcluster)] = chain
+                if _operation.status == "skipped":
+                    finish(_operation, vcluster)
+                    return
+                _waiting = waiting.setdefault(id(_operation), [])
+                _waiting.append(vcluster)
+                if len(_waiting) == len(_operation.vclusters):
+                    del waiting[id(_operation)]
+                    pending[executor.submit(_operation.run)] = _operation
+
+            def start_stage(vcluster: str | None) -> None:
+                for _chain in plans[vcluster].next_stage():
+                    submit(vcluster, _chain)
+
+            def finish(operation: Operation, vcluster: str | None) -> None:
+                _plan = plans[vcluster]
+                _chain = chain_of.pop((id(operation), vcluster))
+                _plan.remaining -= 1
+                if operation.status in ("failed", "skipped"):
+                    _plan.failed = True
+                    _plan.remaining -= len(_chain)
+                    for _skipped in _chain:
+                        _skipped.status = "skipped"
+                elif _chain:
+                    submit(vcluster, _chain)
+                if _plan.remaining:
+                    return
+                if not (_plan.failed and self.stop_on_failure):
+                    start_stage(vcluster)
+                    return
+                for _skipped in _plan.skip_all():
+                    for _vcluster in waiting.pop(id(_skipped), []):
+                        finish(_skipped, _vcluster)
+
+            for _vcluster in plans:
+                start_stage(_vcluster)
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for _future in done:
+                    _operation = pending.pop(_future)
+                    if _operation.status == "failed":
+                        LOG.warning(
+                            f"{_operation.vcluster or 'passthrough'} - "
+                            f"{_operation.name} failed: {_operation.error}"
+                        )
+                    for _vcluster in _operation.vclusters:
+                        finish(_operation, _vcluster)
+        return self.summary(operations, time.perf_counter() - _start)
+
+    @staticmethod
+    def summary(operations: list[Operation], elapsed: float) -> dict:
+        counts: dict[str, int] = {"succeeded": 0, "failed": 0, "skipped": 0}
+        for _operation in operations:
+            counts[_operation.status] = counts.get(_operation.status, 0) + 1
+        return {
+            **counts,
+            "seconds": elapsed,
+            "operations": [_operation.as_dict() for _operation in operations],
+        }
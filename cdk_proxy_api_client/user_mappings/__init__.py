@@ -3,11 +3,16 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterator
 from urllib.parse import quote
 
 from requests import Response
 
+from cdk_proxy_api_client.common.concurrency import map_concurrently
+from cdk_proxy_api_client.common.logging import LOG
+from cdk_proxy_api_client.models import UserMapping
 from cdk_proxy_api_client.proxy_api import ApiApplication
+from cdk_proxy_api_client.user_mappings.index import UserMappingsIndex
 
 
 class UserMappings(ApiApplication):
@@ -63,6 +68,9 @@ class UserMappings(ApiApplication):
         else:
             _path: str = self.base_path
         req = self.proxy.client.post(_path, json=_payload)
+        self.proxy.notify(
+            self.app_path, "create_mapping", vcluster_name=vcluster_name, **_payload
+        )
         return req
 
     def update_mapping(
@@ -85,6 +93,9 @@ class UserMappings(ApiApplication):
             username, principal, groups, vcluster_name
         )
         req = self.proxy.client.put(_path, json=_payload)
+        self.proxy.notify(
+            self.app_path, "update_mapping", vcluster_name=vcluster_name, **_payload
+        )
         return req
 
     def delete_mapping(self, username: str, vcluster_name: str = None) -> Response:
@@ -102,6 +113,12 @@ class UserMappings(ApiApplication):
         else:
             _path: str = f"{self.base_path}/username/{quote(username)}"
         req = self.proxy.client.delete(_path)
+        self.proxy.notify(
+            self.app_path,
+            "delete_mapping",
+            vcluster_name=vcluster_name,
+            username=username,
+        )
         return req
 
     def get_user_mapping(self, username: str, vcluster_name: str = None) -> Response:
@@ -132,14 +149,75 @@ class UserMappings(ApiApplication):
         req = self.proxy.client.get(_path)
         return req
 
-    def list_mappings_detailed(self, vcluster_name: str = None) -> list[dict]:
+    def iter_mappings_detailed(
+        self,
+        vcluster_name: str = None,
+        max_workers: int = None,
+        ordered: bool = True,
+        failures: dict = None,
+    ) -> Iterator[dict]:
+        """
+        Retrieves the list of usernames, then the identity of each user concurrently.
+        Identities are yielded as they are retrieved, in the usernames order or in completion order.
+
+        Per-user failures (i.e. user deleted during the listing) do not stop the listing:
+        they are logged and, if ``failures`` is set, stored in it by username.
+
+        :param str vcluster_name: the vcluster to list the users of. Passthrough if not set.
+        :param int max_workers: maximum number of concurrent requests
+        :param bool ordered: yield the identities in the usernames order
+        :param dict failures: dict the exceptions are stored into, by username
+        """
+        usernames: list[str] = self.list_mappings(vcluster_name=vcluster_name).json()
+        for _username, _identity, _error in map_concurrently(
+            lambda _user: self.get_user_mapping(_user, vcluster_name).json(),
+            usernames,
+            max_workers=max_workers,
+            ordered=ordered,
+            limiter=self.proxy.client.limiter,
+        ):
+            if _error is not None:
+                LOG.warning(f"Failed to retrieve user mapping {_username}: {_error}")
+                if failures is not None:
+                    failures[_username] = _error
+                continue
+            yield _identity
+
+    def list_mappings_detailed(
+        self,
+        vcluster_name: str = None,
+        max_workers: int = None,
+        failures: dict = None,
+        as_models: bool = False,
+    ) -> list[dict] | list[UserMapping]:
         """
         Given the list of mappings only returns the usernames, we might want the full picture
         about the identity.
-        For each username, retrieve the whole identity.
+        For each username, retrieve the whole identity. See :meth:`iter_mappings_detailed`
+
+        :param bool as_models: return the identities as :class:`UserMapping`
         """
-        usernames: list[str] = self.list_mappings(vcluster_name=vcluster_name).json()
-        identities: list[dict] = []
-        for username in usernames:
-            identities.append(self.get_user_mapping(username, vcluster_name).json())
-        return identities
+        mappings = self.iter_mappings_detailed(
+            vcluster_name, max_workers=max_workers, failures=failures
+        )
+        if as_models:
+            return UserMapping.from_json_list(mappings, vcluster=vcluster_name)
+        return list(mappings)
+
+    def get_index(
+        self,
+        vclusters: list[str | None] = None,
+        max_workers: int = None,
+        attach: bool = True,
+    ) -> UserMappingsIndex:
+        """
+        Builds the groups/usernames index of the vclusters user mappings (passthrough only
+        by default). When attached, the index is updated by the changes made through this client.
+        See :class:`UserMappingsIndex`
+        """
+        index = UserMappingsIndex(self).build(
+            vclusters if vclusters is not None else [None], max_workers=max_workers
+        )
+        if attach:
+            index.attach()
+        return index
@@ -0,0 +1,134 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Username to groups and group to usernames index of the user mappings, per vcluster.
+The passthrough mappings are indexed with ``None`` as the vcluster name.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from cdk_proxy_api_client.common.concurrency import map_concurrently
+from cdk_proxy_api_client.common.logging import LOG
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.user_mappings import UserMappings
+
+
+class UserMappingsIndex:
+    """
+    Built from the gateway user mappings, and kept up to date in place when
+    attached, for the changes made with :class:`UserMappings` through the same client.
+    """
+
+    def __init__(self, user_mappings: UserMappings):
+        self.user_mappings = user_mappings
+        self._users_groups: dict[str | None, dict[str, frozenset]] = {}
+        self._groups_users: dict[str | None, dict[str, set]] = {}
+        self._lock = Lock()
+
+    def build(
+        self,
+        vclusters: Iterable[str | None] = (None,),
+        max_workers: int = None,
+    ) -> UserMappingsIndex:
+        """
+        Lists the usernames of all the vclusters, then retrieves all the identities
+        with a single pool of workers.
+
+        :param vclusters: the vclusters to index. None for passthrough
+        :param int max_workers: maximum number of concurrent requests
+        """
+        vclusters = list(vclusters)
+        users: list[tuple] = []
+        for _vcluster, _usernames, _error in map_concurrently(
+            lambda _vcluster: self.user_mappings.list_mappings(_vcluster).json(),
+            vclusters,
+            max_workers=max_workers,
+            limiter=self.user_mappings.proxy.client.limiter,
+        ):
+            if _error is not None:
+                raise _error
+            users += [(_vcluster, _username) for _username in _usernames]
+
+        with self._lock:
+            for _vcluster in vclusters:
+                self._users_groups[_vcluster] = {}
+                self._groups_users[_vcluster] = {}
+        for (_vcluster, _username), _identity, _error in map_concurrently(
+            lambda _user: self.user_mappings.get_user_mapping(
+                _user[1], _user[0]
+            ).json(),
+            users,
+            max_workers=max_workers,
+            ordered=False,
+            limiter=self.user_mappings.proxy.client.limiter,
+        ):
+            if _error is not None:
+                LOG.warning(
+                    f"{_vcluster or 'passthrough'} - failed to index {_username}: {_error}"
+                )
+                continue
+            self.set_user(_vcluster, _username, _identity.get("groups") or [])
+        return self
+
+    def attach(self) -> None:
+        """Updates the index on the user mappings changes made through the same client"""
+        self.user_mappings.proxy.add_listener(self.on_change)
+
+    def detach(self) -> None:
+        self.user_mappings.proxy.remove_listener(self.on_change)
+
+    def on_change(self, app_path: str, action: str, details: dict) -> None:
+        if app_path != self.user_mappings.app_path:
+            return
+        if action in ["create_mapping", "update_mapping"]:
+            self.set_user(
+                details["vcluster_name"], details["username"], details["groups"]
+            )
+        elif action == "delete_mapping":
+            self.remove_user(details["vcluster_name"], details["username"])
+
+    def set_user(
+        self, vcluster_name: str | None, username: str, groups: Iterable[str]
+    ) -> None:
+        groups = frozenset(groups)
+        with self._lock:
+            _users_groups = self._users_groups.setdefault(vcluster_name, {})
+            _groups_users = self._groups_users.setdefault(vcluster_name, {})
+            for _group in _users_groups.get(username, frozenset()).difference(groups):
+                _groups_users[_group].discard(username)
+                if not _groups_users[_group]:
+                    del _groups_users[_group]
+            for _group in groups:
+                _groups_users.setdefault(_group, set()).add(username)
+            _users_groups[username] = groups
+
+    def remove_user(self, vcluster_name: str | None, username: str) -> None:
+        self.set_user(vcluster_name, username, ())
+        with self._lock:
+            self._users_groups.get(vcluster_name, {}).pop(username, None)
+
+    def groups_of(self, username: str, vcluster_name: str = None) -> frozenset:
+        """Groups of the user in the vcluster"""
+        with self._lock:
+            return self._users_groups.get(vcluster_name, {}).get(username, frozenset())
+
+    def users_of(self, group_name: str, vcluster_name: str = None) -> frozenset:
+        """Usernames of the members of the group in the vcluster"""
+        with self._lock:
+            return frozenset(
+                self._groups_users.get(vcluster_name, {}).get(group_name, ())
+            )
+
+    def usernames(self, vcluster_name: str = None) -> list[str]:
+        with self._lock:
+            return list(self._users_groups.get(vcluster_name, {}).keys())
+
+    def groups(self, vcluster_name: str = None) -> list[str]:
+        with self._lock:
+            return list(self._groups_users.get(vcluster_name, {}).keys())
@@ -0,0 +1,210 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Synchronization of user mappings from an identity provider export.
+
+The export is either JSONL, one principal per line::
+
+    {"username": "user", "principal": "user@corp", "groups": ["team-a"], "vcluster": "vc"}
+
+or CSV, with the ``username``, ``principal``, ``groups`` and ``vcluster`` columns,
+the groups separated by ``;``. ``principal`` and ``vcluster`` are optional, principals with
+no vcluster are passthrough mappings.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import time
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from cdk_proxy_api_client.common.concurrency import map_concurrently
+from cdk_proxy_api_client.common.logging import LOG
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.user_mappings import UserMappings
+
+
+def read_export(
+    file_path: str, file_format: str = None, groups_separator: str = ";"
+) -> Iterator[dict]:
+    """
+    Streams the principals of the export file, normalized to username, principal,
+    groups and vcluster.
+
+    :param str file_path: path to the export file
+    :param str file_format: csv or jsonl. Detected from the file extension if not set.
+    :param str groups_separator: separator of the groups in CSV files
+    """
+    if file_format is None:
+        file_format = "csv" if file_path.lower().endswith(".csv") else "jsonl"
+    if file_format not in ["csv", "jsonl"]:
+        raise ValueError("file_format must be one of csv or jsonl. Got", file_format)
+    with open(file_path, newline="") as export_fd:
+        if file_format == "csv":
+            for _row in csv.DictReader(export_fd):
+                _groups = _row.get("groups") or ""
+                yield _normalize_principal(
+                    _row,
+                    [_group for _group in _groups.split(groups_separator) if _group],
+                )
+        else:
+            for _line in export_fd:
+                if _line.strip():
+                    _record: dict = json.loads(_line)
+                    yield _normalize_principal(_record, _record.get("groups") or [])
+
+
+def _normalize_principal(record: dict, groups: list[str]) -> dict:
+    if not record.get("username"):
+        raise ValueError("username is required for each principal", record)
+    return {
+        "username": record["username"],
+        "principal": record.get("principal") or record["username"],
+        "groups": sorted(set(groups)),
+        "vcluster": record.get("vcluster") or None,
+    }
+
+
+def _mapping_state(identity: dict) -> tuple:
+    return (
+        identity.get("principal") or identity["username"],
+        frozenset(identity.get("groups") or []),
+    )
+
+
+class UserMappingsSync:
+    """
+    Diffs the principals of an export against the gateway user mappings, by username,
+    principal and groups set, and only applies the changes.
+    """
+
+    def __init__(
+        self,
+        user_mappings: UserMappings,
+        max_workers: int = None,
+        delete_missing: bool = False,
+    ):
+        """
+        :param UserMappings user_mappings: the user mappings client
+        :param int max_workers: maximum number of concurrent requests, per vcluster
+        :param bool delete_missing: delete the mappings of users not in the export
+        """
+        self.user_mappings = user_mappings
+        self.max_workers = max_workers
+        self.delete_missing = delete_missing
+
+    def sync_file(
+        self,
+        file_path: str,
+        file_format: str = None,
+        vclusters: list[str | None] = None,
+    ) -> dict:
+        """
+        Synchronizes the user mappings from the export file.
+        Returns the report per vcluster (passthrough for the mappings with no vcluster).
+
+        :param str file_path: path to the export file
+        :param str file_format: csv or jsonl. Detected from the file extension if not set.
+        :param list vclusters: only synchronize these vclusters (None for passthrough)
+        """
+        desired: dict[str | None, dict[str, tuple]] = {}
+        for _principal in read_export(file_path, file_format):
+            if vclusters is not None and _principal["vcluster"] not in vclusters:
+                continue
+            desired.setdefault(_principal["vcluster"], {})[_principal["username"]] = (
+                _principal["principal"],
+                frozenset(_principal["groups"]),
+            )
+        if vclusters is not None:
+            for _vcluster in vclusters:
+                desired.setdefault(_vcluster, {})
+        return {
+            _vcluster or "passthrough": self.sync_vcluster(_vcluster, _mappings)
+            for _vcluster, _mappings in desired.items()
+        }
+
+    def sync_vcluster(self, vcluster_name: str | None, desired: dict) -> dict:
+        """
+        Synchronizes the user mappings of a vcluster (or passthrough).
+
+        :param str vcluster_name: the vcluster name. None for passthrough
+        :param dict desired: the (principal, groups set) tuple of each username
+        """
+        report: dict = {
+            "created": 0,
+            "updated": 0,
+            "deleted": 0,
+            "unchanged": 0,
+            "failed": 0,
+            "errors": {},
+        }
+        start = time.perf_counter()
+        fetch_failures: dict = {}
+        current: dict[str, tuple] = {
+            _identity["username"]: _mapping_state(_identity)
+            for _identity in self.user_mappings.iter_mappings_detailed(
+                vcluster_name,
+                max_workers=self.max_workers,
+                ordered=False,
+                failures=fetch_failures,
+            )
+        }
+        report["fetch_seconds"] = round(time.perf_counter() - start, 3)
+
+        operations: list[tuple] = []
+        for _username, _state in desired.items():
+            if _username in fetch_failures:
+                report["failed"] += 1
+                report["errors"][_username] = str(fetch_failures[_username])
+            elif _username not in current:
+                operations.append(("created", _username, _state))
+            elif current[_username] != _state:
+                operations.append(("updated", _username, _state))
+            else:
+                report["unchanged"] += 1
+        if self.delete_missing:
+            operations += [
+                ("deleted", _username, None)
+                for _username in current
+                if _username not in desired and _username not in fetch_failures
+            ]
+
+        def apply(operation: tuple):
+            _action, _username, _state = operation
+            if _action == "deleted":
+                return self.user_mappings.delete_mapping(_username, vcluster_name)
+            _principal, _groups = _state
+            if _action == "created":
+                return self.user_mappings.create_mapping(
+                    _username, _principal, sorted(_groups), vcluster_name
+                )
+            return self.user_mappings.update_mapping(
+                _username, _principal, sorted(_groups), vcluster_name
+            )
+
+        start = time.perf_counter()
+        for _operation, _, _error in map_concurrently(
+            apply,
+            operations,
+            max_workers=self.max_workers,
+            ordered=False,
+            limiter=self.user_mappings.proxy.client.limiter,
+        ):
+            if _error is not None:
+                report["failed"] += 1
+                report["errors"][_operation[1]] = str(_error)
+            else:
+                report[_operation[0]] += 1
+        report["apply_seconds"] = round(time.perf_counter() - start, 3)
+        LOG.info(
+            f"{vcluster_name or 'passthrough'} - user mappings sync: "
+            + ", ".join(
+                f"{_key}={report[_key]}"
+                for _key in ["created", "updated", "deleted", "unchanged", "failed"]
+            )
+        )
+        return report
@@ -3,6 +3,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Iterable
 from typing import Union
 from urllib.parse import quote
 
@@ -14,7 +15,10 @@ from cdk_proxy_api_client.exceptions import (
     TopicOrVirtualClusterNotFound,
     VirtualClusterNotFound,
 )
+from cdk_proxy_api_client.models import ConcentrationRule, TopicMapping
 from cdk_proxy_api_client.proxy_api import ApiApplication
+from cdk_proxy_api_client.vclusters.fan_in import PhysicalTopicsIndex
+from cdk_proxy_api_client.vclusters.table import TopicMappingsTable
 
 
 class VirtualClusters(ApiApplication):
@@ -47,6 +51,12 @@ class VirtualClusters(ApiApplication):
         req = self.proxy.client.post(
             _path, headers={"Accept": "application/json"}, json=payload
         )
+        self.proxy.notify(
+            self.app_path,
+            "create_vcluster_user_token",
+            vcluster=vcluster,
+            username=username,
+        )
         if token_only:
             return req.json()["token"]
         return req
@@ -81,18 +91,30 @@ class VirtualClusters(ApiApplication):
         req = self.proxy.client.post(
             _path, headers={"Accept": "application/json"}, json=payload
         )
+        self.proxy.notify(
+            self.app_path,
+            "create_concentration_rule",
+            vcluster_name=vcluster_name,
+            **payload,
+        )
         return req
 
-    def get_concentration_rules(self, vcluster_name: str) -> Response:
+    def get_concentration_rules(
+        self, vcluster_name: str, as_models: bool = False
+    ) -> Response | list[ConcentrationRule]:
         """
         Docs: https://developers.conduktor.io/#tag/Virtual-Clusters/operation/ConcentrationRule_getConcentrationRules
         Path: /admin/vclusters/v1/vcluster/{vcluster}/concentration-rules
+
+        :param bool as_models: return the rules as :class:`ConcentrationRule`
         """
         _path: str = f"{self.base_path}/vcluster/{vcluster_name}/concentration-rules"
         LOG.debug(f"get_concentration_rules path {_path}")
         req = self.proxy.client.get(
             _path,
         )
+        if as_models:
+            return ConcentrationRule.from_json_list(req.json(), vcluster=vcluster_name)
         return req
 
     def delete_concentration_rule(
@@ -112,6 +134,12 @@ class VirtualClusters(ApiApplication):
         req = self.proxy.client.delete(
             _path,
         )
+        self.proxy.notify(
+            self.app_path,
+            "delete_concentration_rule",
+            vcluster_name=vcluster_name,
+            pattern=pattern,
+        )
         return req
 
     def create_vcluster_topic_mapping(
@@ -143,19 +171,31 @@ class VirtualClusters(ApiApplication):
             payload["clusterId"] = cluster_id
         LOG.debug(f"create_vcluster_topic_mapping path: {_path}")
         req = self.proxy.client.post(_path, json=payload)
+        self.proxy.notify(
+            self.app_path,
+            "create_vcluster_topic_mapping",
+            vcluster=vcluster,
+            logicalTopicName=logical_topic_name,
+            **payload,
+        )
         return req
 
     def list_vcluster_topic_mappings(
-        self, vcluster: str, as_list: bool = False
-    ) -> Response | list[dict]:
+        self, vcluster: str, as_list: bool = False, as_models: bool = False
+    ) -> Response | list[dict] | list[TopicMapping]:
         """
         Docs: https://developers.conduktor.io/#tag/Virtual-Clusters/operation/Clusters_v1_listClusterTopicMapping
         Path: /admin/vclusters/v1/vcluster/{vcluster}/topics
+
+        :param bool as_list: return the decoded mappings
+        :param bool as_models: return the mappings as :class:`TopicMapping`
         """
         _path = f"{self.base_path}/vcluster/{vcluster}/topics"
         LOG.debug(f"list_vcluster_topic_mappings path: {_path}")
         try:
             req = self.proxy.client.get(_path, headers={"Accept": "application/json"})
+            if as_models:
+                return TopicMapping.from_json_list(req.json(), vcluster=vcluster)
             if as_list:
                 return req.json()
             return req
@@ -171,9 +211,12 @@ class VirtualClusters(ApiApplication):
         LOG.debug(f"delete_vcluster_topics_mappings path: {_path}")
         try:
             req = self.proxy.client.delete(_path)
-            return req
         except GenericNotFound as error:
             raise VirtualClusterNotFound(vcluster)
+        self.proxy.notify(
+            self.app_path, "delete_vcluster_topics_mappings", vcluster=vcluster
+        )
+        return req
 
     def delete_vcluster_topic_mapping(
         self, vcluster: str, logical_topic_name: str
@@ -188,9 +231,15 @@ class VirtualClusters(ApiApplication):
         LOG.debug(f"delete_tenant_topic_mapping path {_path}")
         try:
             req = self.proxy.client.delete(_path)
-            return req
         except GenericNotFound:
             raise TopicOrVirtualClusterNotFound(vcluster, logical_topic_name)
+        self.proxy.notify(
+            self.app_path,
+            "delete_vcluster_topic_mapping",
+            vcluster=vcluster,
+            logical_topic_name=logical_topic_name,
+        )
+        return req
 
     def reroute_vcluster_topic_mappings(
         self, src_vcluster: str, dest_vcluster: str
@@ -204,4 +253,35 @@ class VirtualClusters(ApiApplication):
         """
         _path: str = f"{self.base_path}/rerouting/{src_vcluster}/{dest_vcluster}"
         req = self.proxy.client.post(_path)
+        self.proxy.notify(
+            self.app_path,
+            "reroute_vcluster_topic_mappings",
+            src_vcluster=src_vcluster,
+            dest_vcluster=dest_vcluster,
+        )
         return req
+
+    def get_topic_mappings_table(
+        self,
+        vclusters: Iterable[str] = None,
+        max_workers: int = None,
+    ) -> TopicMappingsTable:
+        """
+        Loads the topic mappings of the vclusters (all by default) in a columnar table,
+        for analytics. See :class:`TopicMappingsTable`
+        """
+        return TopicMappingsTable.from_gateway(
+            self, vclusters=vclusters, max_workers=max_workers
+        )
+
+    def get_physical_topics_index(
+        self,
+        vclusters: Iterable[str] = None,
+        max_workers: int = None,
+    ) -> PhysicalTopicsIndex:
+        """
+        Indexes the logical topics written to each physical topic, through the topic
+        mappings and concentration rules of the vclusters (all by default).
+        See :class:`PhysicalTopicsIndex`
+        """
+        return PhysicalTopicsIndex(self).refresh(vclusters, max_workers=max_workers)
@@ -0,0 +1,193 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Reverse index of the physical topics: which logical topics, in which vclusters, are
+written to a physical topic, through alias mappings or concentration rules.
+
+Concentrated topics are resolved with the concentration rules of their vcluster: when the
+gateway returns the physical topic of the mapping, it is used, otherwise the topic is
+indexed on the three targets of the matching rule (delete, compacted, compact-delete),
+as its cleanup policy decides which one it is written to.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from threading import Lock
+from typing import TYPE_CHECKING, NamedTuple
+
+from cdk_proxy_api_client.common.concurrency import map_concurrently
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.vclusters import VirtualClusters
+
+RULE_TARGETS: tuple = (
+    ("delete", "physicalTopicName"),
+    ("compacted", "physicalTopicCompactedName"),
+    ("compact_delete", "physicalTopicCompactedDeletedName"),
+)
+
+
+class FanInEntry(NamedTuple):
+    """
+    A logical topic written to a physical topic. ``kind`` is alias, concentrated, or the
+    concentration rule target (delete, compacted or compact_delete) of ``pattern``.
+    """
+
+    vcluster: str
+    logical_topic: str
+    kind: str
+    pattern: str | None = None
+
+
+def resolve_mappings(
+    vcluster: str, mappings: list[dict], rules: list[dict]
+) -> list[tuple[str, FanInEntry]]:
+    """Returns the (physical topic, entry) pairs of the vcluster mappings"""
+    compiled: list[tuple[re.Pattern, dict]] = []
+    for _rule in rules:
+        try:
+            compiled.append((re.compile(_rule["pattern"]), _rule))
+        except (KeyError, re.error):
+            continue
+    pairs: list[tuple[str, FanInEntry]] = []
+    for _mapping in mappings:
+        _logical: str = _mapping.get("logicalTopicName")
+        _physical: str | None = _mapping.get("physicalTopicName")
+        if _mapping.get("type") != "concentrated":
+            if _physical:
+                pairs.append((_physical, FanInEntry(vcluster, _logical, "alias")))
+            continue
+        _rule: dict | None = next(
+            (_rule for _regex, _rule in compiled if _regex.fullmatch(_logical)),
+            None,
+        )
+        if _rule is None:
+            if _physical:
+                pairs.append(
+                    (_physical, FanInEntry(vcluster, _logical, "concentrated"))
+                )
+            continue
+        _targets = [
+            (_kind, _rule[_key]) for _kind, _key in RULE_TARGETS if _rule.get(_key)
+        ]
+        if _physical:
+            _kind = next(
+                (_kind for _kind, _target in _targets if _target == _physical),
+                "concentrated",
+            )
+            _targets = [(_kind, _physical)]
+        for _kind, _target in _targets:
+            pairs.append(
+                (_target, FanInEntry(vcluster, _logical, _kind, _rule["pattern"]))
+            )
+    return pairs
+
+
+class PhysicalTopicsIndex:
+    """Physical topic to the logical topics written to it, across the vclusters"""
+
+    def __init__(self, vclusters_app: VirtualClusters):
+        self.vclusters_app = vclusters_app
+        self._writers: dict[str, dict[tuple, FanInEntry]] = {}
+        self._vclusters: dict[str, list[tuple[str, tuple]]] = {}
+        self._lock = Lock()
+
+    def _fetch(self, target: tuple[str, str]) -> list[dict]:
+        _vcluster, _kind = target
+        if _kind == "mappings":
+            return self.vclusters_app.list_vcluster_topic_mappings(
+                _vcluster, as_list=True
+            )
+        return self.vclusters_app.get_concentration_rules(_vcluster).json()
+
+    def refresh(
+        self,
+        vclusters: Iterable[str] = None,
+        max_workers: int = None,
+    ) -> PhysicalTopicsIndex:
+        """
+        Fetches the topic mappings and concentration rules of the vclusters concurrently,
+        and replaces their entries in the index. The other vclusters are left untouched.
+
+        :param vclusters: the vclusters to (re)index. All the gateway vclusters if not set
+        :param int max_workers: maximum number of concurrent requests
+        """
+        if vclusters is None:
+            vclusters = self.vclusters_app.list_vclusters(as_list=True)["vclusters"]
+        targets: list[tuple[str, str]] = [
+            (_vcluster, _kind)
+            for _vcluster in vclusters
+            for _kind in ["mappings", "rules"]
+        ]
+        fetched: dict[tuple[str, str], list[dict]] = {}
+        for _target, _result, _error in map_concurrently(
+            self._fetch,
+            targets,
+            max_workers=max_workers,
+            ordered=False,
+            limiter=self.vclusters_app.proxy.client.limiter,
+        ):
+            if _error is not None:
+                raise _error
+            fetched[_target] = _result
+        for _vcluster in dict.fromkeys(_vcluster for _vcluster, _ in targets):
+            self.set_vcluster(
+                _vcluster,
+                resolve_mappings(
+                    _vcluster,
+                    fetched[(_vcluster, "mappings")],
+                    fetched[(_vcluster, "rules")],
+                ),
+            )
+        return self
+
+    def set_vcluster(self, vcluster: str, pairs: list[tuple[str, FanInEntry]]) -> None:
+        """Replaces the entries of the vcluster"""
+        with self._lock:
+            self._remove_vcluster(vcluster)
+            _keys: list[tuple[str, tuple]] = []
+            for _physical, _entry in pairs:
+                _key = (_entry.vcluster, _entry.logical_topic, _entry.kind)
+                self._writers.setdefault(_physical, {})[_key] = _entry
+                _keys.append((_physical, _key))
+            self._vclusters[vcluster] = _keys
+
+    def remove_vcluster(self, vcluster: str) -> None:
+        with self._lock:
+            self._remove_vcluster(vcluster)
+
+    def _remove_vcluster(self, vcluster: str) -> None:
+        for _physical, _key in self._vclusters.pop(vcluster, []):
+            _writers = self._writers.get(_physical)
+            if _writers is None:
+                continue
+            _writers.pop(_key, None)
+            if not _writers:
+                del self._writers[_physical]
+
+    def writers(self, physical_topic: str) -> list[FanInEntry]:
+        """The logical topics written to the physical topic"""
+        return list(self._writers.get(physical_topic, {}).values())
+
+    def fan_in(self, physical_topic: str) -> int:
+        return len(self._writers.get(physical_topic, ()))
+
+    def physical_topics(self) -> list[str]:
+        return list(self._writers.keys())
+
+    def vclusters(self) -> list[str]:
+        return list(self._vclusters.keys())
+
+    def top(self, count: int = 10) -> list[tuple[str, int]]:
+        """The physical topics with the most logical topics written to them"""
+        return sorted(
+            (
+                (_physical, len(_writers))
+                for _physical, _writers in self._writers.items()
+            ),
+            key=lambda _item: _item[1],
+            reverse=True,
+        )[:count]
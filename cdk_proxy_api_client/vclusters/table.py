@@ -0,0 +1,312 @@
+#  SPDX-License-Identifier: Apache-2.0
+#  Copyright 2024 John Mille <john@ews-network.net>
+
+"""
+Columnar table of the topic mappings of many vclusters, for fleet analytics.
+
+String columns are dictionary-encoded: each distinct value is stored once, and the rows
+hold its code in an :class:`array.array`. The read-only flags are a byte array.
+Counts and filters work on the codes, so a filter on a vcluster or physical topic
+predicate evaluates the predicate once per distinct value, not once per row.
+When NumPy is installed, the codes are viewed as NumPy arrays (without copy) for the
+counts and filters.
+
+.. code-block:: python
+
+    table = TopicMappingsTable.from_gateway(VirtualClusters(proxy))
+    table.count_by("vcluster")
+    table.ratio_by("vcluster", "read_only")
+    table.top("physical_topic", 10)
+    table.filter(vcluster=lambda _name: _name.startswith("team-"), read_only=True)
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import IO, TYPE_CHECKING, Any
+
+from cdk_proxy_api_client.common.concurrency import map_concurrently
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if TYPE_CHECKING:
+    from cdk_proxy_api_client.vclusters import VirtualClusters
+
+COLUMNS: dict[str, str] = {
+    "vcluster": "vcluster",
+    "logical_topic": "logicalTopicName",
+    "physical_topic": "physicalTopicName",
+    "read_only": "readOnly",
+    "mapping_type": "type",
+    "cluster_id": "clusterId",
+}
+DICTIONARY_COLUMNS: tuple = (
+    "vcluster",
+    "physical_topic",
+    "mapping_type",
+    "cluster_id",
+)
+
+
+class DictionaryColumn:
+    """Distinct values, and the code of the value of each row"""
+
+    __slots__ = ("values", "codes", "_codes_index")
+
+    def __init__(self, values: list = None, codes: array = None):
+        self.values: list = values if values is not None else []
+        self.codes: array = codes if codes is not None else array("I")
+        self._codes_index: dict[Any, int] = {
+            _value: _code for _code, _value in enumerate(self.values)
+        }
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> Any:
+        return self.values[self.codes[row]]
+
+    def __iter__(self) -> Iterator:
+        values = self.values
+        return (values[_code] for _code in self.codes)
+
+    def code(self, value: Any) -> int:
+        _code = self._codes_index.get(value)
+        if _code is None:
+            _code = self._codes_index[value] = len(self.values)
+            self.values.append(value)
+        return _code
+
+    def append(self, value: Any) -> None:
+        self.codes.append(self.code(value))
+
+    def matching_codes(self, condition: Any) -> set[int]:
+        """Codes of the values equal to ``condition``, or for which it returns True"""
+        if callable(condition):
+            return {
+                _code
+                for _code, _value in enumerate(self.values)
+                if _value is not None and condition(_value)
+            }
+        _code = self._codes_index.get(condition)
+        return set() if _code is None else {_code}
+
+    def counts(self) -> list[int]:
+        """Number of rows per code"""
+        if numpy is not None:
+            return numpy.bincount(
+                numpy.frombuffer(self.codes, dtype=numpy.uint32),
+                minlength=len(self.values),
+            ).tolist()
+        counts: list[int] = [0] * len(self.values)
+        for _code in self.codes:
+            counts[_code] += 1
+        return counts
+
+    def take(self, rows: array) -> DictionaryColumn:
+        codes = self.codes
+        return DictionaryColumn(
+            list(self.values), array("I", [codes[_row] for _row in rows])
+        )
+
+
+class TopicMappingsTable:
+    """Topic mappings, stored by column. See the module documentation"""
+
+    def __init__(self):
+        self.vcluster = DictionaryColumn()
+        self.logical_topic: list[str] = []
+        self.physical_topic = DictionaryColumn()
+        self.read_only: array = array("b")
+        self.mapping_type = DictionaryColumn()
+        self.cluster_id = DictionaryColumn()
+
+    def __len__(self) -> int:
+        return len(self.logical_topic)
+
+    @classmethod
+    def from_gateway(
+        cls,
+        vclusters_app: VirtualClusters,
+        vclusters: Iterable[str] = None,
+        max_workers: int = None,
+    ) -> TopicMappingsTable:
+        """
+        Retrieves the topic mappings of the vclusters concurrently.
+
+        :param VirtualClusters vclusters_app: the vclusters client
+        :param vclusters: the vclusters to load. All the gateway vclusters if not set
+        :param int max_workers: maximum number of concurrent requests
+        """
+        if vclusters is None:
+            vclusters = vclusters_app.list_vclusters(as_list=True)["vclusters"]
+        table = cls()
+        for _vcluster, _mappings, _error in map_concurrently(
+            lambda _vcluster: vclusters_app.list_vcluster_topic_mappings(
+                _vcluster, as_list=True
+            ),
+            vclusters,
+            max_workers=max_workers,
+            limiter=vclusters_app.proxy.client.limiter,
+        ):
+            if _error is not None:
+                raise _error
+            table.extend(_vcluster, _mappings)
+        return table
+
+    def append(self, vcluster: str, mapping: dict) -> None:
+        self.vcluster.append(vcluster)
+        self.logical_topic.append(mapping.get("logicalTopicName"))
+        self.physical_topic.append(mapping.get("physicalTopicName"))
+        self.read_only.append(1 if mapping.get("readOnly") else 0)
+        self.mapping_type.append(mapping.get("type"))
+        self.cluster_id.append(mapping.get("clusterId"))
+
+    def extend(self, vcluster: str, mappings: Iterable[dict]) -> None:
+        """Appends the mappings of a vcluster, as returned by the gateway"""
+        vcluster_code: int = self.vcluster.code(vcluster)
+        physical_code = self.physical_topic.code
+        type_code = self.mapping_type.code
+        cluster_code = self.cluster_id.code
+        for _mapping in mappings:
+            self.vcluster.codes.append(vcluster_code)
+            self.logical_topic.append(_mapping.get("logicalTopicName"))
+            self.physical_topic.codes.append(
+                physical_code(_mapping.get("physicalTopicName"))
+            )
+            self.read_only.append(1 if _mapping.get("readOnly") else 0)
+            self.mapping_type.codes.append(type_code(_mapping.get("type")))
+            self.cluster_id.codes.append(cluster_code(_mapping.get("clusterId")))
+
+    def column(self, name: str) -> DictionaryColumn | list | array:
+        if name not in COLUMNS:
+            raise KeyError(f"Unknown column {name}. Must be one of", list(COLUMNS))
+        return getattr(self, name)
+
+    def _dictionary_column(self, name: str) -> DictionaryColumn:
+        if name == "read_only":
+            return DictionaryColumn([False, True], array("I", self.read_only))
+        if name not in DICTIONARY_COLUMNS:
+            raise KeyError(
+                f"{name} is not a grouping column. Must be one of",
+                [*DICTIONARY_COLUMNS, "read_only"],
+            )
+        return self.column(name)
+
+    def count_by(self, name: str) -> dict[Any, int]:
+        """Number of mappings per distinct value of the column"""
+        column = self._dictionary_column(name)
+        return {
+            column.values[_code]: _count
+            for _code, _count in enumerate(column.counts())
+            if _count
+        }
+
+    def ratio_by(self, name: str, flag: str = "read_only") -> dict[Any, float]:
+        """Ratio of the mappings with ``flag`` set, per distinct value of the column"""
+        column = self._dictionary_column(name)
+        flags = self.column(flag)
+        totals: list[int] = column.counts()
+        if numpy is not None:
+            flagged: list[int] = numpy.bincount(
+                numpy.frombuffer(column.codes, dtype=numpy.uint32),
+                weights=numpy.frombuffer(flags, dtype=numpy.int8),
+                minlength=len(column.values),
+            ).tolist()
+        else:
+            flagged = [0] * len(column.values)
+            for _code, _flag in zip(column.codes, flags):
+                flagged[_code] += _flag
+        return {
+            column.values[_code]: flagged[_code] / _total
+            for _code, _total in enumerate(totals)
+            if _total
+        }
+
+    def top(self, name: str, count: int = 10) -> list[tuple[Any, int]]:
+        """Most frequent values of the column, i.e. the physical topics with the most fan-in"""
+        return sorted(
+            self.count_by(name).items(), key=lambda _item: _item[1], reverse=True
+        )[:count]
+
+    def rows_matching(self, **conditions) -> array:
+        """
+        Indexes of the rows matching all the conditions. Each condition is a value, or a
+        predicate called once per distinct value of the column.
+        """
+        rows: array | None = None
+        for _name, _condition in conditions.items():
+            column = self._dictionary_column(_name)
+            if _name == "read_only" and not callable(_condition):
+                _condition = bool(_condition)
+            codes: set[int] = column.matching_codes(_condition)
+            if numpy is not None:
+                _matches = numpy.flatnonzero(
+                    numpy.isin(
+                        numpy.frombuffer(column.codes, dtype=numpy.uint32),
+                        numpy.fromiter(codes, dtype=numpy.uint32, count=len(codes)),
+                    )
+                )
+                _rows = array("I", _matches.astype(numpy.uint32).tobytes())
+            else:
+                _rows = array(
+                    "I",
+                    [_row for _row, _code in enumerate(column.codes) if _code in codes],
+                )
+            if rows is None:
+                rows = _rows
+            else:
+                _selected = set(_rows)
+                rows = array("I", [_row for _row in rows if _row in _selected])
+        return rows if rows is not None else array("I", range(len(self)))
+
+    def take(self, rows: array) -> TopicMappingsTable:
+        """New table with the given rows"""
+        table = TopicMappingsTable()
+        for _name in DICTIONARY_COLUMNS:
+            setattr(table, _name, getattr(self, _name).take(rows))
+        table.logical_topic = [self.logical_topic[_row] for _row in rows]
+        table.read_only = array("b", [self.read_only[_row] for _row in rows])
+        return table
+
+    def filter(self, **conditions) -> TopicMappingsTable:
+        """New table with the rows matching all the conditions. See :meth:`rows_matching`"""
+        return self.take(self.rows_matching(**conditions))
+
+    def to_numpy(self, name: str):
+        """Codes (dictionary columns), or values, of the column as a NumPy array"""
+        if numpy is None:
+            raise ImportError("numpy is required to export the columns as arrays")
+        column = self.column(name)
+        if isinstance(column, DictionaryColumn):
+            return numpy.frombuffer(column.codes, dtype=numpy.uint32)
+        if name == "read_only":
+            return numpy.frombuffer(column, dtype=numpy.int8).astype(bool)
+        return numpy.array(column, dtype=object)
+
+    def iter_rows(self) -> Iterator[dict]:
+        """Rows as the gateway mappings, with the vcluster"""
+        columns: list[tuple[str, Iterable]] = [
+            (COLUMNS[_name], getattr(self, _name)) for _name in COLUMNS
+        ]
+        for _values in zip(*(_column for _, _column in columns)):
+            row = dict(zip((_key for _key, _ in columns), _values))
+            row["readOnly"] = bool(row["readOnly"])
+            yield row
+
+    def to_csv(self, output: IO[str]) -> None:
+        writer = csv.writer(output)
+        writer.writerow(COLUMNS.values())
+        for _row in self.iter_rows():
+            writer.writerow(_row.values())
+
+    def to_jsonl(self, output: IO[str]) -> None:
+        for _row in self.iter_rows():
+            output.write(json.dumps(_row))
+            output.write("\n")
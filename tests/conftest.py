@@ -3,32 +3,43 @@
 from os import path
 
 import pytest
-from testcontainers.compose import DockerCompose
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.emulator import GatewayEmulator
+from cdk_proxy_api_client.proxy_api import ProxyClient
 
 HERE = path.abspath(path.dirname(__file__))
 
 
-docker_compose = DockerCompose(
-    path.abspath(f"{HERE}/.."),
-    compose_file_name="docker-compose.yaml",
-    wait=True,
-    pull=True,
-)
+@pytest.fixture(scope="session")
+def docker_compose():
+    """
+    Starts the gateway stack, once, for the tests which need it. The emulator tests do
+    not, so they run without docker nor testcontainers
+    """
+    from testcontainers.compose import DockerCompose
 
-docker_compose.stop(down=True)
-docker_compose.start()
-gw_api_port = int(docker_compose.get_service_port("gateway", 8888))
-base_url: str = f"http://localhost:{gw_api_port}"
-docker_compose.wait_for(f"{base_url}/health")
+    _docker_compose = DockerCompose(
+        path.abspath(f"{HERE}/.."),
+        compose_file_name="docker-compose.yaml",
+        wait=True,
+        pull=True,
+    )
+    _docker_compose.stop(down=True)
+    _docker_compose.start()
+    gw_api_port = int(_docker_compose.get_service_port("gateway", 8888))
+    _docker_compose.wait_for(f"http://localhost:{gw_api_port}/health")
+    yield _docker_compose
+    _docker_compose.stop()
 
 
 @pytest.fixture(scope="session")
-def kafka_bootstrap():
+def kafka_bootstrap(docker_compose):
     return f"localhost:{docker_compose.get_service_port('broker', 9092)}"
 
 
 @pytest.fixture(scope="session")
-def gateway_bootstrap():
+def gateway_bootstrap(docker_compose):
     bootstrap: str = ",".join(
         [
             f"localhost:{docker_compose.get_service_port('gateway', port)}"
@@ -39,13 +50,27 @@ def gateway_bootstrap():
 
 
 @pytest.fixture(scope="session")
-def base_url():
+def base_url(docker_compose):
     gw_api_port = int(docker_compose.get_service_port("gateway", 8888))
     return f"http://localhost:{gw_api_port}"
 
 
+@pytest.fixture()
+def emulator():
+    """Emulated gateway admin API, seeded with 5 vclusters. A new one for each test"""
+    with GatewayEmulator() as _emulator:
+        _emulator.state.seed(vclusters=5, topic_mappings=100, user_mappings=10)
+        yield _emulator
+
+
+@pytest.fixture()
+def emulator_client(emulator):
+    return ProxyClient(
+        ApiClient(url=emulator.url, username="admin", password="conduktor")
+    )
+
+
 def pytest_sessionfinish(session, exitstatus):
-    docker_compose.stop()
     print()
     print("Testing session has finished")
     print(f"Exit status: {exitstatus}")
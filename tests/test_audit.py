@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+"""tests for the audit log"""
+
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+import requests
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.common.audit import AuditSink, payload_digest
+from cdk_proxy_api_client.exceptions import TopicOrVirtualClusterNotFound
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def read_records(path) -> list[dict]:
+    return [json.loads(_line) for _line in path.read_text().splitlines()]
+
+
+def test_emulator_audit_sink(emulator, tmp_path):
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    sink = client.enable_audit(str(tmp_path / "audit.jsonl"))
+    vclusters = VirtualClusters(ProxyClient(client))
+    vclusters.create_vcluster_topic_mapping("audit", "topic", "physical")
+    vclusters.list_vclusters()
+    with pytest.raises(TopicOrVirtualClusterNotFound):
+        vclusters.delete_vcluster_topic_mapping("audit", "missing")
+    client.disable_audit()
+    assert client.audit_sink is None
+    records = read_records(tmp_path / "audit.jsonl")
+    assert len(records) == sink.written == 2
+    assert [(_record["method"], _record["status"]) for _record in records] == [
+        ("POST", 201),
+        ("DELETE", 404),
+    ]
+    assert records[0]["path"] == "/admin/vclusters/v1/vcluster/audit/topics/topic"
+    assert records[0]["payload_sha256"] and records[0]["latency_ms"] > 0
+    assert records[1]["payload_sha256"] is None
+
+
+def test_emulator_audit_sink_connection_error(tmp_path):
+    client = ApiClient(url="http://127.0.0.1:1", username="admin", password="conduktor")
+    sink = client.enable_audit(str(tmp_path / "audit.jsonl"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        VirtualClusters(ProxyClient(client)).create_vcluster_topic_mapping(
+            "audit", "topic", "physical"
+        )
+    sink.close()
+    (record,) = read_records(tmp_path / "audit.jsonl")
+    assert record["status"] is None and record["error"].startswith("ConnectionError")
+
+
+def test_audit_sink_rotation(tmp_path):
+    sink = AuditSink(
+        str(tmp_path / "audit.jsonl"), max_bytes=300, backup_count=2, batch_size=1
+    )
+    for _index in range(10):
+        sink.record("PUT", f"/topics/topic-{_index}", {"a": _index}, 200, 0.01)
+        assert sink.flush(5)
+    sink.close()
+    assert sorted(_path.name for _path in tmp_path.iterdir()) == [
+        "audit.jsonl",
+        "audit.jsonl.1",
+        "audit.jsonl.2",
+    ]
+    assert read_records(tmp_path / "audit.jsonl")[-1]["path"] == "/topics/topic-9"
+    assert sink.written == 10 and not sink.errors
+
+
+def test_audit_sink_closed(tmp_path):
+    with AuditSink(str(tmp_path / "audit.jsonl"), on_full="drop") as sink:
+        assert sink.record("POST", "/topics", None, 200, 0.01)
+    assert not sink.record("POST", "/topics", None, 200, 0.01)
+    assert sink.written == 1 and sink.dropped == 1
+    assert sink.flush(1)
+    sink.close()
+    assert sink.settings()["on_full"] == "drop"
+    with pytest.raises(ValueError):
+        AuditSink(str(tmp_path / "other.jsonl"), on_full="wait")
+
+
+def test_payload_digest():
+    assert payload_digest({"password": "a", "name": "x"}) == payload_digest(
+        {"password": "b", "name": "x"}
+    )
+    assert payload_digest({"nested": [{"apiKey": "a"}]}) == payload_digest(
+        {"nested": [{"apiKey": "b"}]}
+    )
+    assert payload_digest({"name": "x"}) != payload_digest({"name": "y"})
+    assert payload_digest('{"name": "x"}') == payload_digest({"name": "x"})
+    assert payload_digest(b"raw") == payload_digest("raw")
+    assert payload_digest(None) is None
+
+
+def test_audit_sink_failed_rotation(tmp_path, monkeypatch):
+    sink = AuditSink(str(tmp_path / "audit.jsonl"), max_bytes=400, batch_size=1)
+    replace = os.replace
+    failures: list[str] = []
+
+    def failing_replace(source: str, destination: str) -> None:
+        if not failures:
+            failures.append(source)
+            raise OSError("disk error")
+        replace(source, destination)
+
+    monkeypatch.setattr("cdk_proxy_api_client.common.audit.os.replace", failing_replace)
+    for _path in ["/topic", f"/{'x' * 300}", "/topic", "/topic", "/topic"]:
+        assert sink.record("POST", _path, {"a": 1}, 200, 0.01)
+        assert sink.flush(5)
+    sink.close()
+    assert failures and sink.errors == 1 and sink.written == 4
+    assert not sink._thread.is_alive()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""tests for the thread-local sessions and API versions"""
+
+from __future__ import annotations
+
+import threading
+
+import requests
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.common.concurrency import map_concurrently
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def test_api_versions_per_instance():
+    client = ApiClient(url="http://gw")
+    v2_proxy = ProxyClient.set_version("v2", client)
+    assert VirtualClusters(v2_proxy).base_path == "/admin/vclusters/v2"
+    assert VirtualClusters(ProxyClient(client)).base_path == "/admin/vclusters/v1"
+    assert ProxyClient.version == "v1"
+    assert v2_proxy.client is client
+
+
+def test_shared_session():
+    session = requests.Session()
+    client = ApiClient(url="http://gw", session=session)
+    assert client.session is session
+    sessions: set[int] = set()
+    for _, _, _error in map_concurrently(
+        lambda _: sessions.add(id(client.session)), range(4), max_workers=4
+    ):
+        assert _error is None
+    assert sessions == {id(session)}
+
+
+def test_thread_local_sessions_pools():
+    client = ApiClient(url="http://gw", thread_local_sessions=True, pool_maxsize=4)
+    adapter = client._session.get_adapter("http://gw")
+    assert adapter._pool_maxsize == 4
+    assert client.session is client.session
+    assert client.session.get_adapter("http://gw") is adapter
+    client.session = requests.Session()
+    assert client.session.adapters is client._session.adapters
+    assert client.session.get_adapter("http://gw") is not adapter
+
+
+def test_emulator_thread_local_sessions(emulator):
+    client = ApiClient(
+        url=emulator.url,
+        username="admin",
+        password="conduktor",
+        thread_local_sessions=True,
+        pool_maxsize=4,
+    )
+    vclusters = VirtualClusters(ProxyClient(client))
+    sessions: set[int] = set()
+    barrier = threading.Barrier(4, timeout=5)
+
+    def list_vclusters(_):
+        barrier.wait()
+        sessions.add(id(client.session))
+        return vclusters.list_vclusters(as_list=True)
+
+    for _, _result, _error in map_concurrently(list_vclusters, range(4), max_workers=4):
+        assert _error is None and "vcluster-0" in _result["vclusters"]
+    assert len(sessions) == 4
+    assert client.session.adapters is client._session.adapters
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""tests for the adaptive concurrency"""
+
+from __future__ import annotations
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.common.concurrency import AdaptiveLimiter, map_concurrently
+from cdk_proxy_api_client.errors import ProxyGenericException
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.user_mappings import UserMappings
+
+
+def test_adaptive_limiter():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=8)
+
+    def round_trip(seconds: float, status: int = 200) -> None:
+        _limit = limiter.limit
+        for _ in range(_limit):
+            limiter.acquire()
+        for _ in range(_limit):
+            limiter.release(seconds, status)
+
+    for _ in range(50):
+        round_trip(0.01)
+    assert limiter.limit == 8 and limiter.backoffs == 0
+    round_trip(0.01, 503)
+    assert limiter.limit == 5 and limiter.backoffs == 1
+    for _ in range(20):
+        round_trip(0.1)
+    assert limiter.limit < 5 and limiter.in_flight == 0
+    threads: set[int] = set()
+    for _, _, _error in map_concurrently(
+        lambda _: threads.add(threading.get_ident()),
+        range(20),
+        max_workers=1,
+        limiter=limiter,
+    ):
+        assert _error is None
+    assert len(threads) == 1
+
+
+def test_emulator_adaptive_concurrency(emulator):
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    limiter = client.enable_adaptive_concurrency(initial_limit=2, max_limit=8)
+    user_mappings = UserMappings(ProxyClient(client))
+    assert len(user_mappings.list_mappings_detailed("vcluster-1", max_workers=1)) == 10
+    assert limiter.in_flight == 0 and limiter.latency is not None
+    client.tracer = SimpleNamespace(start=lambda *_: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        user_mappings.list_mappings()
+    client.tracer = None
+    assert limiter.in_flight == 0
+    emulator.error_rate = 1.0
+    for _ in range(limiter.limit + 1):
+        with pytest.raises(ProxyGenericException):
+            user_mappings.list_mappings()
+    assert limiter.backoffs >= 1
+
+
+def test_emulator_adaptive_concurrency_bulk_default(emulator):
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    user_mappings = UserMappings(ProxyClient(client))
+    for _index in range(30):
+        user_mappings.create_mapping(f"bulk-{_index}", vcluster_name="bulk")
+    limiter = client.enable_adaptive_concurrency(initial_limit=20, max_limit=20)
+    peak: list[int] = [0]
+    acquire = limiter.acquire
+
+    def tracked_acquire() -> None:
+        acquire()
+        peak[0] = max(peak[0], limiter.in_flight)
+
+    limiter.acquire = tracked_acquire
+    emulator.latency = 0.05
+    assert len(user_mappings.list_mappings_detailed("bulk")) == 30
+    assert peak[0] > 10
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+"""tests for the gateway admin API emulator"""
+
+from __future__ import annotations
+
+import sys
+import threading
+
+import pytest
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.emulator import GatewayEmulator
+from cdk_proxy_api_client.errors import (
+    GenericConflict,
+    GenericForbidden,
+    GenericUnauthorized,
+    ProxyGenericException,
+)
+from cdk_proxy_api_client.exceptions import VirtualClusterNotFound
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.interceptors.scopes import scope_from_definition, scope_label
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def test_emulator_auth(emulator):
+    with pytest.raises(GenericUnauthorized):
+        VirtualClusters(ProxyClient(ApiClient(url=emulator.url))).list_vclusters()
+    readonly = ProxyClient(
+        ApiClient(url=emulator.url, username="readonly", password="conduktor")
+    )
+    assert VirtualClusters(readonly).list_vclusters(as_list=True)["vclusters"]
+    with pytest.raises(GenericForbidden):
+        VirtualClusters(readonly).create_vcluster_user_token("testing")
+
+
+def test_emulator_vclusters(emulator_client):
+    vclusters_c = VirtualClusters(emulator_client)
+    assert (
+        len(vclusters_c.list_vcluster_topic_mappings("vcluster-0", as_list=True)) == 100
+    )
+    with pytest.raises(VirtualClusterNotFound):
+        vclusters_c.list_vcluster_topic_mappings("unknown")
+    assert vclusters_c.create_vcluster_user_token("emulated", token_only=True)
+    vclusters_c.create_vcluster_topic_mapping("emulated", "logical", "physical")
+    assert vclusters_c.list_vcluster_topic_mappings("emulated", as_list=True)
+
+
+def test_emulator_interceptors(emulator_client):
+    interceptors_c = Interceptors(emulator_client)
+    config: dict = {
+        "pluginClass": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+        "priority": 1,
+        "config": {"topic": ".*"},
+    }
+    interceptors_c.create_interceptor("emulated", config, vcluster_name="vcluster-0")
+    with pytest.raises(GenericConflict):
+        interceptors_c.create_interceptor(
+            "emulated", config, vcluster_name="vcluster-0"
+        )
+    for _priority, _scope in enumerate(
+        [
+            {"is_global": True},
+            {"vcluster_name": "vcluster-0"},
+            {"vcluster_name": "vcluster-0", "group_name": "group-0"},
+            {"vcluster_name": "vcluster-0", "username": "user-0"},
+            {"vcluster_name": "vcluster-1", "username": "user-0"},
+        ],
+        2,
+    ):
+        interceptors_c.create_interceptor(
+            "precedence", {**config, "priority": _priority}, **_scope
+        )
+    principals: list[dict] = [
+        {"vcluster": "vcluster-0"},
+        {"vcluster": "vcluster-0", "username": "user-0"},
+        {"vcluster": "vcluster-0", "username": "user-1"},
+        {"vcluster": "vcluster-0", "username": "user-10", "groups": ["group-0"]},
+        {"vcluster": "vcluster-2"},
+        {"vcluster": "passthrough", "username": "user-0"},
+    ]
+    expected: list[int] = [3, 5, 3, 4, 2, 2]
+    for _principal, _priority in zip(principals, expected):
+        _chain = interceptors_c.get_target_resolve(_principal).json()["interceptors"]
+        assert [
+            _definition["priority"]
+            for _definition in _chain
+            if _definition["name"] == "precedence"
+        ] == [_priority]
+    resolver = interceptors_c.get_resolver()
+    assert not resolver.check_consistency(interceptors_c, principals, len(principals))
+
+
+def test_emulator_sync_interceptors_prune(emulator_client):
+    interceptors_c = Interceptors(emulator_client)
+    config: dict = {
+        "pluginClass": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+        "priority": 1,
+        "config": {"topic": ".*"},
+    }
+    scopes: list[dict] = [
+        {"is_global": True},
+        {"vcluster_name": "prune-a"},
+        {"vcluster_name": "prune-b"},
+        {"vcluster_name": "prune-a", "username": "user-0"},
+    ]
+    for _scope in scopes:
+        for _name in ["kept", "stale"]:
+            interceptors_c.create_interceptor(f"prune-{_name}", config, **_scope)
+    desired: list[dict] = [{"name": "prune-kept", "config": config}]
+    with pytest.raises(ValueError):
+        interceptors_c.sync_interceptors(desired, prune=True)
+    outcomes = interceptors_c.sync_interceptors(
+        desired, prune=True, scope={"vcluster_name": "prune-a"}
+    )
+    assert {(_outcome["name"], _outcome["action"]) for _outcome in outcomes} == {
+        ("prune-kept", "unchanged"),
+        ("prune-stale", "deleted"),
+    }
+    remaining: list[tuple] = sorted(
+        (scope_label(scope_from_definition(_definition)), _definition["name"])
+        for _definition in interceptors_c.get_all_gw_interceptors().json()[
+            "interceptors"
+        ]
+        if _definition["name"].startswith("prune-")
+    )
+    assert remaining == sorted(
+        (scope_label(_scope), f"prune-{_name}")
+        for _scope in scopes
+        for _name in ["kept", "stale"]
+        if _scope != {"vcluster_name": "prune-a"} or _name == "kept"
+    )
+
+
+def test_emulator_sync_interceptors_other_scope(emulator, emulator_client):
+    interceptors_c = Interceptors(emulator_client)
+    config: dict = {
+        "pluginClass": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+        "priority": 1,
+        "config": {"topic": ".*"},
+    }
+    requests_count: int = emulator.requests_count
+    with pytest.raises(ValueError, match="another scope"):
+        interceptors_c.sync_interceptors(
+            [
+                {"name": "scoped", "config": config},
+                {
+                    "name": "same",
+                    "config": config,
+                    "scope": {"vcluster_name": "scope-a"},
+                },
+                {
+                    "name": "other",
+                    "config": config,
+                    "scope": {"vcluster_name": "scope-b"},
+                },
+            ],
+            scope={"vcluster_name": "scope-a"},
+        )
+    assert emulator.requests_count == requests_count
+    outcomes = interceptors_c.sync_interceptors(
+        [
+            {"name": "scoped", "config": config},
+            {"name": "same", "config": config, "scope": {"vcluster_name": "scope-a"}},
+        ],
+        scope={"vcluster_name": "scope-a"},
+    )
+    assert [_outcome["action"] for _outcome in outcomes] == ["created", "created"]
+
+
+def test_emulator_user_mappings(emulator_client):
+    user_mappings = UserMappings(emulator_client)
+    assert len(user_mappings.list_mappings_detailed("vcluster-1")) == 10
+
+
+def test_emulator_errors_injection(emulator, emulator_client):
+    emulator.error_rate = 1.0
+    with pytest.raises(ProxyGenericException):
+        VirtualClusters(emulator_client).list_vclusters()
+
+
+def test_emulator_concurrent_listings(emulator):
+    config: dict = {
+        "pluginClass": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+        "priority": 1,
+        "config": {"topic": ".*"},
+    }
+
+    def write():
+        for _index in range(2000):
+            emulator.state.set_interceptor(
+                (False, "vcluster-0", None, None), f"race-{_index}", config, True
+            )
+
+    switch_interval: float = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer = threading.Thread(target=write)
+    try:
+        writer.start()
+        while writer.is_alive():
+            emulator.state.list_interceptors()
+    finally:
+        writer.join()
+        sys.setswitchinterval(switch_interval)
+    assert (
+        sum(
+            _definition["name"].startswith("race-")
+            for _definition in emulator.state.list_interceptors()["interceptors"]
+        )
+        == 2000
+    )
+
+
+def test_emulator_listings_cache_size():
+    with GatewayEmulator(listings_cache_size=2) as emulator:
+        emulator.state.seed(vclusters=5, topic_mappings=1, user_mappings=1)
+        vclusters_c = VirtualClusters(
+            ProxyClient(
+                ApiClient(url=emulator.url, username="admin", password="conduktor")
+            )
+        )
+        for _index in range(5):
+            vclusters_c.list_vcluster_topic_mappings(f"vcluster-{_index}")
+        assert len(emulator._listings_cache) == 2
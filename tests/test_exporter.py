@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""tests for the inventory exporter"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import json
+
+import pytest
+
+from cdk_proxy_api_client.exceptions import VirtualClusterNotFound
+from cdk_proxy_api_client.exporter import InventoryExporter
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+@pytest.fixture()
+def exporter(emulator_client):
+    return InventoryExporter(emulator_client, max_workers=3, buffer_size=2)
+
+
+def read_jsonl(path) -> list[dict]:
+    with open(path) as records_fd:
+        return [json.loads(_line) for _line in records_fd]
+
+
+def read_csv(path) -> list[dict]:
+    with open(path, newline="") as records_fd:
+        return list(csv.DictReader(records_fd))
+
+
+def test_invalid_arguments(exporter, tmp_path):
+    with pytest.raises(ValueError, match="max_workers"):
+        InventoryExporter(exporter.vclusters_app.proxy, max_workers=0)
+    for _format in ["jsonl", "csv"]:
+        with pytest.raises(ValueError, match="kind must be one of"):
+            exporter.export("topics", str(tmp_path / "topics.out"), _format)
+    with pytest.raises(ValueError, match="output_format must be one of"):
+        exporter.export("topic_mappings", str(tmp_path / "topics.out"), "xml")
+    assert not (tmp_path / "topics.out").exists()
+
+
+def test_emulator_export_ordered(emulator_client, exporter, tmp_path):
+    vclusters_app = VirtualClusters(emulator_client)
+    report = exporter.export(
+        "topic_mappings",
+        str(tmp_path / "mappings.jsonl.gz"),
+        vclusters=["vcluster-1", "vcluster-0", "vcluster-1"],
+        vcluster_field=None,
+    )
+    assert report["records"] == {"vcluster-1": 100, "vcluster-0": 100}
+    assert not report["errors"] and not report["failures"]
+    with gzip.open(tmp_path / "mappings.jsonl.gz", "rt") as mappings_fd:
+        records = [json.loads(_line) for _line in mappings_fd]
+    assert records == vclusters_app.list_vcluster_topic_mappings(
+        "vcluster-1", as_list=True
+    ) + vclusters_app.list_vcluster_topic_mappings("vcluster-0", as_list=True)
+
+
+def test_emulator_export_all_vclusters(exporter, tmp_path):
+    report = exporter.export(
+        "topic_mappings", str(tmp_path / "mappings.jsonl"), ordered=False
+    )
+    assert report["records"] == {f"vcluster-{_index}": 100 for _index in range(5)}
+    records = read_jsonl(tmp_path / "mappings.jsonl")
+    assert len(records) == 500
+    assert list(records[0])[0] == "vcluster"
+    assert {_record["vcluster"] for _record in records} == set(report["records"])
+
+
+def test_emulator_export_compress(exporter, tmp_path):
+    exporter.export(
+        "topic_mappings",
+        str(tmp_path / "mappings.jsonl"),
+        compress=True,
+        vclusters=["vcluster-0"],
+    )
+    with gzip.open(tmp_path / "mappings.jsonl", "rt") as mappings_fd:
+        assert len(mappings_fd.readlines()) == 100
+    exporter.export(
+        "topic_mappings",
+        str(tmp_path / "mappings.jsonl.gz"),
+        compress=False,
+        vclusters=["vcluster-0"],
+    )
+    assert len(read_jsonl(tmp_path / "mappings.jsonl.gz")) == 100
+
+
+def test_emulator_export_missing_vcluster(exporter, tmp_path):
+    report = exporter.export(
+        "topic_mappings",
+        str(tmp_path / "mappings.jsonl"),
+        vclusters=["missing", "vcluster-0"],
+    )
+    assert report["records"] == {"vcluster-0": 100}
+    assert list(report["errors"]) == ["missing"]
+    assert isinstance(report["errors"]["missing"], VirtualClusterNotFound)
+    assert {
+        _record["vcluster"] for _record in read_jsonl(tmp_path / "mappings.jsonl")
+    } == {"vcluster-0"}
+
+
+def test_emulator_export_user_mappings_csv(exporter, tmp_path):
+    report = exporter.export(
+        "user_mappings", str(tmp_path / "users.csv"), "csv", ordered=False
+    )
+    rows = read_csv(tmp_path / "users.csv")
+    assert report["records"] == {f"vcluster-{_index}": 10 for _index in range(5)}
+    assert len(rows) == 50
+    assert list(rows[0]) == ["vcluster", "username", "principal", "groups"]
+    assert all(isinstance(json.loads(_row["groups"]), list) for _row in rows)
+    assert not report["errors"] and not report["failures"]
+
+
+def test_emulator_export_passthrough_csv(emulator_client, exporter, tmp_path):
+    UserMappings(emulator_client).create_mapping("alice", groups=["a", "b"])
+    report = exporter.export(
+        "user_mappings",
+        str(tmp_path / "users.csv"),
+        "csv",
+        vclusters=[None],
+        vcluster_field=None,
+    )
+    assert report["records"] == {None: 1}
+    rows = read_csv(tmp_path / "users.csv")
+    assert [(_row["username"], json.loads(_row["groups"])) for _row in rows] == [
+        ("alice", ["a", "b"])
+    ]
+    assert list(rows[0]) == ["username", "principal", "groups"]
+
+
+def test_emulator_iter_records_stopped(exporter):
+    records = exporter.iter_records("topic_mappings", ["vcluster-0", "vcluster-1"])
+    assert [next(records)[0] for _ in range(3)] == ["vcluster-0"] * 3
+    records.close()
+    report: dict = {}
+    assert sum(1 for _ in exporter.iter_records("topic_mappings", report=report)) == 500
+    assert not report["errors"] and not report["failures"]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""tests for the gateway fleet"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.emulator import GatewayEmulator
+from cdk_proxy_api_client.errors import GenericUnauthorized
+from cdk_proxy_api_client.fleet import GatewayFleet
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+@pytest.fixture()
+def fleet(emulator) -> GatewayFleet:
+    return GatewayFleet.from_settings(
+        {
+            "eu": {"url": emulator.url, "username": "admin", "password": "conduktor"},
+            "us": {"url": emulator.url, "username": "admin", "password": "wrong"},
+        },
+        timeout=5,
+    )
+
+
+def test_emulator_gateway_fleet(fleet):
+    outcomes = fleet.call(VirtualClusters, "list_vclusters", as_list=True)
+    assert list(outcomes) == ["eu", "us"]
+    assert list(outcomes.succeeded()) == ["eu"]
+    assert "vcluster-0" in outcomes["eu"].result["vclusters"]
+    assert outcomes["eu"].ok and outcomes["eu"].seconds > 0
+    assert isinstance(outcomes.failed()["us"], GenericUnauthorized)
+    assert fleet.run(lambda _proxy: _proxy.version, gateways=["eu"]).succeeded() == {
+        "eu": "v1"
+    }
+    assert fleet["eu"].client.timeout == 5
+
+
+def test_emulator_gateway_fleet_timeout(emulator):
+    with GatewayEmulator(latency=1.0) as slow:
+        fleet = GatewayFleet.from_settings(
+            {
+                "eu": {"url": emulator.url},
+                "ap": {"url": slow.url, "timeout": 5},
+            },
+            timeout=0.2,
+        )
+        outcomes = fleet.run(lambda _proxy: _proxy.client.get("/health").json())
+    assert outcomes.succeeded() == {"eu": {"status": "UP"}}
+    assert isinstance(outcomes.failed()["ap"], TimeoutError)
+    assert outcomes["ap"].seconds == 0.2
+    assert fleet["ap"].client.timeout == 5
+
+
+def test_gateway_fleet_members(fleet):
+    assert list(fleet) == ["eu", "us"] and len(fleet) == 2 and "eu" in fleet
+    with pytest.raises(KeyError):
+        fleet.add("eu", fleet["eu"])
+    with pytest.raises(KeyError):
+        fleet.run(lambda _proxy: None, gateways=["missing"])
+    removed = fleet.remove("us")
+    assert list(fleet) == ["eu"]
+    fleet.add("ap", removed)
+    assert list(fleet) == ["eu", "ap"]
+    assert not fleet.run(lambda _proxy: None, gateways=[])
+    assert not GatewayFleet().run(lambda _proxy: None)
+
+
+def test_gateway_fleet_queued_calls_timeout():
+    fleet = GatewayFleet(
+        {_name: ProxyClient(ApiClient(url="http://gw")) for _name in "abc"},
+        timeout=0.5,
+        max_workers=1,
+    )
+    outcomes = fleet.run(lambda _proxy: time.sleep(0.3) or "ok")
+    assert outcomes.succeeded() == {"a": "ok", "b": "ok", "c": "ok"}
+    _start = time.perf_counter()
+    outcomes = fleet.run(
+        lambda _proxy, _hanging: time.sleep(1.0 if _proxy is _hanging else 0.1),
+        fleet["a"],
+        gateways=["a", "b"],
+    )
+    assert isinstance(outcomes.failed()["a"], TimeoutError)
+    assert outcomes["a"].seconds == 0.5
+    assert list(outcomes.succeeded()) == ["b"]
+    assert time.perf_counter() - _start >= 1.0
@@ -10,6 +10,8 @@ import pytest
 
 from cdk_proxy_api_client.client_wrapper import ApiClient
 from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.plugins import Plugins
+from cdk_proxy_api_client.plugins.validator import InterceptorConfigValidator
 from cdk_proxy_api_client.proxy_api import ProxyClient
 
 
@@ -143,3 +145,83 @@ def test_get_all_gw_interceptors(proxy_client):
     interceptors_c = Interceptors(proxy_client)
     interceptors_c.get_all_gw_interceptors()
     print(json.dumps(interceptors_c.get_all_gw_interceptors().json()))
+
+
+def test_deploy_interceptor(proxy_client, interceptors):
+    interceptors_c = Interceptors(proxy_client)
+    scopes: list[dict] = [
+        {"vcluster_name": "testing"},
+        {"vcluster_name": "testing", "username": "deploy_user"},
+        {"vcluster_name": "testing", "group_name": "deploy_group"},
+        {"username": "deploy_user"},
+    ]
+    outcomes = interceptors_c.deploy_interceptor(
+        "defaultRemoveHeaders",
+        interceptors["defaultRemoveHeaders"],
+        scopes,
+        max_workers=2,
+    )
+    assert len(outcomes) == len(scopes)
+    assert all(_outcome["action"] != "failed" for _outcome in outcomes)
+    outcomes = interceptors_c.deploy_interceptor(
+        "defaultRemoveHeaders", interceptors["defaultRemoveHeaders"], scopes
+    )
+    assert all(_outcome["action"] != "failed" for _outcome in outcomes)
+
+
+def test_interceptors_resolver(proxy_client):
+    interceptors_c = Interceptors(proxy_client)
+    resolver = interceptors_c.get_resolver()
+    principals: list[dict] = [
+        {"vcluster": "testing"},
+        {"vcluster": "testing", "username": "admin_client"},
+        {"vcluster": "testing", "username": "deploy_user"},
+    ]
+    assert not resolver.check_consistency(interceptors_c, principals)
+
+
+def test_sync_interceptors(proxy_client, interceptors):
+    interceptors_c = Interceptors(proxy_client)
+    desired: list[dict] = [
+        {
+            "name": _name,
+            "config": interceptors[_name],
+            "scope": {"vcluster_name": "testing", "username": "sync_user"},
+        }
+        for _name in ["defaultProducePolicy", "defaultRemoveHeaders"]
+    ]
+    outcomes = interceptors_c.sync_interceptors(desired)
+    assert all(_outcome["action"] != "failed" for _outcome in outcomes)
+    outcomes = interceptors_c.sync_interceptors(desired)
+    assert all(_outcome["action"] == "unchanged" for _outcome in outcomes)
+
+
+def test_validate_interceptors(proxy_client, interceptors):
+    validator = Plugins(proxy_client).get_config_validator()
+    assert not validator.validate_many(interceptors)
+    invalid = validator.validate_many(
+        {"typo": {"pluginClass": "io.conduktor.gateway.NotAPlugin", "config": {}}}
+    )
+    assert "typo" in invalid
+
+
+def test_validate_java_patterns():
+    validator = InterceptorConfigValidator(
+        [
+            {
+                "pluginClass": "io.conduktor.gateway.Plugin",
+                "configSchema": {
+                    "type": "object",
+                    "properties": {
+                        "topic": {"type": "string", "pattern": r"^\p{L}++$"},
+                        "prefix": {"type": "string", "pattern": "^[a-z]+$"},
+                    },
+                },
+            }
+        ]
+    )
+    config: dict = {"pluginClass": "io.conduktor.gateway.Plugin", "priority": 1}
+    assert not validator.validate(config | {"config": {"topic": "1", "prefix": "a"}})
+    assert validator.validate(config | {"config": {"topic": "a", "prefix": "1"}}) == [
+        "config.prefix: '1' does not match ^[a-z]+$"
+    ]
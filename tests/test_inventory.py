@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+
+"""tests for the local inventory store"""
+
+from __future__ import annotations
+
+import pytest
+
+from cdk_proxy_api_client.exceptions import (
+    TopicOrVirtualClusterNotFound,
+    VirtualClusterNotFound,
+)
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.inventory import InventoryStore
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+INTERCEPTOR: dict = {
+    "pluginClass": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+    "priority": 1,
+    "config": {"topic": ".*"},
+}
+
+
+@pytest.fixture()
+def store(emulator_client, tmp_path):
+    with InventoryStore(emulator_client, str(tmp_path / "inventory.db")) as _store:
+        assert not _store.refresh()
+        _store.attach()
+        yield _store
+
+
+def interceptors_of(store: InventoryStore, vcluster: str = "") -> list[tuple]:
+    return [
+        (_row["name"], _row["priority"])
+        for _row in store.query(
+            "SELECT name, priority FROM interceptors WHERE NOT is_global AND vcluster = ?"
+            " ORDER BY name",
+            [vcluster],
+        )
+    ]
+
+
+def test_emulator_inventory_refresh(emulator, emulator_client):
+    store = InventoryStore(emulator_client)
+    assert not store.refresh()
+    assert store.vclusters() == [f"vcluster-{_index}" for _index in range(5)]
+    assert len(store.topic_mappings("vcluster-[01]", read_only=True)) == 20
+    assert len(store.topic_mappings("vcluster-0")) == 100
+    assert (
+        len(store.query("SELECT * FROM user_mappings WHERE vcluster = 'vcluster-0'"))
+        == 10
+    )
+    with emulator.state.lock:
+        emulator.state.vclusters.pop("vcluster-4")
+        emulator.state._changed()
+    assert not store.refresh()
+    assert "vcluster-4" not in store.vclusters()
+    assert not store.topic_mappings("vcluster-4")
+
+
+def test_emulator_inventory_refresh_errors(emulator_client):
+    store = InventoryStore(emulator_client)
+    errors = store.refresh(["vcluster-0", "missing"])
+    assert list(errors) == ["missing"]
+    assert isinstance(errors["missing"], VirtualClusterNotFound)
+    assert store.vclusters() == ["vcluster-0"]
+
+
+def test_emulator_inventory_refresh_interceptors(emulator_client, store):
+    interceptors_c = Interceptors(emulator_client)
+    interceptors_c.create_interceptor("kept", INTERCEPTOR, vcluster_name="vcluster-1")
+    interceptors_c.create_interceptor("global", INTERCEPTOR, is_global=True)
+    store.detach()
+    interceptors_c.create_interceptor("added", INTERCEPTOR, vcluster_name="vcluster-0")
+    interceptors_c.create_interceptor("late", INTERCEPTOR, vcluster_name="vcluster-1")
+    before: list[tuple] = interceptors_of(store, "vcluster-0")
+    assert not store.refresh(["vcluster-0"])
+    assert interceptors_of(store, "vcluster-0") == sorted([*before, ("added", 1)])
+    assert ("late", 1) not in interceptors_of(store, "vcluster-1")
+    assert ("kept", 1) in interceptors_of(store, "vcluster-1")
+    assert store.query(
+        "SELECT name FROM interceptors WHERE is_global AND name = 'global'"
+    )
+
+
+def test_emulator_inventory_topic_mappings(emulator_client, store):
+    vclusters_c = VirtualClusters(emulator_client)
+    vclusters_c.create_vcluster_topic_mapping(
+        "inventory", "orders", "inventory.orders", read_only=True
+    )
+    assert "inventory" in store.vclusters()
+    assert [
+        (_row["logical_topic"], _row["physical_topic"])
+        for _row in store.topic_mappings("inventory", read_only=True)
+    ] == [("orders", "inventory.orders")]
+    vclusters_c.delete_vcluster_topic_mapping("inventory", "orders")
+    assert not store.topic_mappings("inventory")
+    store.detach()
+    vclusters_c.create_vcluster_topic_mapping("inventory", "late", "late")
+    assert not store.topic_mappings("inventory")
+    store.refresh(["inventory"])
+    assert len(store.topic_mappings("inventory")) == 1
+
+
+def test_emulator_inventory_failed_change(emulator_client, store):
+    vclusters_c = VirtualClusters(emulator_client)
+    vclusters_c.create_vcluster_topic_mapping("inventory", "orders", "orders")
+    with pytest.raises(TopicOrVirtualClusterNotFound):
+        vclusters_c.delete_vcluster_topic_mapping("inventory", "missing")
+    with pytest.raises(VirtualClusterNotFound):
+        vclusters_c.delete_vcluster_topics_mappings("missing")
+    assert len(store.topic_mappings("inventory")) == 1
+    assert "missing" not in store.vclusters()
+
+
+def test_emulator_inventory_delete_and_reroute(emulator_client, store):
+    vclusters_c = VirtualClusters(emulator_client)
+    vclusters_c.reroute_vcluster_topic_mappings("vcluster-0", "rerouted")
+    assert not store.topic_mappings("vcluster-0")
+    assert len(store.topic_mappings("rerouted")) == 100
+    assert "rerouted" in store.vclusters()
+    vclusters_c.delete_vcluster_topics_mappings("rerouted")
+    assert not store.topic_mappings("rerouted")
+    assert len(store.topic_mappings("vcluster-1")) == 100
+
+
+def test_emulator_inventory_concentration_rules(emulator_client, store):
+    vclusters_c = VirtualClusters(emulator_client)
+    for _pattern in ["orders.*", "payments.*", "users.*"]:
+        vclusters_c.create_concentration_rule("inventory", _pattern, "concentrated")
+
+    def patterns() -> list[str]:
+        return [
+            _row["pattern"]
+            for _row in store.query(
+                "SELECT pattern FROM concentration_rules WHERE vcluster = 'inventory'"
+                " ORDER BY pattern"
+            )
+        ]
+
+    assert patterns() == ["orders.*", "payments.*", "users.*"]
+    vclusters_c.delete_concentration_rule("inventory", pattern="orders.*")
+    assert patterns() == ["payments.*", "users.*"]
+    vclusters_c.delete_concentration_rule("inventory")
+    assert not patterns()
+
+
+def test_emulator_inventory_user_mappings(emulator_client, store):
+    user_mappings = UserMappings(emulator_client)
+    user_mappings.create_mapping("alice", groups=["a"], vcluster_name="inventory")
+    user_mappings.update_mapping("alice", groups=["b"], vcluster_name="inventory")
+    user_mappings.create_mapping("bob", groups=["b"])
+    assert store.query(
+        "SELECT vcluster, username FROM user_mappings, json_each(user_mappings.groups)"
+        " WHERE json_each.value = ? ORDER BY username",
+        ["b"],
+    ) == [
+        {"vcluster": "inventory", "username": "alice"},
+        {"vcluster": "", "username": "bob"},
+    ]
+    user_mappings.delete_mapping("bob")
+    user_mappings.delete_mapping("alice", vcluster_name="inventory")
+    assert not store.query(
+        "SELECT * FROM user_mappings WHERE username IN ('alice', 'bob')"
+    )
+
+
+def test_emulator_inventory_interceptors(emulator_client, store):
+    interceptors_c = Interceptors(emulator_client)
+    interceptors_c.create_interceptor("guard", INTERCEPTOR, vcluster_name="inventory")
+    interceptors_c.create_interceptor(
+        "guard", INTERCEPTOR, vcluster_name="inventory", username="alice"
+    )
+    interceptors_c.create_interceptor("guard", INTERCEPTOR, is_global=True)
+    interceptors_c.update_interceptor(
+        "guard", dict(INTERCEPTOR, priority=5), vcluster_name="inventory"
+    )
+    assert store.query(
+        "SELECT is_global, vcluster, username, priority FROM interceptors"
+        " WHERE name = 'guard' ORDER BY is_global, username"
+    ) == [
+        {"is_global": 0, "vcluster": "inventory", "username": "", "priority": 5},
+        {"is_global": 0, "vcluster": "inventory", "username": "alice", "priority": 1},
+        {"is_global": 1, "vcluster": "", "username": "", "priority": 1},
+    ]
+    interceptors_c.delete_interceptor("guard", vcluster_name="inventory")
+    interceptors_c.delete_interceptor("guard", is_global=True)
+    assert store.query(
+        "SELECT vcluster, username FROM interceptors WHERE name = 'guard'"
+    ) == [{"vcluster": "inventory", "username": "alice"}]
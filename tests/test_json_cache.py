@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+"""tests for the decoded JSON cache"""
+
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+import requests
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.common.json_cache import JsonCache
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.plugins import Plugins
+from cdk_proxy_api_client.plugins.cache import PluginsCatalogCache
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def test_emulator_json_cache(emulator):
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    cache = client.enable_json_cache()
+    interceptors = Interceptors(ProxyClient(client))
+    first = interceptors.get_all_gw_interceptors().json()
+    second = interceptors.get_all_gw_interceptors().json()
+    assert second == first and second is not first
+    assert cache.hits == 1 and cache.hit_rate == 0.5
+    assert type(second) is dict and type(second["interceptors"]) is list
+    second["interceptors"].append({})
+    assert interceptors.get_all_gw_interceptors().json() == first
+    client.disable_json_cache()
+    assert interceptors.get_all_gw_interceptors().json() == first
+    assert cache.hits == 2
+
+
+def test_emulator_json_cache_changed_body(emulator):
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    cache = client.enable_json_cache()
+    vclusters = VirtualClusters(ProxyClient(client))
+    before = vclusters.list_vclusters(as_list=True)
+    vclusters.create_vcluster_user_token("json-cache", "user")
+    after = vclusters.list_vclusters(as_list=True)
+    assert (
+        "json-cache" in after["vclusters"] and "json-cache" not in before["vclusters"]
+    )
+    assert cache.hits == 0 and cache.misses == 2
+
+
+def test_json_cache_eviction():
+    cache = JsonCache(max_entries=2)
+    for _index in range(3):
+        assert cache.decode(json.dumps({"index": _index}).encode()) == {"index": _index}
+    assert len(cache) == 2
+    assert cache.decode(b'{"index": 0}') == {"index": 0}
+    assert cache.hits == 0
+    assert cache.decode(b'{"index": 2}') == {"index": 2}
+    assert cache.hits == 1
+    cache = JsonCache(max_bytes=64)
+    assert cache.decode(json.dumps(list(range(100))).encode()) == list(range(100))
+    assert len(cache) == 0 and cache.size == 0
+    cache.decode(b"[1]")
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
+    with pytest.raises(ValueError):
+        JsonCache(max_entries=0)
+
+
+def test_json_cache_invalid_body():
+    cache = JsonCache()
+    with pytest.raises(ValueError):
+        cache.decode(b"not json")
+    assert len(cache) == 0
+    response = requests.Response()
+    response._content = b"not json"
+    response.status_code = 200
+    cache.install(response)
+    with pytest.raises(requests.exceptions.JSONDecodeError):
+        response.json()
+    response._content = b'{"a": 1}'
+    assert response.json() == response.json() == {"a": 1}
+    assert cache.hits == 1
+    assert response.json(parse_int=str) == {"a": "1"}
+    assert cache.hits == 1
+
+
+def test_emulator_json_cache_plugins_catalog(emulator, tmp_path):
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    cache = client.enable_json_cache()
+    plugins = Plugins(ProxyClient(client))
+    catalog_cache = plugins.get_catalog_cache(cache_dir=str(tmp_path))
+    catalog = catalog_cache.get()
+    assert catalog and catalog_cache.load()["plugins"] == catalog
+    catalog_cache.invalidate()
+    assert catalog_cache.get() == catalog and cache.hits >= 1
+    assert catalog_cache.gateway_version.startswith("plugins-")
+    assert (
+        catalog_cache.cache_key
+        == plugins.get_catalog_cache(cache_dir=str(tmp_path)).cache_key
+    )
+    assert (
+        plugins.get_catalog_cache("3.0.0").cache_key
+        != plugins.get_catalog_cache("3.1.0").cache_key
+    )
+    with pytest.raises(ValueError):
+        PluginsCatalogCache(plugins, None)
+
+
+def test_emulator_plugins_catalog_cold_start(emulator, tmp_path):
+    plugins = Plugins(
+        ProxyClient(ApiClient(url=emulator.url, username="admin", password="conduktor"))
+    )
+    catalog = plugins.get_catalog_cache(cache_dir=str(tmp_path)).get()
+    requests_count = emulator.requests_count
+    assert requests_count == 2
+    assert plugins.get_catalog_cache(cache_dir=str(tmp_path)).get() == catalog
+    assert emulator.requests_count == requests_count
+    signature_path = next(tmp_path.glob("*.signature"))
+    os.utime(signature_path, (0, 0))
+    assert plugins.get_catalog_cache(cache_dir=str(tmp_path)).get() == catalog
+    assert emulator.requests_count == requests_count + 1
+    signature_path.write_text("plugins-upgraded")
+    assert plugins.get_catalog_cache(cache_dir=str(tmp_path)).get() == catalog
+    assert emulator.requests_count == requests_count + 2
+    assert (
+        plugins.get_catalog_cache(
+            cache_dir=str(tmp_path), signature_ttl=0
+        ).gateway_version
+        == next(tmp_path.glob("*.signature")).read_text()
+        != "plugins-upgraded"
+    )
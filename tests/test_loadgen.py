@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+"""tests for the load harness"""
+
+from __future__ import annotations
+
+import pytest
+
+from cdk_proxy_api_client.loadgen import LoadHarness
+
+
+def test_emulator_load_harness(emulator, emulator_client):
+    harness = LoadHarness(
+        emulator_client,
+        {"list_vcluster_topic_mappings": 70, "create_vcluster_user_token": 30},
+        vclusters=["vcluster-0"],
+        concurrency=4,
+        seed=42,
+    )
+    report = harness.run(requests=100)
+    assert report["requests"] == emulator.requests_count == 100
+    assert not report["errors"]
+    assert (
+        sum(_endpoint["count"] for _endpoint in report["endpoints"].values())
+        == report["requests"]
+    )
+    with pytest.raises(ValueError):
+        LoadHarness(emulator_client, {"unknown": 1})
+
+
+def test_emulator_load_harness_interceptors(emulator, emulator_client):
+    report = LoadHarness(
+        emulator_client,
+        {"create_interceptor": 50, "upsert_interceptor": 50},
+        vclusters=["vcluster-0"],
+        concurrency=4,
+        seed=42,
+    ).run(requests=250)
+    assert not report["errors"]
+    assert report["requests"] == 250
+    assert emulator.requests_count > 250
+    names: list[str] = [
+        _interceptor["name"]
+        for _interceptor in emulator.state.list_interceptors()["interceptors"]
+    ]
+    created: list[str] = [
+        _name
+        for _name in names
+        if _name.startswith("loadgen-") and not _name.startswith("loadgen-upsert-")
+    ]
+    assert len(created) == report["endpoints"]["create_interceptor"]["count"]
+
+
+def test_load_harness_unexpected_errors(emulator_client):
+    def flaky(_proxy, _vcluster, _seq) -> None:
+        if _seq % 2:
+            raise ZeroDivisionError(_seq)
+
+    report = LoadHarness(
+        emulator_client,
+        {"flaky": 1},
+        concurrency=2,
+        operations={"flaky": flaky},
+    ).run(requests=20)
+    assert report["requests"] == 20
+    assert report["errors"] == {"flaky": {"ZeroDivisionError": 10}}
+    assert report["endpoints"]["flaky"]["errors"] == 10
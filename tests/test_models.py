@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+"""tests for the typed models"""
+
+from __future__ import annotations
+
+import pytest
+
+from cdk_proxy_api_client.interceptors.scopes import scope_from_definition
+from cdk_proxy_api_client.models import Interceptor, Model, TopicMapping, UserMapping
+from cdk_proxy_api_client.plugins import Plugins
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def test_emulator_models(emulator, emulator_client):
+    vclusters_c = VirtualClusters(emulator_client)
+    mappings = vclusters_c.list_vcluster_topic_mappings("vcluster-2", as_models=True)
+    assert all(isinstance(_mapping, TopicMapping) for _mapping in mappings)
+    assert [_mapping.as_dict() for _mapping in mappings] == (
+        vclusters_c.list_vcluster_topic_mappings("vcluster-2", as_list=True)
+    )
+    assert mappings[0].vcluster is mappings[1].vcluster
+    assert not hasattr(mappings[0], "__dict__")
+    with pytest.raises(TypeError):
+        hash(mappings[0])
+    with pytest.raises(TypeError):
+        Model()
+    users = UserMappings(emulator_client).list_mappings_detailed(
+        "vcluster-2", as_models=True
+    )
+    assert isinstance(users[0], UserMapping) and users[0].groups
+    assert users[0].vcluster == "vcluster-2"
+    plugins = Plugins(emulator_client).list_all_plugins(extended=True, as_models=True)
+    assert plugins[0].config_schema
+    definition: dict = {
+        "name": "model",
+        "pluginClass": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+        "priority": 1,
+        "config": {"topic": ".*"},
+        "vcluster": "vcluster-2",
+        "username": "user-0",
+    }
+    interceptor = Interceptor.from_json(definition)
+    assert interceptor.scope["vcluster_name"] == "vcluster-2"
+    assert interceptor.scope["username"] == "user-0"
+    assert interceptor.as_dict() == definition
+    del definition["vcluster"], definition["username"]
+    assert Interceptor.from_json(definition).scope is None
+    with pytest.raises(ValueError):
+        scope_from_definition(definition)
+    assert scope_from_definition({**definition, "global": True})["is_global"]
+    assert scope_from_definition({**definition, "scope": "/global"})["is_global"]
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+
+"""tests for the operations runner"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from cdk_proxy_api_client.operations_runner import OperationsRunner
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def write_operations(path, operations: list) -> str:
+    path.write_text("\n".join(json.dumps(_operation) for _operation in operations))
+    return str(path)
+
+
+def mapping(topic: str) -> dict:
+    return {
+        "application": "vclusters",
+        "operation": "create_vcluster_topic_mapping",
+        "args": ["runner", topic, f"runner.{topic}"],
+    }
+
+
+def runner_mappings(emulator_client) -> list[str]:
+    return sorted(
+        _mapping["logicalTopicName"]
+        for _mapping in VirtualClusters(emulator_client).list_vcluster_topic_mappings(
+            "runner", as_list=True
+        )
+    )
+
+
+def test_max_workers(emulator_client, tmp_path):
+    with pytest.raises(ValueError, match="max_workers"):
+        OperationsRunner(
+            emulator_client, str(tmp_path / "operations.jsonl"), max_workers=0
+        )
+
+
+def test_emulator_operations_runner(emulator_client, tmp_path):
+    operations_path = write_operations(
+        tmp_path / "operations.jsonl",
+        [mapping(f"topic-{_index}") for _index in range(20)],
+    )
+    runner = OperationsRunner(emulator_client, operations_path, checkpoint_every=5)
+    report = runner.run()
+    assert report["succeeded"] == 20 and not report["failed"]
+    assert not report["resumed"] and not report["duplicates"]
+    assert runner.low_watermark == 20 and not runner.completed and not runner.retry
+    assert len(runner_mappings(emulator_client)) == 20
+    with open(runner.checkpoint_path) as checkpoint_fd:
+        assert json.load(checkpoint_fd)["low_watermark"] == 20
+
+
+def test_emulator_operations_runner_duplicates(emulator_client, tmp_path):
+    operations_path = write_operations(
+        tmp_path / "operations.jsonl",
+        [mapping("orders"), mapping("payments"), mapping("orders")],
+    )
+    runner = OperationsRunner(emulator_client, operations_path)
+    report = runner.run()
+    assert report["succeeded"] == 2 and report["duplicates"] == 1
+    assert runner.low_watermark == 3
+    assert len(runner_mappings(emulator_client)) == 2
+
+
+def test_emulator_operations_runner_empty_lines(emulator_client, tmp_path):
+    operations_path = tmp_path / "operations.jsonl"
+    operations_path.write_text(
+        f"\n{json.dumps(mapping('orders'))}\n  \n{json.dumps(mapping('payments'))}\n\n"
+    )
+    runner = OperationsRunner(emulator_client, str(operations_path))
+    report = runner.run()
+    assert report["succeeded"] == 2 and not report["failed"]
+    assert runner.low_watermark == 5
+
+
+def test_emulator_operations_runner_invalid_lines(emulator_client, tmp_path):
+    operations_path = tmp_path / "operations.jsonl"
+    operations_path.write_text(
+        "\n".join(
+            [
+                json.dumps(mapping("orders")),
+                "{not json",
+                json.dumps({"application": "topics", "operation": "create_topic"}),
+                json.dumps({"application": "vclusters", "operation": "list_vclusters"}),
+                json.dumps({"application": "vclusters", "operation": "missing"}),
+                json.dumps(mapping("orders") | {"kwargs": ["read_only"]}),
+            ]
+        )
+    )
+    runner = OperationsRunner(emulator_client, str(operations_path))
+    report = runner.run()
+    assert report["succeeded"] == 1
+    assert sorted(report["failed"]) == [2, 3, 4, 5, 6]
+    assert report["failed"][2].startswith("JSONDecodeError")
+    assert "application must be one of" in report["failed"][3]
+    assert "list_vclusters is not a supported write operation" in report["failed"][4]
+    assert "missing is not a supported write operation" in report["failed"][5]
+    assert report["failed"][6].startswith(("TypeError", "ValueError"))
+    assert runner.low_watermark == 6 and runner.retry == {2, 3, 4, 5, 6}
+
+
+def test_emulator_operations_runner_resume(emulator_client, tmp_path):
+    operations: list = [mapping(f"topic-{_index}") for _index in range(5)]
+    operations.append(
+        {
+            "application": "vclusters",
+            "operation": "delete_vcluster_topic_mapping",
+            "args": ["runner", "missing"],
+        }
+    )
+    operations_path = write_operations(tmp_path / "operations.jsonl", operations)
+    report = OperationsRunner(emulator_client, operations_path).run()
+    assert report["succeeded"] == 5 and list(report["failed"]) == [6]
+    report = OperationsRunner(emulator_client, operations_path).run()
+    assert report["succeeded"] == 0 and report["resumed"] == 5
+    assert list(report["failed"]) == [6]
+    VirtualClusters(emulator_client).create_vcluster_topic_mapping(
+        "runner", "missing", "runner.missing"
+    )
+    runner = OperationsRunner(emulator_client, operations_path)
+    report = runner.run()
+    assert report["succeeded"] == 1 and report["resumed"] == 5
+    assert not report["failed"] and not runner.retry
+    assert len(runner_mappings(emulator_client)) == 5
+
+
+def test_emulator_operations_runner_changed_file(emulator_client, tmp_path):
+    operations: list = [mapping(f"topic-{_index}") for _index in range(5)]
+    operations_path = write_operations(tmp_path / "operations.jsonl", operations)
+    OperationsRunner(emulator_client, operations_path).run()
+    write_operations(tmp_path / "operations.jsonl", operations[1:])
+    with pytest.raises(ValueError, match="changed since the checkpoint"):
+        OperationsRunner(emulator_client, operations_path).run()
+    write_operations(tmp_path / "operations.jsonl", operations[:3])
+    with pytest.raises(ValueError, match=r"changed since the checkpoint .* \(line 5\)"):
+        OperationsRunner(emulator_client, operations_path).run()
+    write_operations(tmp_path / "operations.jsonl", [*operations, mapping("added")])
+    report = OperationsRunner(emulator_client, operations_path).run()
+    assert report["succeeded"] == 1 and report["resumed"] == 5
+
+
+def test_emulator_operations_runner_other_checkpoint(emulator_client, tmp_path):
+    checkpoint_path = str(tmp_path / "operations.checkpoint")
+    first_path = write_operations(tmp_path / "first.jsonl", [mapping("orders")])
+    second_path = write_operations(tmp_path / "second.jsonl", [mapping("payments")])
+    OperationsRunner(emulator_client, first_path, checkpoint_path=checkpoint_path).run()
+    with pytest.raises(ValueError, match="is the checkpoint of"):
+        OperationsRunner(
+            emulator_client, second_path, checkpoint_path=checkpoint_path
+        ).run()
+    assert runner_mappings(emulator_client) == ["orders"]
+
+
+def test_emulator_operations_runner_blocked(emulator, emulator_client, tmp_path):
+    def mapping(operation: str, **kwargs) -> dict:
+        return {
+            "application": "user_mappings",
+            "operation": operation,
+            "args": ["alice"],
+            "kwargs": {"vcluster_name": "runner", **kwargs},
+        }
+
+    operations_path = write_operations(
+        tmp_path / "operations.jsonl",
+        [
+            mapping("delete_mapping"),
+            mapping("create_mapping", groups=["b"]),
+            mapping("create_mapping", groups=["c"]) | {"args": ["bob"]},
+        ],
+    )
+    report = OperationsRunner(emulator_client, operations_path).run()
+    assert list(report["failed"]) == [1]
+    assert report["blocked"] == {2: 1}
+    assert report["succeeded"] == 1
+    user_mappings = UserMappings(emulator_client)
+    user_mappings.create_mapping("alice", groups=["a"], vcluster_name="runner")
+    report = OperationsRunner(emulator_client, operations_path).run()
+    assert report["succeeded"] == 2 and report["resumed"] == 1
+    assert not report["failed"] and not report["blocked"]
+    assert emulator.state.vclusters["runner"]["user_mappings"]["alice"]["groups"] == [
+        "b"
+    ]
+
+
+def test_emulator_operations_runner_checkpoint_size(emulator_client, tmp_path):
+    operations: list = [
+        {"application": "vclusters", "operation": "list_vclusters"},
+        *(
+            {
+                "application": "vclusters",
+                "operation": "create_vcluster_topic_mapping",
+                "args": ["runner", f"topic-{_index}", f"runner.topic-{_index}"],
+            }
+            for _index in range(50)
+        ),
+    ]
+    operations_path = write_operations(tmp_path / "operations.jsonl", operations)
+    runner = OperationsRunner(emulator_client, operations_path, checkpoint_every=10)
+    report = runner.run()
+    assert report["succeeded"] == 50 and list(report["failed"]) == [1]
+    with open(runner.checkpoint_path) as checkpoint_fd:
+        checkpoint: dict = json.load(checkpoint_fd)
+    assert checkpoint["low_watermark"] == 51
+    assert not checkpoint["completed"] and checkpoint["retry"] == [1]
+    report = OperationsRunner(emulator_client, operations_path).run()
+    assert report["resumed"] == 50 and list(report["failed"]) == [1]
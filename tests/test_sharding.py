@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+"""tests for the process-pool sharded jobs"""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.errors import ProxyGenericException
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.sharding import (
+    ShardedExecutor,
+    create_topic_mappings,
+    snapshot_vcluster,
+    worker_audit_path,
+)
+
+
+def worker_settings(proxy: ProxyClient, vcluster: str) -> dict:
+    return {
+        "version": proxy.version,
+        "pool_maxsize": proxy.client.pool_maxsize,
+        "thread_local_sessions": proxy.client._thread_local_sessions,
+        "limiter": proxy.client.limiter.settings() if proxy.client.limiter else None,
+    }
+
+
+def echo(proxy: ProxyClient, vcluster: str, *args, **kwargs) -> list:
+    return [vcluster, list(args), kwargs]
+
+
+def unserializable(proxy: ProxyClient, vcluster: str) -> object:
+    return object()
+
+
+def failing(proxy: ProxyClient, vcluster: str) -> None:
+    raise ProxyGenericException("job failed", 418, {})
+
+
+@pytest.fixture()
+def executor(emulator) -> ShardedExecutor:
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    return ShardedExecutor(ProxyClient(client), processes=2)
+
+
+def test_emulator_sharded_snapshots(executor):
+    snapshots, errors = executor.run(snapshot_vcluster, ["vcluster-0", "missing"])
+    assert len(snapshots["vcluster-0"]["topic_mappings"]) == 100
+    assert len(snapshots["vcluster-0"]["user_mappings"]) == 10
+    assert list(errors) == ["missing"]
+    assert isinstance(errors["missing"], ProxyGenericException)
+    assert errors["missing"].details["vcluster"] == "missing"
+
+
+def test_emulator_sharded_create_topic_mappings(emulator, executor):
+    reports, errors = executor.run(
+        create_topic_mappings,
+        ["sharded", "empty"],
+        shards_data={
+            "sharded": [
+                {"logicalTopicName": "topic", "physicalTopicName": "topic"},
+                {"logicalTopicName": "invalid", "physicalTopicName": ""},
+            ]
+        },
+    )
+    assert not errors
+    assert reports["sharded"]["created"] == 1
+    assert list(reports["sharded"]["failed"]) == ["invalid"]
+    assert reports["empty"] == {"created": 0, "failed": {}}
+    assert list(emulator.state.vclusters["sharded"]["topics"]) == ["topic"]
+
+
+def test_emulator_sharded_map(executor):
+    vclusters: list[str] = [f"vcluster-{_index}" for _index in range(5)]
+    assert [
+        _result
+        for _, _result, _ in executor.map(
+            echo,
+            vclusters,
+            "arg",
+            shards_data={"vcluster-1": "data"},
+            flag=True,
+        )
+    ] == [
+        [
+            _vcluster,
+            [None if _vcluster != "vcluster-1" else "data", "arg"],
+            {"flag": True},
+        ]
+        for _vcluster in vclusters
+    ]
+    assert (
+        sorted(
+            _vcluster
+            for _vcluster, _, _ in executor.map(echo, vclusters, ordered=False)
+        )
+        == vclusters
+    )
+
+
+def test_emulator_sharded_errors(executor):
+    results, errors = executor.run(failing, ["vcluster-0"])
+    assert not results
+    assert errors["vcluster-0"].code == 418
+    assert errors["vcluster-0"].details == {
+        "vcluster": "vcluster-0",
+        "error": "ProxyGenericException",
+    }
+    results, errors = executor.run(unserializable, ["vcluster-0"])
+    assert not results and errors["vcluster-0"].details["error"] == "ValueError"
+
+
+def test_emulator_sharded_executor_default_settings(executor):
+    assert executor.run(worker_settings, ["vcluster-0"])[0]["vcluster-0"] == {
+        "version": "v1",
+        "pool_maxsize": None,
+        "thread_local_sessions": False,
+        "limiter": None,
+    }
+
+
+def test_emulator_sharded_executor_client_settings(emulator):
+    client = ApiClient(
+        url=emulator.url,
+        username="admin",
+        password="conduktor",
+        thread_local_sessions=True,
+        pool_maxsize=4,
+    )
+    limiter = client.enable_adaptive_concurrency(initial_limit=2, max_limit=4)
+    settings, errors = ShardedExecutor(ProxyClient(client, "v2"), processes=2).run(
+        worker_settings, ["vcluster-0", "vcluster-1"]
+    )
+    assert not errors
+    assert (
+        settings["vcluster-0"]
+        == settings["vcluster-1"]
+        == {
+            "version": "v2",
+            "pool_maxsize": 4,
+            "thread_local_sessions": True,
+            "limiter": limiter.settings(),
+        }
+    )
+
+
+def test_emulator_sharded_executor_audit(emulator, tmp_path):
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    sink = client.enable_audit(str(tmp_path / "audit.jsonl"), on_full="drop")
+    reports, errors = ShardedExecutor(ProxyClient(client), processes=2).run(
+        create_topic_mappings,
+        ["sharded-0", "sharded-1"],
+        shards_data={
+            _vcluster: [
+                {"logicalTopicName": f"topic-{_index}", "physicalTopicName": "topic"}
+                for _index in range(5)
+            ]
+            for _vcluster in ["sharded-0", "sharded-1"]
+        },
+    )
+    assert not errors
+    client.disable_audit()
+    assert sink.written == 0
+    records: list[dict] = [
+        json.loads(_line)
+        for _path in tmp_path.glob("audit.*.jsonl")
+        for _line in _path.read_text().splitlines()
+    ]
+    assert len(records) == 10
+    assert {_record["method"] for _record in records} == {"POST"}
+    assert worker_audit_path("/audit/gateway.jsonl", 42) == "/audit/gateway.42.jsonl"
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+
+"""tests for the requests tracing"""
+
+from __future__ import annotations
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def test_emulator_requests_tracing(emulator):
+    client = ApiClient(url=emulator.url, username="admin", password="conduktor")
+    vclusters_c = VirtualClusters(ProxyClient(client))
+    traces: list = []
+    with client.trace(callback=traces.append) as tracer:
+        vclusters_c.list_vcluster_topic_mappings("vcluster-0", as_list=True)
+        vclusters_c.list_vcluster_topic_mappings("vcluster-0", as_list=True)
+    assert client.tracer is None
+    assert traces == list(tracer.traces)
+    assert not traces[0].reused_connection and traces[1].reused_connection
+    durations = traces[0].durations()
+    for _phase in ["pool_checkout", "connect", "send", "wait", "download", "decode"]:
+        assert durations[_phase] >= 0
+    with client.trace(sample_rate=0.0) as tracer:
+        vclusters_c.list_vclusters()
+    assert not tracer.traces
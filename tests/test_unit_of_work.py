@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+"""tests for the unit of work"""
+
+from __future__ import annotations
+
+import pytest
+
+from cdk_proxy_api_client.unit_of_work import UnitOfWork, _VclusterPlan
+
+
+def test_emulator_unit_of_work(emulator, emulator_client):
+    unit = UnitOfWork(emulator_client, max_workers=5)
+    unit.interceptors.upsert_interceptor(
+        "uow",
+        {
+            "pluginClass": "io.conduktor.gateway.interceptor.safeguard.ProducePolicyPlugin",
+            "priority": 1,
+            "config": {"topic": ".*"},
+        },
+        vcluster_name="uow",
+    )
+    unit.user_mappings.create_mapping("alice", groups=["a"], vcluster_name="uow")
+    unit.user_mappings.update_mapping("alice", groups=["b"], vcluster_name="uow")
+    for _index in range(10):
+        unit.vclusters.create_vcluster_topic_mapping(
+            "uow", f"topic-{_index}", f"uow.topic-{_index}"
+        )
+    unit.vclusters.create_vcluster_user_token("uow")
+    unit.vclusters.delete_vcluster_topic_mapping("uow-missing", "topic")
+    unit.user_mappings.create_mapping("bob", vcluster_name="uow-missing")
+    with pytest.raises(AttributeError):
+        unit.vclusters.list_vclusters()
+    summary = unit.flush()
+    assert not len(unit)
+    assert (summary["succeeded"], summary["failed"], summary["skipped"]) == (14, 1, 1)
+    assert emulator.state.vclusters["uow"]["user_mappings"]["alice"]["groups"] == ["b"]
+
+
+def test_unit_of_work_collection_barriers(emulator_client):
+    unit = UnitOfWork(emulator_client)
+    unit.vclusters.create_vcluster_topic_mapping("uow", "topic-0", "uow.topic-0")
+    unit.vclusters.delete_vcluster_topics_mappings("uow")
+    unit.vclusters.create_vcluster_topic_mapping("uow", "topic-1", "uow.topic-1")
+    unit.vclusters.create_vcluster_topic_mapping("uow", "topic-2", "uow.topic-2")
+    unit.vclusters.reroute_vcluster_topic_mappings("uow", "uow-dest")
+    unit.vclusters.delete_concentration_rule("uow", pattern="uow.*")
+    unit.vclusters.delete_concentration_rule("uow")
+    phases = _VclusterPlan(unit.operations).stages
+    assert [
+        [[_operation.function.__name__ for _operation in _chain] for _chain in _phase]
+        for _phase in phases
+    ] == [
+        [["delete_concentration_rule"]],
+        [["delete_concentration_rule"]],
+        [["create_vcluster_topic_mapping"]],
+        [["delete_vcluster_topics_mappings"]],
+        [["create_vcluster_topic_mapping"], ["create_vcluster_topic_mapping"]],
+        [["reroute_vcluster_topic_mappings"]],
+    ]
+    assert unit.operations[4].vclusters == ("uow", "uow-dest")
+    assert unit.operations[0].vclusters == ("uow",)
+
+
+def test_emulator_unit_of_work_collection_barriers(emulator, emulator_client):
+    emulator.latency_jitter = 0.01
+    unit = UnitOfWork(emulator_client, max_workers=10)
+    for _index in range(5):
+        unit.vclusters.create_vcluster_topic_mapping(
+            "uow", f"old-{_index}", f"uow.old-{_index}"
+        )
+    unit.vclusters.delete_vcluster_topics_mappings("uow")
+    for _index in range(5):
+        unit.vclusters.create_vcluster_topic_mapping(
+            "uow", f"new-{_index}", f"uow.new-{_index}"
+        )
+    unit.vclusters.create_vcluster_topic_mapping("uow-dest", "dest", "uow.dest")
+    unit.vclusters.reroute_vcluster_topic_mappings("uow", "uow-dest")
+    unit.vclusters.delete_vcluster_topic_mapping("uow-dest", "new-0")
+    summary = unit.flush()
+    assert (summary["succeeded"], summary["failed"], summary["skipped"]) == (14, 0, 0)
+    assert not emulator.state.vclusters["uow"]["topics"]
+    assert sorted(emulator.state.vclusters["uow-dest"]["topics"]) == [
+        "dest",
+        "new-1",
+        "new-2",
+        "new-3",
+        "new-4",
+    ]
+
+
+def test_emulator_unit_of_work_failed_reroute(emulator, emulator_client):
+    unit = UnitOfWork(emulator_client)
+    unit.vclusters.reroute_vcluster_topic_mappings("uow-missing", "uow-dest")
+    unit.vclusters.create_vcluster_topic_mapping("uow-dest", "dest", "uow.dest")
+    unit.user_mappings.create_mapping("alice", vcluster_name="uow-missing")
+    summary = unit.flush()
+    assert (summary["succeeded"], summary["failed"], summary["skipped"]) == (0, 1, 2)
+    assert "uow-dest" not in emulator.state.vclusters
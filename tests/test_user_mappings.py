@@ -11,6 +11,7 @@ import pytest
 from cdk_proxy_api_client.client_wrapper import ApiClient
 from cdk_proxy_api_client.proxy_api import ProxyClient
 from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.user_mappings.sync import UserMappingsSync
 
 
 @pytest.fixture()
@@ -43,3 +44,50 @@ def test_update_user_mappings(proxy_client):
     the_user = user_mappings.get_user_mapping(username="test").json()
     print(json.dumps(the_user))
     assert "dummy-users" not in the_user["groups"]
+
+
+def test_list_mappings_detailed(proxy_client):
+    user_mappings = UserMappings(proxy_client)
+    for _index in range(5):
+        user_mappings.create_mapping(f"detailed-{_index}", groups=["detailed"])
+    failures: dict = {}
+    identities = user_mappings.list_mappings_detailed(max_workers=4, failures=failures)
+    assert not failures
+    assert [_identity["username"] for _identity in identities] == (
+        user_mappings.list_mappings().json()
+    )
+
+
+def test_sync_user_mappings(proxy_client, tmp_path):
+    user_mappings = UserMappings(proxy_client)
+    export_path = tmp_path / "export.jsonl"
+    with open(export_path, "w") as export_fd:
+        for _index in range(10):
+            export_fd.write(
+                json.dumps(
+                    {
+                        "username": f"idp-{_index}",
+                        "groups": ["idp-users", f"idp-team-{_index % 2}"],
+                    }
+                )
+                + "\n"
+            )
+    syncer = UserMappingsSync(user_mappings, max_workers=4)
+    report = syncer.sync_file(str(export_path))
+    assert report["passthrough"]["created"] == 10
+    report = syncer.sync_file(str(export_path))
+    assert report["passthrough"]["unchanged"] == 10
+    assert not report["passthrough"]["created"] + report["passthrough"]["updated"]
+
+
+def test_user_mappings_index(proxy_client):
+    user_mappings = UserMappings(proxy_client)
+    user_mappings.create_mapping("indexed-user", groups=["index-group"])
+    index = user_mappings.get_index()
+    assert "indexed-user" in index.users_of("index-group")
+    user_mappings.update_mapping("indexed-user", groups=["other-index-group"])
+    assert "indexed-user" not in index.users_of("index-group")
+    assert index.groups_of("indexed-user") == {"other-index-group"}
+    user_mappings.delete_mapping("indexed-user")
+    assert "indexed-user" not in index.usernames()
+    index.detach()
@@ -63,6 +63,17 @@ def test_list_plugings(proxy_client, base_url):
     plugins = plugins_c.list_all_plugins()
 
 
+def test_plugins_catalog_cache(proxy_client, tmp_path):
+    plugins_c = Plugins(proxy_client)
+    cache = plugins_c.get_catalog_cache(cache_dir=str(tmp_path))
+    assert cache.load() is None
+    plugins = cache.get()
+    assert plugins == plugins_c.list_all_plugins(extended=True, as_list=True)
+    assert cache.load()["plugins"] == plugins
+    cache.invalidate()
+    assert cache.load() is None
+
+
 @pytest.mark.timeout(60)
 def test_simple_vcluster(proxy_client, kafka_bootstrap, gateway_bootstrap, messages):
     vclusters_c = VirtualClusters(proxy_client)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+"""tests for the physical topics index"""
+
+from __future__ import annotations
+
+import pytest
+
+from cdk_proxy_api_client.emulator.state import ApiError
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def test_emulator_physical_topics_index(emulator, emulator_client):
+    vclusters_c = VirtualClusters(emulator_client)
+    vclusters_c.create_vcluster_user_token("fan-in-a")
+    vclusters_c.create_vcluster_user_token("fan-in-b")
+    vclusters_c.create_vcluster_topic_mapping("fan-in-a", "orders", "shared.orders")
+    vclusters_c.create_vcluster_topic_mapping("fan-in-b", "orders", "shared.orders")
+    vclusters_c.create_concentration_rule("fan-in-a", "conc-.*", "concentrated")
+    emulator.state.create_concentrated_topic("fan-in-a", "conc-1")
+    with pytest.raises(ApiError):
+        emulator.state.create_concentrated_topic("fan-in-b", "conc-1")
+    index = vclusters_c.get_physical_topics_index(["fan-in-a", "fan-in-b"])
+    assert index.fan_in("shared.orders") == 2
+    assert {_entry.vcluster for _entry in index.writers("shared.orders")} == {
+        "fan-in-a",
+        "fan-in-b",
+    }
+    assert index.writers("concentrated")[0].kind == "delete"
+    assert index.writers("concentrated_compacted")[0].logical_topic == "conc-1"
+    vclusters_c.delete_vcluster_topic_mapping("fan-in-b", "orders")
+    index.refresh(["fan-in-b"])
+    assert [_entry.vcluster for _entry in index.writers("shared.orders")] == [
+        "fan-in-a"
+    ]
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+
+"""tests for the topic mappings table"""
+
+from __future__ import annotations
+
+import io
+import json
+
+from cdk_proxy_api_client.vclusters import VirtualClusters
+
+
+def test_emulator_topic_mappings_table(emulator_client):
+    table = VirtualClusters(emulator_client).get_topic_mappings_table(
+        ["vcluster-3", "vcluster-4"]
+    )
+    assert len(table) == 200
+    assert table.count_by("vcluster") == {"vcluster-3": 100, "vcluster-4": 100}
+    assert table.ratio_by("vcluster", "read_only")["vcluster-3"] == 0.1
+    assert table.top("physical_topic", 1)[0][1] == 1
+    read_only = table.filter(
+        vcluster=lambda _name: _name.endswith("-4"), read_only=True
+    )
+    assert read_only.count_by("vcluster") == {"vcluster-4": 10}
+    output = io.StringIO()
+    read_only.to_jsonl(output)
+    rows = [json.loads(_line) for _line in output.getvalue().splitlines()]
+    assert len(rows) == 10 and all(_row["readOnly"] for _row in rows)
+    output = io.StringIO()
+    read_only.to_csv(output)
+    assert len(output.getvalue().splitlines()) == 11